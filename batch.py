@@ -0,0 +1,261 @@
+# ═══════════════════════════════════════════════════════════════════
+# 📦 BATCH MODE - RUN A FILE OF PROMPTS HEADLESSLY
+# ═══════════════════════════════════════════════════════════════════
+"""Run prompts from a JSONL or CSV file through the chat backend.
+
+Each input row needs a ``prompt``; ``id``, ``conversation`` and ``model``
+are optional (the id defaults to the row number). Rows sharing a
+``conversation`` run in file order on one session, so later prompts see
+earlier turns, exactly as in the app; separate conversations and
+conversation-less rows run concurrently. A JSONL row may also carry a
+``history`` list of ``{"user": ..., "ai": ...}`` turns to start from.
+
+Results are appended to the output JSONL as each prompt finishes. With
+``--resume``, rows already answered in the output are skipped (their
+turns still seed their conversation's history) and failed rows are retried.
+With ``--auto-route``, simple prompts go to ``--fast-model`` and each
+result records the model used and why.
+
+    python batch.py prompts.jsonl -o results.jsonl --concurrency 8
+    python batch.py prompts.csv -o results.jsonl --fake --fake-latency 0.2
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_core import DEFAULT_TOKEN_BUDGET, ChatBackend, ResponseCache, Turn
+from metrics import Histogram
+from model_router import ModelRouter
+from scheduler import RequestScheduler
+
+DEFAULT_MODEL = "command-nightly"
+
+# ───────────────────────────────────────────────────────────────────
+# 1️⃣ INPUT AND OUTPUT
+# ───────────────────────────────────────────────────────────────────
+def check_history(path, number, history):
+    """Raise ValueError unless ``history`` is absent or a list of ``{"user": str, "ai": str}`` turns."""
+    if history is None:
+        return
+    if not isinstance(history, list):
+        raise ValueError(f"{path}: row {number}: history must be a list of turns")
+    for index, turn in enumerate(history, start=1):
+        if not isinstance(turn, dict) or not isinstance(turn.get("user"), str) or not isinstance(turn.get("ai"), str):
+            raise ValueError(f"{path}: row {number}: history turn {index} needs string user and ai")
+
+def read_prompts(path):
+    """Yield prompt rows from a ``.jsonl`` or ``.csv`` file, with a string ``id``."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows, start=1):
+            if not row.get("prompt"):
+                raise ValueError(f"{path}: row {number} has no prompt")
+            check_history(path, number, row.get("history"))
+            # An explicit id, even 0 or "", must survive so --resume can match it
+            row["id"] = str(row["id"] if row.get("id") is not None else number)
+            yield row
+
+def read_done(path):
+    """Return ``{id: result}`` for rows answered without error in an earlier run."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by the interruption
+            if result.get("error") is None:
+                done[result["id"]] = result
+    return done
+
+class ResultWriter:
+    """Append results to a JSONL file, one flushed line per result."""
+
+    def __init__(self, path, append):
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, result):
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+# ───────────────────────────────────────────────────────────────────
+# 2️⃣ RUNNER
+# ───────────────────────────────────────────────────────────────────
+def group_rows(rows):
+    """Split rows into work units: one per conversation, one per loose prompt."""
+    groups = OrderedDict()
+    for row in rows:
+        key = ("conversation", row["conversation"]) if row.get("conversation") else ("row", row["id"])
+        groups.setdefault(key, []).append(row)
+    return list(groups.values())
+
+class BatchRunner:
+    """Run grouped prompt rows on a ``ChatBackend`` and collect latency stats."""
+
+    def __init__(
+        self, backend, writer, done=None, model=DEFAULT_MODEL, max_turns=6, token_budget=DEFAULT_TOKEN_BUDGET, route=False
+    ):
+        self.backend = backend
+        self.writer = writer
+        self.done = done or {}
+        self.model = model
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.route = route
+        self.latencies = Histogram(window=1_000_000)
+        self.ok = 0
+        self.failed = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run_group(self, rows):
+        session = self.backend.new_session(memory_turns=max(100, len(rows) + 16))
+        for turn in rows[0].get("history") or ():
+            self.backend.record_turn(session, Turn(turn["user"], turn["ai"]))
+        for row in rows:
+            if self._stop.is_set():
+                return
+            previous = self.done.get(row["id"])
+            if previous is not None:
+                self.backend.record_turn(session, Turn(row["prompt"], previous["reply"]))
+                with self._lock:
+                    self.skipped += 1
+                continue
+            self.writer.write(self.run_row(session, row))
+
+    def run_row(self, session, row):
+        result = {"id": row["id"], "conversation": row.get("conversation"), "prompt": row["prompt"]}
+        t0 = time.perf_counter()
+        try:
+            reply = self.backend.process_message(
+                session, row["prompt"], self.max_turns, row.get("model") or self.model, token_budget=self.token_budget,
+                route=self.route,
+            )
+        except Exception as e:
+            result.update(reply=None, latency=time.perf_counter() - t0, error=f"{type(e).__name__}: {e}")
+            with self._lock:
+                self.failed += 1
+            return result
+        latency = time.perf_counter() - t0
+        result.update(
+            reply=reply.text,
+            latency=round(latency, 6),
+            cached=reply.cached,
+            shared=reply.shared,
+            prompt_tokens=reply.prompt_tokens,
+            prompt_turns=reply.prompt_turns,
+            model=reply.model,
+            route=reply.route,
+            error=None,
+        )
+        with self._lock:
+            self.ok += 1
+            self.latencies.observe(latency)
+        return result
+
+    def run(self, groups, concurrency):
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(self.run_group, rows) for rows in groups]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # Interrupted: let in-flight prompts finish and be written, start nothing new
+                self._stop.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def report(self, elapsed, out=sys.stdout):
+        quantiles = self.latencies.quantiles()
+        print(f"✅ {self.ok} ok • ❌ {self.failed} failed • ⏭️ {self.skipped} skipped (already done)", file=out)
+        print(f"⏱️ {elapsed:.2f}s wall • {self.ok / elapsed if elapsed else 0:.1f} prompts/s", file=out)
+        if self.ok:
+            cells = " • ".join(f"p{int(q * 100)} {value * 1000:.0f}ms" for q, value in quantiles.items())
+            print(f"📊 latency {cells}", file=out)
+        router = self.backend.router
+        if self.route and router is not None:
+            for model, stats in sorted(router.stats()["models"].items()):
+                p95 = f"{stats['p95'] * 1000:.0f}ms" if stats["p95"] is not None else "-"
+                print(f"🧭 {model}: {stats['routed']} routed • p95 {p95} • {stats['error_rate']:.0%} errors", file=out)
+
+# ───────────────────────────────────────────────────────────────────
+# 3️⃣ COMMAND LINE
+# ───────────────────────────────────────────────────────────────────
+def build_client(args):
+    if args.fake:
+        from fake_cohere import FakeCohereClient
+        return FakeCohereClient(latency=args.fake_latency)
+    api_key = os.getenv("COHERE_API_KEY")
+    if not api_key:
+        sys.exit("❌ Cohere API key not found. Set COHERE_API_KEY or pass --fake.")
+    import cohere
+    from resilient_client import ResilientClient
+    return ResilientClient(cohere.Client(api_key, timeout=args.timeout), timeout=args.timeout)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a file of prompts through the chat backend.")
+    parser.add_argument("input", help="prompts as .jsonl or .csv (column/field: prompt; optional id, conversation, model)")
+    parser.add_argument("-o", "--output", required=True, help="results file (.jsonl)")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--auto-route", action="store_true", help="send simple prompts to --fast-model")
+    parser.add_argument("--fast-model", default="command-light")
+    parser.add_argument("--slo", type=float, default=4.0, help="latency SLO in seconds for --auto-route")
+    parser.add_argument("--concurrency", type=int, default=8, help="upstream calls in flight at once")
+    parser.add_argument("--rate-per-minute", type=float, default=0, help="upstream call quota (0 = unlimited)")
+    parser.add_argument("--max-turns", type=int, default=6, help="history turns included in each prompt")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET)
+    parser.add_argument("--cache", action="store_true", help="reuse answers for identical prompts")
+    parser.add_argument("--resume", action="store_true", help="skip rows already answered in --output")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-call deadline in seconds")
+    parser.add_argument("--fake", action="store_true", help="use the offline FakeCohereClient")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="simulated seconds per fake call")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        rows = list(read_prompts(args.input))
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    done = read_done(args.output) if args.resume else {}
+    backend = ChatBackend(
+        build_client(args),
+        response_cache=ResponseCache() if args.cache else None,
+        scheduler=RequestScheduler(max_workers=args.concurrency, rate=args.rate_per_minute / 60 or None),
+        router=ModelRouter(args.fast_model, slo_seconds=args.slo) if args.auto_route else None,
+    )
+    writer = ResultWriter(args.output, append=args.resume)
+    runner = BatchRunner(
+        backend, writer, done=done, model=args.model, max_turns=args.max_turns, token_budget=args.token_budget,
+        route=args.auto_route,
+    )
+    started = time.perf_counter()
+    try:
+        runner.run(group_rows(rows), args.concurrency)
+    finally:
+        writer.close()
+        runner.report(time.perf_counter() - started)
+    return 1 if runner.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
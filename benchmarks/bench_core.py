@@ -0,0 +1,114 @@
+# ═══════════════════════════════════════════════════════════════════
+# ⏱️ BENCHMARK SUITE - CHAT CORE
+# ═══════════════════════════════════════════════════════════════════
+"""pytest-benchmark suite for the UI-free chat backend.
+
+Every case runs headlessly against ``FakeCohereClient``, parametrized over
+history sizes. Run from the repository root:
+
+    pytest benchmarks/ --benchmark-only
+    pytest benchmarks/ --benchmark-only --benchmark-autosave   # keep a baseline
+    pytest benchmarks/ --benchmark-only --benchmark-compare    # diff against it
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_core import (
+    ChatBackend,
+    ResponseCache,
+    Turn,
+    TurnBuffer,
+    build_context_prompt,
+    build_export,
+    summarize_history,
+)
+from fake_cohere import FakeCohereClient
+from suggestions import DEFAULT_CORPUS_PATH, SuggestionEngine
+
+HISTORY_SIZES = (10, 100, 1_000, 10_000)
+MODEL = "command-nightly"
+
+def make_history(size):
+    turns = [
+        Turn(f"question {i}: how do I fix my python code?", f"answer {i}: " + "details " * 20, seq=i + 1)
+        for i in range(size)
+    ]
+    return TurnBuffer(size, turns=turns)
+
+@pytest.fixture(params=HISTORY_SIZES, ids=lambda size: f"{size}turns")
+def history(request):
+    return make_history(request.param)
+
+# ───────────────────────────────────────────────────────────────────
+# 1️⃣ PROMPTS AND SUMMARIES
+# ───────────────────────────────────────────────────────────────────
+def test_build_context_prompt(benchmark, history):
+    prompt, _, _ = benchmark(build_context_prompt, history, "and what about tests?", max_turns=6)
+    assert prompt.endswith("AI (answer clearly and completely):")
+
+def test_summarize_history(benchmark, history):
+    summarized = benchmark(summarize_history, history, 4, FakeCohereClient(), MODEL)
+    assert len(summarized) == 5
+
+# ───────────────────────────────────────────────────────────────────
+# 2️⃣ SUGGESTIONS
+# ───────────────────────────────────────────────────────────────────
+def test_suggestion_lookup(benchmark, history):
+    backend = ChatBackend(FakeCohereClient(), suggestion_engine=SuggestionEngine.from_file(DEFAULT_CORPUS_PATH))
+    inputs = [turn.user for turn in history]
+
+    def run():
+        return [backend.suggest(text) for text in inputs]
+
+    assert all(benchmark(run))
+
+# ───────────────────────────────────────────────────────────────────
+# 3️⃣ EXPORTS
+# ───────────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("fmt", ("json", "csv"))
+def test_export(benchmark, history, fmt):
+    data = benchmark(build_export, fmt, history.turns())
+    assert data
+
+def test_export_pdf(benchmark, history):
+    if len(history) > 1_000:
+        pytest.skip("PDF layout is too slow to benchmark at this size")
+    data = benchmark.pedantic(build_export, args=("pdf", history.turns()), rounds=3)
+    assert data.startswith(b"%PDF")
+
+# ───────────────────────────────────────────────────────────────────
+# 4️⃣ END-TO-END TURNS
+# ───────────────────────────────────────────────────────────────────
+def test_process_message(benchmark, history):
+    backend = ChatBackend(FakeCohereClient())
+    session = backend.new_session(memory_turns=len(history) + 1)
+    for turn in history:
+        session.history.append(turn)
+    counter = iter(range(10**9))
+
+    def run():
+        return backend.process_message(session, f"new question {next(counter)}", 6, MODEL)
+
+    assert benchmark(run).text
+
+def test_process_message_cached(benchmark, history):
+    backend = ChatBackend(FakeCohereClient(), response_cache=ResponseCache())
+
+    def fresh_session():
+        session = backend.new_session(memory_turns=len(history))
+        for turn in history:
+            session.history.append(turn)
+        return (session,), {}
+
+    # Warm the cache once; every timed round then asks the same question
+    # against the same history and is answered without the client
+    backend.process_message(fresh_session()[0][0], "repeat question", 6, MODEL)
+
+    def run(session):
+        return backend.process_message(session, "repeat question", 6, MODEL)
+
+    assert benchmark.pedantic(run, setup=fresh_session, rounds=20).cached
@@ -0,0 +1,103 @@
+# ═══════════════════════════════════════════════════════════════════
+# 📦 PAYLOAD BENCHMARK - BYTES SENT PER RERUN
+# ═══════════════════════════════════════════════════════════════════
+"""Measure how many bytes of page elements each rerun sends to the browser.
+
+Run from the repository root:
+
+    python benchmarks/bench_payload.py
+    python benchmarks/bench_payload.py --app /path/to/older/cohere_chat_ui.py
+
+The app runs under ``AppTest`` with the offline ``FakeCohereClient``, once
+with static file serving off (themes inlined) and once with it on (themes
+in a cached stylesheet). Sizes are the serialized element protobufs, which
+make up the bulk of each websocket delta. A full rerun resends every
+element. With the theme picker fragment (Streamlit >= 1.37), a theme
+switch resends only the picker: its heading, its two buttons and the theme
+marker. Without it, a switch is a full rerun.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def is_theme_element(node):
+    body = getattr(node.proto, "body", "")
+    return isinstance(body, str) and ("<style" in body or "<link" in body or "vexel-theme" in body)
+
+def is_theme_picker_element(node):
+    if is_theme_element(node):
+        return True
+    label = getattr(node.proto, "label", "") or getattr(node.proto, "body", "")
+    return isinstance(label, str) and ("Theme" in label or "Light" in label or "Dark" in label)
+
+def leaves(node):
+    children = getattr(node, "children", None)
+    if children:
+        for child in children.values():
+            yield from leaves(child)
+    elif getattr(node, "proto", None) is not None:
+        yield node
+
+def run_child(app_path, static):
+    """Run in a child process: one full run, then one theme switch."""
+    warnings.filterwarnings("ignore")
+    import cohere
+    import streamlit as st
+    from streamlit import config
+    from streamlit.testing.v1 import AppTest
+    from fake_cohere import FakeCohereClient
+    cohere.Client = lambda *args, **kwargs: FakeCohereClient()
+    config.set_option("server.enableStaticServing", static)
+
+    os.environ.update(
+        COHERE_API_KEY=os.getenv("COHERE_API_KEY", "offline-benchmark"),
+        CHAT_DB_PATH=os.path.join(tempfile.mkdtemp(prefix="bench-payload-"), "chat.db"),
+    )
+    app = AppTest.from_file(app_path, default_timeout=60).run()
+    elements = list(leaves(app._tree))
+    next(button for button in app.button if "Light" in button.label).click()
+    app.run()
+    assert not app.exception, app.exception
+    after_switch = list(leaves(app._tree))
+    with open(app_path, encoding="utf-8") as f:
+        scoped = hasattr(st, "fragment") and "def render_theme_picker" in f.read()
+    # Without a theme fragment, switching reruns (and resends) the whole page
+    picker = [node for node in after_switch if is_theme_picker_element(node)] if scoped else after_switch
+    print(json.dumps({
+        "full_rerun": sum(node.proto.ByteSize() for node in elements),
+        "theme": sum(node.proto.ByteSize() for node in elements if is_theme_element(node)),
+        "theme_switch": sum(node.proto.ByteSize() for node in picker),
+    }))
+
+def measure(app_path, static):
+    child = subprocess.run(
+        [sys.executable, __file__, "--app", app_path, "--child", "static" if static else "inline"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if child.returncode:
+        sys.exit(child.stderr)
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(ROOT, "cohere_chat_ui.py"))
+    parser.add_argument("--child", choices=("inline", "static"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.app, args.child == "static")
+        return
+
+    print(f"{'static serving':<15} {'theme bytes':>12} {'full rerun':>11} {'theme switch':>13}")
+    for static in (False, True):
+        result = measure(args.app, static)
+        print(f"{'on' if static else 'off':<15} {result['theme']:>12,} {result['full_rerun']:>11,} {result['theme_switch']:>13,}")
+
+if __name__ == "__main__":
+    main()
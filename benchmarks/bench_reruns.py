@@ -0,0 +1,139 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🔁 RERUN BENCHMARK - FULL-SCRIPT VS FRAGMENT-SCOPED RERUNS
+# ═══════════════════════════════════════════════════════════════════
+"""Measure what one widget interaction costs at large history sizes.
+
+Run from the repository root (needs streamlit >= 1.37 for fragments):
+
+    python benchmarks/bench_reruns.py
+    python benchmarks/bench_reruns.py --sizes 1000 10000 --repeats 15
+
+Each size seeds a stored conversation with that many turns, held entirely
+in session memory, and drives the app with ``AppTest`` and the offline
+``FakeCohereClient``. Every interaction runs in its own fresh interpreter,
+which keeps the stage numbers apart.
+
+Before fragments, every interaction reran the whole script. That cost is
+the app's own ``rerun`` timer (p50) next to the ``AppTest`` wall time,
+which adds widget serialization. With fragments, the browser reruns only
+the region that owns the widget, so the cost becomes that fragment's body
+timer (``fragment_settings``, ``fragment_faq`` or
+``fragment_conversation``). ``AppTest`` always executes the full script,
+so the "after" column comes from those timers rather than from wall time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+APP = os.path.join(ROOT, "cohere_chat_ui.py")
+
+# interaction -> fragment that owns its widget
+INTERACTIONS = {
+    "settings slider": "fragment_settings",
+    "FAQ select": "fragment_faq",
+    "send message": "fragment_conversation",
+}
+
+def seed_conversation(db_path, turns):
+    """Store a conversation of ``turns`` turns and return its id."""
+    from chat_core import ConversationStore, Turn
+    store = ConversationStore(db_path, batch_size=1000)
+    conversation_id = store.create_conversation()
+    for i in range(turns):
+        store.append_turn(conversation_id, Turn(f"Question {i} about the project plan?", f"Answer {i}: " + "detail " * 40))
+    store.flush()
+    return conversation_id
+
+def stage_p50s(app):
+    """Parse ``{stage: p50 seconds}`` from the ``?debug=1`` stage table."""
+    p50s = {}
+    for block in app.markdown:
+        for line in block.value.splitlines():
+            cells = [cell.strip() for cell in line.strip("|").split("|")]
+            if len(cells) == 5 and cells[2].endswith("ms"):
+                p50s[cells[0]] = float(cells[2][:-2]) / 1000
+    return p50s
+
+def interact(app, interaction, i):
+    if interaction == "settings slider":
+        app.slider(key="max_turns").set_value(6 + i % 2)
+    elif interaction == "FAQ select":
+        app.selectbox[-1].set_value(list(app.selectbox[-1].options)[1 + i % 2])
+    else:
+        app.text_input[0].input(f"Benchmark message {i}, what changed?")
+        next(button for button in app.button if "Send" in button.label).click()
+
+def run_child(turns, interaction, repeats):
+    """Run in a child process: load the conversation, repeat one interaction."""
+    warnings.filterwarnings("ignore")
+    import cohere
+    from fake_cohere import FakeCohereClient
+    from streamlit.testing.v1 import AppTest
+    cohere.Client = lambda *args, **kwargs: FakeCohereClient()
+
+    workdir = tempfile.mkdtemp(prefix="bench-reruns-")
+    os.environ.update(
+        COHERE_API_KEY=os.getenv("COHERE_API_KEY", "offline-benchmark"),
+        CHAT_DB_PATH=os.path.join(workdir, "chat.db"),
+        CHAT_MEMORY_TURNS=str(turns + repeats + 16),
+    )
+    conversation_id = seed_conversation(os.environ["CHAT_DB_PATH"], turns)
+
+    app = AppTest.from_file(APP, default_timeout=120)
+    app.query_params["conversation"] = conversation_id
+    app.query_params["debug"] = "1"
+    app.run()
+    walls = []
+    for i in range(repeats):
+        interact(app, interaction, i)
+        t0 = time.perf_counter()
+        app.run()
+        walls.append(time.perf_counter() - t0)
+        assert not app.exception, app.exception
+    p50s = stage_p50s(app)
+    print(json.dumps({
+        "history": len(app.session_state.chat_history),
+        "wall": statistics.median(walls),
+        "rerun": p50s["rerun"],
+        "fragment": p50s[INTERACTIONS[interaction]],
+    }))
+
+def measure(turns, interaction, repeats):
+    child = subprocess.run(
+        [sys.executable, __file__, "--child", str(turns), interaction, "--repeats", str(repeats)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if child.returncode:
+        sys.exit(child.stderr)
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeats", type=int, default=9)
+    parser.add_argument("--child", nargs=2, metavar=("TURNS", "INTERACTION"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(int(args.child[0]), args.child[1], args.repeats)
+        return
+
+    print(f"{'turns':>7}  {'interaction':<16} {'before: full rerun':>18} {'AppTest wall':>13} {'after: fragment':>16} {'speed-up':>9}")
+    for turns in args.sizes:
+        for interaction in INTERACTIONS:
+            result = measure(turns, interaction, args.repeats)
+            print(
+                f"{result['history']:>7}  {interaction:<16} {result['rerun'] * 1000:>16.1f}ms {result['wall'] * 1000:>11.1f}ms"
+                f" {result['fragment'] * 1000:>14.1f}ms {result['rerun'] / max(result['fragment'], 1e-6):>8.1f}x"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧭 ROUTER BENCHMARK - FIXED MODEL VS LATENCY-AWARE ROUTING
+# ═══════════════════════════════════════════════════════════════════
+"""Compare one fixed model with auto routing on a mixed workload.
+
+Run from the repository root:
+
+    python benchmarks/bench_router.py
+    python benchmarks/bench_router.py --prompts 400 --slo 0.15
+
+Prompts are 60% short questions and 40% "explain / compare" requests, sent
+one after another through ``ChatBackend.process_message`` against the
+offline ``FakeCohereClient``, with per-model latencies scaled down to
+milliseconds. Each scenario runs once on the configured model only and once
+with ``route=True``:
+
+- healthy: the configured model takes 60ms, the fast model 15ms;
+- slow quality model: the configured model degrades to 250ms, over the SLO;
+- failing fast model: a third of the fast model's calls raise.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_core import ChatBackend
+from fake_cohere import FakeCohereClient
+from metrics import Histogram
+from model_router import ModelRouter
+
+QUALITY_MODEL = "command-nightly"
+FAST_MODEL = "command-light"
+
+SCENARIOS = {
+    "healthy": ({QUALITY_MODEL: 0.060, FAST_MODEL: 0.015}, 0.0),
+    "slow quality model": ({QUALITY_MODEL: 0.250, FAST_MODEL: 0.015}, 0.0),
+    "failing fast model": ({QUALITY_MODEL: 0.060, FAST_MODEL: 0.015}, 1 / 3),
+}
+
+class FlakyClient(FakeCohereClient):
+    """Fake client whose fast-model calls fail with probability ``failure_rate``."""
+
+    def __init__(self, failure_rate, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    def chat(self, model=None, message="", **kwargs):
+        if model == FAST_MODEL and self._rng.random() < self.failure_rate:
+            time.sleep(0.002)
+            raise ConnectionError("simulated upstream failure")
+        return super().chat(model=model, message=message, **kwargs)
+
+def make_prompts(count, seed=0):
+    rng = random.Random(seed)
+    topics = ("caching", "sqlite", "streaming", "retries", "indexes", "threads", "sessions", "tokens")
+    prompts = []
+    for i in range(count):
+        topic, other = rng.sample(topics, 2)
+        if rng.random() < 0.6:
+            prompts.append(f"What is {topic} #{i}?")
+        else:
+            prompts.append(f"Explain how {topic} works and compare it with {other} in detail, case {i}.")
+    return prompts
+
+def run(latencies, failure_rate, prompts, route, slo):
+    client = FlakyClient(failure_rate, model_latency=latencies, reply_words=12)
+    backend = ChatBackend(client, router=ModelRouter(FAST_MODEL, slo_seconds=slo, min_samples=5) if route else None)
+    session = backend.new_session()
+    latency = Histogram(window=len(prompts))
+    fast = errors = 0
+    for prompt in prompts:
+        t0 = time.perf_counter()
+        try:
+            reply = backend.process_message(session, prompt, 4, QUALITY_MODEL, route=route)
+        except ConnectionError:
+            errors += 1
+            continue
+        latency.observe(time.perf_counter() - t0)
+        fast += reply.model == FAST_MODEL
+    quantiles = latency.quantiles()
+    return {
+        "mean": latency.total / max(latency.count, 1),
+        "p95": quantiles[0.95],
+        "fast": fast / len(prompts),
+        "errors": errors / len(prompts),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--slo", type=float, default=0.15, help="latency SLO in (scaled) seconds")
+    args = parser.parse_args()
+    prompts = make_prompts(args.prompts)
+
+    print(f"{'scenario':<20} {'mode':<6} {'mean':>8} {'p95':>8} {'to fast model':>14} {'errors':>7}")
+    for name, (latencies, failure_rate) in SCENARIOS.items():
+        for route in (False, True):
+            result = run(latencies, failure_rate, prompts, route, args.slo)
+            print(
+                f"{name:<20} {'auto' if route else 'fixed':<6} {result['mean'] * 1000:>6.1f}ms {result['p95'] * 1000:>6.1f}ms"
+                f" {result['fast']:>14.0%} {result['errors']:>7.0%}"
+            )
+
+if __name__ == "__main__":
+    main()
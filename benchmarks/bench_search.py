@@ -0,0 +1,106 @@
+# ═══════════════════════════════════════════════════════════════════
+# ⏱️ BENCHMARK SUITE - CONVERSATION SEARCH
+# ═══════════════════════════════════════════════════════════════════
+"""Query latency and update cost of ``SearchIndex`` at 10k-50k turns.
+
+Run from the repository root:
+
+    pytest benchmarks/bench_search.py --benchmark-only
+
+Turns are synthetic: Zipf-distributed words from a 5k vocabulary, with
+about 60 words of AI text per turn. Queries cover a common word, a rare
+word, two ANDed words, a two-word phrase and a prefix, plus a common word
+queried right after a new turn (its term arrays rebuilt).
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+TURN_COUNTS = (10_000, 50_000)
+SYLLABLES = ("ka", "lo", "mi", "ser", "tan", "vo", "ne", "ri", "pu", "del", "fa", "go", "zen", "ix", "or", "bu")
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def make_turns(count, seed=0):
+    """``(user, ai)`` pairs of 6-12 and 40-80 Zipf-distributed words."""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(5_000, rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    turns = [
+        (
+            " ".join(rng.choices(vocabulary, weights, k=rng.randint(6, 12))) + "?",
+            " ".join(rng.choices(vocabulary, weights, k=rng.randint(40, 80))) + ".",
+        )
+        for _ in range(count)
+    ]
+    return vocabulary, turns
+
+@pytest.fixture(scope="module", params=TURN_COUNTS, ids=lambda count: f"{count}turns")
+def indexed(request):
+    vocabulary, turns = make_turns(request.param)
+    index = SearchIndex()
+    for seq, (user, ai) in enumerate(turns, start=1):
+        index.add(seq, user, ai)
+    # A phrase that really occurs: two adjacent words from a mid-conversation answer
+    words = turns[len(turns) // 2][1].split()
+    queries = {
+        "common word": vocabulary[0],
+        "rare word": vocabulary[-1],
+        "two words": f"{vocabulary[3]} {vocabulary[40]}",
+        "phrase": f'"{words[10]} {words[11]}"',
+        "prefix": vocabulary[200][:3] + "*",
+    }
+    return index, queries, turns
+
+@pytest.mark.parametrize("kind", ("common word", "rare word", "two words", "phrase", "prefix"))
+def test_query(benchmark, indexed, kind):
+    index, queries, _ = indexed
+    results = benchmark(index.search, queries[kind], 20)
+    benchmark.extra_info["query"] = queries[kind]
+    if kind == "phrase":
+        assert results
+
+def test_add_turn(benchmark, indexed):
+    """Cost of indexing one new turn (what each sent message pays)."""
+    index, _, turns = indexed
+    seqs = iter(range(len(turns) + 1, 10**9))
+
+    def run():
+        user, ai = turns[next(seqs) % len(turns)]
+        index.add(next(seqs), user, ai)
+
+    benchmark(run)
+
+def test_query_after_add(benchmark, indexed):
+    """A common-word query right after a new turn, whose words are no longer cached as arrays."""
+    index, queries, turns = indexed
+    seqs = iter(range(10**9, 2 * 10**9))
+
+    def setup():
+        user, ai = turns[0]
+        index.add(next(seqs), f"{queries['common word']} {user}", ai)
+        return (queries["common word"], 20), {}
+
+    benchmark.pedantic(index.search, setup=setup, rounds=30)
+
+def test_build(benchmark):
+    """Building the index for a 10k-turn conversation on its first search."""
+    _, turns = make_turns(10_000)
+
+    def run():
+        index = SearchIndex()
+        for seq, (user, ai) in enumerate(turns, start=1):
+            index.add(seq, user, ai)
+        return index
+
+    assert len(benchmark.pedantic(run, rounds=3)) == len(turns)
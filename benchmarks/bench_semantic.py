@@ -0,0 +1,139 @@
+# ═══════════════════════════════════════════════════════════════════
+# ⏱️ BENCHMARK SUITE - SEMANTIC CACHE
+# ═══════════════════════════════════════════════════════════════════
+"""Lookup latency and hit quality of ``SemanticCache`` at 1k-100k entries.
+
+Run from the repository root:
+
+    pytest benchmarks/bench_semantic.py --benchmark-only
+
+Questions are synthetic (an opener plus Zipf-distributed words), so the
+numbers reflect a varied question stream rather than one FAQ asked in many
+forms. Hit quality is the share of lightly reworded questions (case, punctuation,
+a filler word) that come back with the answer to their original; it is
+stored in each result's ``extra_info``.
+
+Case changes and "please" barely move a hashed vector, so hit quality alone
+says nothing about wrong answers. ``test_near_misses`` adds a labelled set of
+real question pairs: rewordings that should hit, and near misses (one word
+swapped, changing the answer) that must not. It reports the hit rate on the
+first and the false-positive rate on the second, with and without the
+content-word check.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticCache
+
+CACHE_SIZES = (1_000, 10_000, 100_000)
+MODEL = "command-nightly"
+OPENERS = ("how do i", "what is", "why does", "can you explain", "what's the best way to", "is it possible to")
+SYLLABLES = ("ka", "lo", "mi", "ser", "tan", "vo", "ne", "ri", "pu", "del", "fa", "go", "zen", "ix", "or", "bu")
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def make_questions(count, seed=0):
+    """Distinct questions: an opener plus 4-9 words drawn Zipf-like from a 5k vocabulary."""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(5_000, rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    questions = set()
+    while len(questions) < count:
+        words = rng.choices(vocabulary, weights, k=rng.randint(4, 9))
+        questions.add(f"{rng.choice(OPENERS).capitalize()} {' '.join(words)}?")
+    return sorted(questions)
+
+def reword(question, rng):
+    question = question.rstrip("?")
+    return rng.choice((question.lower(), question.upper(), question + " please", "please " + question))
+
+@pytest.fixture(scope="module", params=CACHE_SIZES, ids=lambda size: f"{size}entries")
+def filled(request):
+    size = request.param
+    questions = make_questions(size)
+    cache = SemanticCache(max_entries=size)
+    cache.put_many(MODEL, questions, [f"answer {i}" for i in range(size)])
+    rng = random.Random(1)
+    sample = rng.sample(range(size), 200)
+    probes = [(reword(questions[i], rng), f"answer {i}") for i in sample]
+    return cache, probes
+
+def test_lookup(benchmark, filled):
+    cache, probes = filled
+    cycle = iter(range(10**9))
+
+    def run():
+        question, _ = probes[next(cycle) % len(probes)]
+        return cache.get(MODEL, question)
+
+    benchmark(run)
+    found = [cache.get(MODEL, question) for question, _ in probes]
+    quality = sum(1 for match, (_, answer) in zip(found, probes) if match and match[0] == answer) / len(probes)
+    benchmark.extra_info["hit_quality"] = quality
+    benchmark.extra_info["entries"] = len(cache)
+    assert quality >= 0.95
+
+def test_lookup_miss(benchmark, filled):
+    cache, _ = filled
+    assert benchmark(cache.get, MODEL, "Tell me a story about dragons") is None
+
+# (cached question, new question) pairs that should get the cached answer
+REWORDINGS = (
+    ("What can you do?", "what can you do"),
+    ("How do I sort a list in Python?", "how do i sort a list in python please"),
+    ("What is the capital of France?", "Tell me, what is the capital of France?"),
+    ("How do I reverse a string in JavaScript?", "How can I reverse a string in JavaScript"),
+    ("Explain the difference between TCP and UDP", "Can you explain the difference between UDP and TCP?"),
+    ("What is a closure in JavaScript?", "what's a closure in javascript"),
+)
+# Pairs that look alike but need a different answer
+NEAR_MISSES = (
+    ("Write a python function that returns the sum of a list of integers",
+     "Write a python function that returns the product of a list of integers"),
+    ("What happens if I mix bleach and ammonia?", "What happens if I mix bleach and vinegar?"),
+    ("What is 2+2?", "What is 2+3?"),
+    ("How do I sort a list in Python?", "How do I sort a list in Java?"),
+    ("What is the capital of France?", "What is the capital of Spain?"),
+    ("How do I convert Celsius to Fahrenheit?", "How do I convert Fahrenheit to Kelvin?"),
+    ("Is it safe to take ibuprofen with alcohol?", "Is it safe to take acetaminophen with alcohol?"),
+    ("How do I delete a branch in git?", "How do I rename a branch in git?"),
+    ("What is the time complexity of quicksort?", "What is the space complexity of quicksort?"),
+    ("How do I reverse a string in JavaScript?", "How do I reverse an array in JavaScript?"),
+)
+
+def classify_pairs(same_terms):
+    """Return ``(hit rate on rewordings, false-positive rate on near misses)``."""
+    cache = SemanticCache(same_terms=same_terms)
+    pairs = [(cached, asked, True) for cached, asked in REWORDINGS] + [(cached, asked, False) for cached, asked in NEAR_MISSES]
+    hits = false_positives = 0
+    for cached, asked, should_hit in pairs:
+        cache.clear()
+        cache.put(MODEL, cached, cached)
+        match = cache.get(MODEL, asked)
+        if should_hit:
+            hits += match is not None and match[0] == cached
+        else:
+            false_positives += match is not None
+    return hits / len(REWORDINGS), false_positives / len(NEAR_MISSES)
+
+def test_near_misses(benchmark):
+    hit_rate, false_positive_rate = benchmark(classify_pairs, True)
+    _, unchecked_false_positive_rate = classify_pairs(False)
+    benchmark.extra_info["hit_rate"] = hit_rate
+    benchmark.extra_info["false_positive_rate"] = false_positive_rate
+    benchmark.extra_info["false_positive_rate_without_term_check"] = unchecked_false_positive_rate
+    print(
+        f"\nrewordings hit {hit_rate:.0%}, near misses served {false_positive_rate:.0%}"
+        f" ({unchecked_false_positive_rate:.0%} without the content-word check)"
+    )
+    assert false_positive_rate == 0.0
+    assert hit_rate >= 0.3  # hashing only catches light rewordings; see the README
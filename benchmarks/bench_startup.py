@@ -0,0 +1,108 @@
+# ═══════════════════════════════════════════════════════════════════
+# ⏱️ STARTUP BENCHMARK - IMPORT TIME AND TIME TO FIRST RESPONSE
+# ═══════════════════════════════════════════════════════════════════
+"""Measure cold-start costs in fresh interpreters.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py            # offline, fake replies
+    python benchmarks/bench_startup.py --live     # real Cohere (needs COHERE_API_KEY)
+    python benchmarks/bench_startup.py --stub     # real client against a local stub server
+
+Import times are medians over several fresh processes. Time to first
+response compares building the client when the first message arrives (the
+old behaviour) with ``PrewarmedClient`` started at process start. Offline,
+the client factory still imports ``cohere`` and builds a real
+``cohere.Client``, so that cost is measured, but replies come from
+``FakeCohereClient``. With ``--stub``, the real client talks HTTP to a
+``StubCohereServer`` on localhost, warm-up request included.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+IMPORTS = (
+    ("chat_core", "import chat_core"),
+    ("chat_core + fpdf (eager exports)", "import chat_core, fpdf"),
+    ("cohere", "import cohere"),
+    ("streamlit", "import streamlit"),
+)
+
+def time_import(statement, runs):
+    """Median wall time of ``statement`` in ``runs`` fresh interpreters."""
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    samples = [
+        float(subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout)
+        for _ in range(runs)
+    ]
+    return statistics.median(samples)
+
+def first_response(mode, think, live):
+    """Run in a child process: start up, wait ``think`` seconds, send one message."""
+    started = time.perf_counter()
+    from chat_core import ChatBackend
+    from fake_cohere import FakeCohereClient
+    from resilient_client import PrewarmedClient, ResilientClient
+
+    def factory():
+        import cohere
+        client = cohere.Client(os.getenv("COHERE_API_KEY", "offline-benchmark"), timeout=30)
+        return client if live else FakeCohereClient(latency=0.2)
+
+    warmup = (lambda client: client.models.list(page_size=1)) if live else None
+    if mode == "prewarmed":
+        client = ResilientClient(PrewarmedClient(factory, warmup=warmup))
+    else:
+        client = None
+    backend_ready = time.perf_counter()
+    time.sleep(think)  # the user reads the page and types
+
+    sent = time.perf_counter()
+    if client is None:
+        client = ResilientClient(factory())
+    backend = ChatBackend(client)
+    backend.process_message(backend.new_session(), "hello there", 6, "command-nightly")
+    done = time.perf_counter()
+    print(f"{backend_ready - started} {done - sent} {done - started}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--think", type=float, default=1.0, help="seconds between startup and the first message")
+    parser.add_argument("--live", action="store_true", help="call the real Cohere API")
+    parser.add_argument("--stub", action="store_true", help="call a local stub server with the real client")
+    parser.add_argument("--child", choices=("cold", "prewarmed"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        first_response(args.child, args.think, args.live)
+        return
+
+    print(f"{'import':<34} {'median ms':>10}")
+    for label, statement in IMPORTS:
+        print(f"{label:<34} {time_import(statement, args.runs) * 1000:>10.0f}")
+
+    env = None
+    if args.stub:
+        from stub_cohere_server import StubCohereServer
+        stub = StubCohereServer(latency="fixed:0.2").start()
+        env = dict(os.environ, CO_API_URL=stub.url, COHERE_API_KEY="stub")
+        args.live = True
+
+    print(f"\n{'client':<10} {'startup ms':>11} {'first reply ms':>15} {'total ms':>9}")
+    for mode in ("cold", "prewarmed"):
+        command = [sys.executable, __file__, "--child", mode, "--think", str(args.think)] + (["--live"] if args.live else [])
+        rows = [
+            [float(value) for value in subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout.split()]
+            for _ in range(args.runs)
+        ]
+        startup, reply, total = (statistics.median(column) * 1000 for column in zip(*rows))
+        print(f"{mode:<10} {startup:>11.0f} {reply:>15.0f} {total:>9.0f}")
+
+if __name__ == "__main__":
+    main()
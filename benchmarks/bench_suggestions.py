@@ -0,0 +1,59 @@
+# ═══════════════════════════════════════════════════════════════════
+# ⏱️ MICRO-BENCHMARK - SUGGESTION LOOKUP
+# ═══════════════════════════════════════════════════════════════════
+"""Compare the trie-backed SuggestionEngine with the old linear substring scan.
+
+Run from the repository root:
+
+    python benchmarks/bench_suggestions.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suggestions import DEFAULT_CORPUS_PATH, SuggestionEngine, load_corpus
+
+INPUTS = [
+    "hello, can you explain how this code works?",
+    "please summarize the meeting notes from yesterday",
+    "my python script fails when I run it from cron",
+    "tell me a story",
+]
+
+def linear_scan(suggestion_map, user_input):
+    """The original get_suggestions lookup: substring test against every key.
+
+    It stops at the first hit, so inputs that match nothing (or only late
+    keys) pay for a scan of the whole map.
+    """
+    user_lower = user_input.lower()
+    for key, suggestion in suggestion_map.items():
+        if key in user_lower:
+            return suggestion
+    return None
+
+def synthetic_corpus(size, seed=0):
+    """Base corpus padded with random one- to three-word keyword entries."""
+    rng = random.Random(seed)
+    entries = list(load_corpus(DEFAULT_CORPUS_PATH))
+    while len(entries) < size:
+        words = " ".join(f"kw{rng.randrange(size * 4)}" for _ in range(rng.randint(1, 3)))
+        entries.append({"keywords": words, "suggestion": f"suggestion for {words}", "weight": rng.random()})
+    return entries
+
+def main(sizes=(12, 1_000, 10_000), number=2_000):
+    print(f"{'entries':>8} {'linear µs':>10} {'engine µs':>10} {'speedup':>8}")
+    for size in sizes:
+        entries = synthetic_corpus(size)
+        suggestion_map = {entry["keywords"]: entry["suggestion"] for entry in entries}
+        engine = SuggestionEngine(entries)
+        linear = timeit.timeit(lambda: [linear_scan(suggestion_map, text) for text in INPUTS], number=number)
+        indexed = timeit.timeit(lambda: [engine.suggest(text) for text in INPUTS], number=number)
+        per_call = number * len(INPUTS)
+        print(f"{size:>8} {linear / per_call * 1e6:>10.2f} {indexed / per_call * 1e6:>10.2f} {linear / indexed:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# ═══════════════════════════════════════════════════════════════════
+# ⏱️ BENCHMARK SUITE - HISTORY EXPORT AND IMPORT
+# ═══════════════════════════════════════════════════════════════════
+"""pytest-benchmark suite for exporting and importing long conversations.
+
+A SQLite-backed conversation of ``TURNS`` turns is exported in each format
+straight from the store, and JSONL exports are imported back into a fresh
+session. Peak Python memory of one run (tracemalloc) is recorded in each
+case's ``extra_info``. Run from the repository root:
+
+    pytest benchmarks/bench_transfer.py --benchmark-only
+    pytest benchmarks/bench_transfer.py --benchmark-only --benchmark-columns=mean,rounds
+"""
+import os
+import sys
+import tracemalloc
+from io import BytesIO
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_core import ChatBackend, ConversationStore, Turn, build_export, iter_import_turns
+
+TURNS = 100_000
+
+def peak_megabytes(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+@pytest.fixture(scope="module")
+def backend(tmp_path_factory):
+    store = ConversationStore(str(tmp_path_factory.mktemp("transfer") / "chat.db"))
+    return ChatBackend(None, store=store)
+
+@pytest.fixture(scope="module")
+def session(backend):
+    session = backend.new_session()
+    backend.import_turns(
+        session,
+        (Turn(f"question {i}: how do I fix my python code?", f"answer {i}: " + "details " * 20) for i in range(TURNS)),
+    )
+    return session
+
+@pytest.mark.parametrize("fmt", ("json", "jsonl", "jsonl_gz"))
+def test_export(benchmark, backend, session, fmt):
+    benchmark.extra_info["peak_mb"] = round(peak_megabytes(build_export, fmt, backend.iter_turns(session)), 1)
+    data = benchmark.pedantic(lambda: build_export(fmt, backend.iter_turns(session)), rounds=3)
+    benchmark.extra_info["bytes"] = len(data)
+    assert data
+
+@pytest.mark.parametrize("fmt", ("jsonl", "jsonl_gz"))
+def test_import(benchmark, backend, session, fmt):
+    data = build_export(fmt, backend.iter_turns(session))
+
+    def run(target):
+        return backend.import_turns(target, iter_import_turns(BytesIO(data)))
+
+    benchmark.extra_info["peak_mb"] = round(peak_megabytes(run, backend.new_session()), 1)
+    count = benchmark.pedantic(run, setup=lambda: ((backend.new_session(),), {}), rounds=3)
+    assert count == TURNS
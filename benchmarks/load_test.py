@@ -0,0 +1,349 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🏋️ LOAD TEST - CONCURRENT USERS AGAINST ONE APP INSTANCE
+# ═══════════════════════════════════════════════════════════════════
+"""Load-test one app instance with N concurrent simulated users, offline.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --sessions 1 10 50 --history 0 2000 --messages 5
+    python benchmarks/load_test.py --latency lognormal:0.8,0.5 --error-rate 0.02 --json load.json
+    python benchmarks/load_test.py --env CHAT_LLM_WORKERS=16 --env CHAT_MEMORY_TURNS=500
+
+Each ``(sessions, history)`` point gets a fresh setup:
+
+1. ``stub_cohere_server.StubCohereServer`` starts on 127.0.0.1, with the
+   configured latency distribution, token delay and error rate.
+2. ``sessions`` stored conversations are seeded with ``history`` turns each.
+3. ``streamlit run cohere_chat_ui.py`` starts in a subprocess. Its real
+   ``cohere.Client`` points at the stub through ``CO_API_URL``.
+4. One warm-up user loads the page and sends a message. This imports the
+   client and fills the shared caches before the memory baseline is taken.
+5. Every simulated user opens its own websocket and talks Streamlit's
+   protocol like a browser tab. It loads ``?conversation=<id>``, then sends
+   ``messages`` messages through the chat form, with a randomized think
+   time between them. Messages take the real ``process_message`` and
+   render path, including fragment reruns where Streamlit has them.
+
+Nothing leaves the machine. Columns:
+
+- ``msg/s``: messages answered per second of wall time.
+- ``e2e p50/p99``: from pressing Send to the end of the rerun that shows
+  the reply.
+- ``load p50``: opening the page, a full-script rerun.
+- ``render p50/p99``: the app's own ``chat_render`` stage, which draws the
+  transcript.
+- ``MB/session``: growth of the server's RSS over the warm-up baseline,
+  divided by ``sessions``. RSS is read from ``/proc`` and shows ``-`` off
+  Linux.
+- ``errors``: messages that ended in an error alert, an exception or a
+  timeout.
+- ``upstream err``: share of stub requests that failed. The app's retries
+  hide most of them from users.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chat_core import ConversationStore, Turn
+from metrics import Histogram
+from stub_cohere_server import StubCohereServer
+
+APP = os.path.join(ROOT, "cohere_chat_ui.py")
+QUESTIONS = (
+    "What is a context window?",
+    "How should I cache API responses in Python?",
+    "Summarize what we discussed so far.",
+    "Give me three ideas for a weekend project.",
+    "Why is my SQLite database locked?",
+    "Can you export this chat?",
+)
+
+# ───────────────────────────────────────────────────────────────────
+# 1️⃣ SIMULATED USER
+# ───────────────────────────────────────────────────────────────────
+class SimulatedUser:
+    """One browser tab, speaking Streamlit's websocket protocol."""
+
+    def __init__(self, port, query_string="", timeout=120.0):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.query_string = query_string
+        self.timeout = timeout
+        self.widgets = {}  # label -> (widget id, fragment id)
+        self._ws = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+        self._ws = await websocket_connect(self.url, max_message_size=256 * 1024 * 1024)
+
+    def close(self):
+        if self._ws is not None:
+            self._ws.close()
+
+    def widget(self, label_part):
+        return next(value for label, value in self.widgets.items() if label_part in label)
+
+    async def rerun(self, widget_states=(), fragment_id=""):
+        """Request a rerun, read until it finishes; return ``(seconds, failed)``."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        message = BackMsg()
+        message.rerun_script.query_string = self.query_string
+        if fragment_id:
+            message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(widget_states)
+        t0 = time.perf_counter()
+        await self._ws.write_message(message.SerializeToString(), binary=True)
+        try:
+            failed = await asyncio.wait_for(self._read_run(), self.timeout)
+        except asyncio.TimeoutError:
+            failed = True
+        return time.perf_counter() - t0, failed
+
+    async def _read_run(self):
+        from streamlit.proto.Alert_pb2 import Alert
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        failed = False
+        while True:
+            raw = await self._ws.read_message()
+            if raw is None:
+                return True  # connection closed
+            message = ForwardMsg()
+            message.ParseFromString(raw)
+            kind = message.WhichOneof("type")
+            if kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+                element = message.delta.new_element
+                element_type = element.WhichOneof("type")
+                proto = getattr(element, element_type)
+                if getattr(proto, "id", ""):
+                    self.widgets[getattr(proto, "label", element_type)] = (proto.id, getattr(message.delta, "fragment_id", ""))
+                if element_type == "exception" or (element_type == "alert" and proto.format == Alert.ERROR):
+                    failed = True
+            elif kind == "script_finished":
+                if message.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                return failed or message.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR
+
+    async def load(self):
+        return await self.rerun()
+
+    async def send_message(self, text, stream=True):
+        """Type ``text`` and press Send; return ``(seconds, failed)``."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        input_id, fragment_id = self.widget("Type your message")
+        send_id, _ = self.widget("Send")
+        states = [WidgetState(id=input_id, string_value=text), WidgetState(id=send_id, trigger_value=True)]
+        if not stream:
+            states.append(WidgetState(id=self.widget("Stream replies")[0], bool_value=False))
+        return await self.rerun(states, fragment_id=fragment_id)
+
+# ───────────────────────────────────────────────────────────────────
+# 2️⃣ ONE LOAD POINT
+# ───────────────────────────────────────────────────────────────────
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def rss_megabytes(pid):
+    """Resident set size of ``pid`` in MB, or None where ``/proc`` is missing."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+def seed_conversations(db_path, count, turns):
+    """Store ``count`` conversations of ``turns`` turns each and return their ids."""
+    store = ConversationStore(db_path, batch_size=1000)
+    ids = []
+    for _ in range(count):
+        conversation_id = store.create_conversation()
+        store.append_turns(
+            conversation_id,
+            (Turn(f"Earlier question {i} about the rollout plan?", f"Earlier answer {i}: " + "detail " * 40) for i in range(turns)),
+        )
+        ids.append(conversation_id)
+    store.flush()
+    return ids
+
+def start_app(port, env, log_path):
+    command = [
+        sys.executable, "-m", "streamlit", "run", APP,
+        "--server.headless=true", f"--server.port={port}", "--server.address=127.0.0.1",
+        "--server.enableXsrfProtection=false", "--server.enableCORS=false",
+        "--server.fileWatcherType=none", "--browser.gatherUsageStats=false",
+    ]
+    log = open(log_path, "wb")
+    app = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if app.poll() is not None:
+            break
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1).read()
+            return app
+        except OSError:
+            time.sleep(0.2)
+    app.kill()
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        sys.exit(f"❌ App did not start:\n{f.read()[-3000:]}")
+
+async def run_user(port, conversation_id, index, args, rng, results):
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    user = SimulatedUser(port, f"conversation={conversation_id}", timeout=args.timeout)
+    await user.connect()
+    try:
+        seconds, failed = await user.load()
+        results["load"].append(seconds)
+        results["errors"] += failed
+        for j in range(args.messages):
+            question = f"{QUESTIONS[(index + j) % len(QUESTIONS)]} (user {index}, message {j})"
+            seconds, failed = await user.send_message(question, stream=not args.no_stream)
+            results["errors"] += failed
+            if not failed:
+                results["e2e"].append(seconds)
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think)
+    finally:
+        user.close()
+
+async def warm_up(port):
+    user = SimulatedUser(port)
+    await user.connect()
+    try:
+        await user.load()
+        await user.send_message("Warm-up: hello?")
+    finally:
+        user.close()
+
+async def drive(port, conversation_ids, args):
+    rng = random.Random(0)
+    results = {"load": [], "e2e": [], "errors": 0}
+    await asyncio.gather(*(
+        run_user(port, conversation_id, i, args, random.Random(rng.random()), results)
+        for i, conversation_id in enumerate(conversation_ids)
+    ))
+    return results
+
+def read_stage(metrics_path, stage):
+    try:
+        with open(metrics_path, encoding="utf-8") as f:
+            return json.load(f)["stages"].get(stage, {})
+    except (OSError, ValueError):
+        return {}
+
+def run_point(sessions, history, args):
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    db_path = os.path.join(workdir, "chat.db")
+    metrics_path = os.path.join(workdir, "metrics.json")
+    conversation_ids = seed_conversations(db_path, sessions, history)
+    stub = StubCohereServer(
+        latency=args.latency, token_delay=args.token_delay, error_rate=args.error_rate, seed=sessions * 7919 + history
+    ).start()
+    port = free_port()
+    env = dict(
+        os.environ,
+        COHERE_API_KEY="stub",
+        CO_API_URL=stub.url,
+        CHAT_DB_PATH=db_path,
+        CHAT_METRICS_PATH=metrics_path,
+        CHAT_METRICS_INTERVAL="0.5",
+        CHAT_LLM_RATE_PER_MINUTE="0",  # the stub has no quota
+    )
+    env.update(setting.split("=", 1) for setting in args.env)
+    app = start_app(port, env, os.path.join(workdir, "app.log"))
+    try:
+        asyncio.run(warm_up(port))
+        baseline = rss_megabytes(app.pid)
+        started = time.perf_counter()
+        results = asyncio.run(drive(port, conversation_ids, args))
+        elapsed = time.perf_counter() - started
+        after = rss_megabytes(app.pid)
+        time.sleep(1.0)  # let the app's metrics dumper catch up
+        render = read_stage(metrics_path, "chat_render")
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        stub.stop()
+
+    e2e = Histogram(window=len(results["e2e"]) or 1)
+    for seconds in results["e2e"]:
+        e2e.observe(seconds)
+    quantiles = e2e.quantiles()
+    return {
+        "sessions": sessions,
+        "history": history,
+        "messages": len(results["e2e"]),
+        "throughput": len(results["e2e"]) / elapsed,
+        "e2e_p50": quantiles[0.5],
+        "e2e_p99": quantiles[0.99],
+        "load_p50": statistics.median(results["load"]) if results["load"] else None,
+        "render_p50": render.get("p50"),
+        "render_p99": render.get("p99"),
+        "mb_per_session": (after - baseline) / sessions if after is not None and baseline is not None else None,
+        "errors": results["errors"],
+        "upstream": stub.stats(),
+    }
+
+# ───────────────────────────────────────────────────────────────────
+# 3️⃣ COMMAND LINE
+# ───────────────────────────────────────────────────────────────────
+def format_row(result):
+    def ms(value):
+        return f"{value * 1000:.0f}ms" if value is not None else "-"
+
+    mb = f"{result['mb_per_session']:.2f}" if result["mb_per_session"] is not None else "-"
+    upstream = result["upstream"]
+    return (
+        f"{result['sessions']:>8} {result['history']:>8} {result['throughput']:>7.2f}"
+        f" {ms(result['e2e_p50']):>9} {ms(result['e2e_p99']):>9} {ms(result['load_p50']):>9}"
+        f" {ms(result['render_p50']):>10} {ms(result['render_p99']):>10} {mb:>11} {result['errors']:>7}"
+        f" {upstream['errors'] / max(upstream['requests'], 1):>13.1%}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 20], help="concurrent users per point")
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 1000], help="stored turns per conversation")
+    parser.add_argument("--messages", type=int, default=5, help="messages each user sends")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between a user's messages")
+    parser.add_argument("--ramp", type=float, default=2.0, help="users start spread over this many seconds")
+    parser.add_argument("--latency", default="lognormal:0.8,0.5", help="stub latency before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="stub seconds between streamed words")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub chat requests that fail")
+    parser.add_argument("--no-stream", action="store_true", help="turn off streamed replies")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for one rerun")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app setting (repeatable)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    print(
+        f"{'sessions':>8} {'history':>8} {'msg/s':>7} {'e2e p50':>9} {'e2e p99':>9} {'load p50':>9}"
+        f" {'render p50':>10} {'render p99':>10} {'MB/session':>11} {'errors':>7} {'upstream err':>13}"
+    )
+    results = []
+    for history in args.history:
+        for sessions in args.sessions:
+            result = run_point(sessions, history, args)
+            results.append(result)
+            print(format_row(result), flush=True)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1236 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧠 CHAT CORE - UI-FREE CHAT LOGIC
+# ═══════════════════════════════════════════════════════════════════
+"""Core chat logic with no Streamlit dependency.
+
+Everything the app does besides drawing widgets lives here: turn records
+and the live ring buffer, the token-budgeted context window, rolling
+summaries, exports, the SQLite conversation store, the response cache and
+``ChatBackend``, which runs a message end to end against an injected LLM
+client. ``cohere_chat_ui.py`` is a thin Streamlit front end over it, and
+the benchmarks drive it headlessly with ``fake_cohere.FakeCohereClient``.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import math
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from io import BytesIO, StringIO, TextIOWrapper
+from itertools import islice
+
+from metrics import Metrics
+from resilient_client import CircuitOpenError
+from scheduler import BACKGROUND, INTERACTIVE, ScheduledClient
+from singleflight import FlightAbandoned, SingleFlight
+from suggestions import DEFAULT_CORPUS_PATH, SuggestionEngine
+
+DEFAULT_MEMORY_TURNS = 100
+
+# ───────────────────────────────────────────────────────────────────
+# 1️⃣ RESPONSE CACHE
+# ───────────────────────────────────────────────────────────────────
+class ResponseCache:
+    """Thread-safe LRU + TTL cache of replies keyed on (model_name, prompt).
+
+    Entries live in an in-memory ``OrderedDict`` bounded to ``max_entries``.
+    When ``db_path`` is set, entries are also written to SQLite so the cache
+    stays warm across server restarts; memory misses fall through to disk.
+
+    The disk tier is purged at most every ``purge_interval`` seconds, or
+    after a tenth of ``max_disk_entries`` writes: expired rows go first, then
+    the rows closest to expiry until at most ``max_disk_entries`` remain.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=3600.0, db_path=None, max_disk_entries=10000, purge_interval=60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.purge_interval = purge_interval
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._writes_since_purge = 0
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, reply TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model_name, prompt):
+        return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, model_name, prompt):
+        """Return the cached reply, or None on a miss or expired entry."""
+        key = self.make_key(model_name, prompt)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                reply, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return reply
+                del self._entries[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT reply, expires FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, model_name, prompt, reply):
+        key = self.make_key(model_name, prompt)
+        expires = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, reply, expires)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, reply, expires) VALUES (?, ?, ?)",
+                    (key, reply, expires),
+                )
+                self._writes_since_purge += 1
+                now = time.time()
+                if (
+                    now - self._last_purge >= self.purge_interval
+                    or self._writes_since_purge >= max(1, self.max_disk_entries // 10)
+                ):
+                    self._purge(now)
+                self._db.commit()
+
+    def _purge(self, now):
+        """Delete expired rows, then the rows closest to expiry beyond ``max_disk_entries``."""
+        purged = self._db.execute("DELETE FROM responses WHERE expires <= ?", (now,)).rowcount
+        excess = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            purged += self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY expires LIMIT ?)", (excess,)
+            ).rowcount
+        self.purged += purged
+        self._last_purge = now
+        self._writes_since_purge = 0
+
+    def _store(self, key, reply, expires):
+        self._entries[key] = (reply, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "purged": self.purged,
+        }
+
+# ───────────────────────────────────────────────────────────────────
+# 2️⃣ TURN RECORDS
+# ───────────────────────────────────────────────────────────────────
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+OVERFLOW_POLICIES = ("spill", "drop", "summarize")
+
+def format_timestamp(ts):
+    return time.strftime(TIME_FORMAT, time.localtime(ts)) if ts else ""
+
+def parse_timestamp(text):
+    """Parse a ``TIME_FORMAT`` string back to epoch seconds (``now`` if invalid)."""
+    try:
+        return time.mktime(time.strptime(text, TIME_FORMAT))
+    except (TypeError, ValueError):
+        return time.time()
+
+class Turn:
+    """One exchange of the conversation.
+
+    ``ts`` is epoch seconds and is only formatted (``time``) for display and
+    export. ``tokens`` is the prompt-size estimate, computed once here.
+    """
+
+    __slots__ = ("user", "ai", "ts", "seq", "tokens")
+
+    def __init__(self, user, ai, ts=None, seq=None):
+        self.user = user
+        self.ai = ai
+        self.ts = time.time() if ts is None else ts
+        self.seq = seq
+        self.tokens = estimate_tokens(format_turn(self))
+
+    @property
+    def time(self):
+        return format_timestamp(self.ts)
+
+    def to_dict(self):
+        return {"user": self.user, "ai": self.ai, "time": self.time}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a turn from ``to_dict`` output; an epoch ``ts`` wins over ``time``."""
+        ts = data.get("ts")
+        if not isinstance(ts, (int, float)):
+            ts = parse_timestamp(data.get("time"))
+        return cls(data.get("user", ""), data.get("ai", ""), ts=ts)
+
+class TurnBuffer:
+    """Bounded ring buffer of live turns, with the running summary pinned first.
+
+    Reads behave like a list of turns (summary first, then oldest to newest).
+    When ``capacity`` is reached, appending evicts the oldest turn according to
+    ``policy``:
+
+    - ``"spill"``: the turn leaves memory but stays readable from the store.
+    - ``"drop"``: the turn is discarded, in memory and in the store.
+    - ``"summarize"``: the turn is queued in ``overflow`` to be folded into
+      the running summary.
+    """
+
+    __slots__ = ("capacity", "policy", "summary", "overflow", "generation", "_ring", "_head", "_size")
+
+    def __init__(self, capacity, policy="spill", turns=(), summary=None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy!r}")
+        self.capacity = capacity
+        self.policy = policy
+        self.summary = summary
+        self.overflow = []
+        self.generation = 0
+        self._ring = [None] * capacity
+        self._head = 0
+        self._size = 0
+        for turn in turns:
+            self.append(turn)
+
+    def __len__(self):
+        return self._size + (self.summary is not None)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        if self.summary is not None:
+            yield self.summary
+        yield from self.turns()
+
+    def __reversed__(self):
+        for i in range(self._size - 1, -1, -1):
+            yield self._ring[(self._head + i) % self.capacity]
+        if self.summary is not None:
+            yield self.summary
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if self.summary is not None:
+            if index == 0:
+                return self.summary
+            index -= 1
+        if not 0 <= index < self._size:
+            raise IndexError("TurnBuffer index out of range")
+        return self._ring[(self._head + index) % self.capacity]
+
+    def turns(self):
+        """Return the live turns (without the summary), oldest first."""
+        return [self._ring[(self._head + i) % self.capacity] for i in range(self._size)]
+
+    def append(self, turn):
+        """Append ``turn`` and return the evicted turn, if any."""
+        evicted = None
+        if self._size == self.capacity:
+            evicted = self._popleft()
+            if self.policy == "summarize":
+                self.overflow.append(evicted)
+        self._ring[(self._head + self._size) % self.capacity] = turn
+        self._size += 1
+        return evicted
+
+    def extend(self, turns):
+        """Append ``turns``, spilling whatever they push out regardless of ``policy``."""
+        for turn in turns:
+            if self._size == self.capacity:
+                self._popleft()
+            self._ring[(self._head + self._size) % self.capacity] = turn
+            self._size += 1
+
+    def _popleft(self):
+        turn = self._ring[self._head]
+        self._ring[self._head] = None
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
+        return turn
+
+    def set_summary(self, summary_turn, through_seq):
+        """Pin a new summary and release the turns (seq <= ``through_seq``) it covers."""
+        self.summary = summary_turn
+        self.overflow = [turn for turn in self.overflow if turn.seq > through_seq]
+        while self._size and self._ring[self._head].seq <= through_seq:
+            self._popleft()
+
+    def clear(self):
+        self._ring = [None] * self.capacity
+        self._head = 0
+        self._size = 0
+        self.summary = None
+        self.overflow = []
+        self.generation += 1
+
+    def memory_bytes(self):
+        """Approximate bytes held by this buffer and its turns."""
+        total = sys.getsizeof(self) + sys.getsizeof(self._ring) + sys.getsizeof(self.overflow)
+        for turn in list(self) + self.overflow:
+            total += sys.getsizeof(turn) + sys.getsizeof(turn.user) + sys.getsizeof(turn.ai) + sys.getsizeof(turn.ts)
+        return total
+
+# ───────────────────────────────────────────────────────────────────
+# 3️⃣ CONTEXT WINDOW
+# ───────────────────────────────────────────────────────────────────
+DEFAULT_TOKEN_BUDGET = 2048
+
+def estimate_tokens(text):
+    """Cheap, offline token estimate (~4 characters per token)."""
+    return max(1, (len(text) + 3) // 4)
+
+def format_turn(turn):
+    """Format one history turn as it appears in the prompt."""
+    return f"Human: {turn.user}\nAI: {turn.ai}\n"
+
+def format_question(user_input):
+    """Format the pending user message that closes the prompt."""
+    return f"Human: {user_input}\nAI (answer clearly and completely):"
+
+def select_context(history, token_budget, max_turns=None):
+    """Return the newest turns of ``history`` that fit ``token_budget``, oldest first.
+
+    Uses the token count cached on each turn, so selection never re-measures text.
+    """
+    selected = []
+    used = 0
+    for turn in reversed(history):
+        if (max_turns and len(selected) >= max_turns) or used + turn.tokens > token_budget:
+            break
+        selected.append(turn)
+        used += turn.tokens
+    selected.reverse()
+    return selected, used
+
+def build_context_prompt(history, user_input, token_budget=DEFAULT_TOKEN_BUDGET, max_turns=None):
+    """Build the prompt and report ``(prompt, tokens, turns)`` actually sent."""
+    question = format_question(user_input)
+    question_tokens = estimate_tokens(question)
+    selected, used = select_context(history, max(0, token_budget - question_tokens), max_turns)
+    prompt = "".join([format_turn(turn) for turn in selected] + [question])
+    return prompt, used + question_tokens, len(selected)
+
+# ───────────────────────────────────────────────────────────────────
+# 4️⃣ PROMPTS, SUMMARIES & SUGGESTIONS
+# ───────────────────────────────────────────────────────────────────
+def build_prompt(history, user_input, max_turns=6, token_budget=None):
+    """Build conversation prompt from chat history."""
+    prompt, _, _ = build_context_prompt(
+        history or [], user_input, token_budget=token_budget if token_budget is not None else float("inf"), max_turns=max_turns
+    )
+    return prompt
+
+SUMMARY_TAG = "[summary]"
+
+def split_for_summary(history, keep_last):
+    """Split history into ``(previous_summary, aged_turns, cut)``.
+
+    ``aged_turns`` are the turns not yet folded into the ``[summary]`` entry
+    that have aged out of the last ``keep_last`` turns; ``history[:cut]`` is
+    what a new summary replaces.
+    """
+    if len(history) <= keep_last + 2:
+        return None, [], 0
+    start = 0
+    previous_summary = None
+    if history[0].user == SUMMARY_TAG:
+        previous_summary = history[0].ai
+        start = 1
+    cut = len(history) - keep_last
+    return previous_summary, history[start:cut], cut
+
+def fold_summary(previous_summary, turns, co_client, model_name):
+    """Fold ``turns`` into ``previous_summary`` and return the new summary text."""
+    new_turns = "".join(format_turn(turn) for turn in turns)
+    if previous_summary:
+        summary_prompt = (
+            "Update the running conversation summary with the new turns below. "
+            "Keep it short and keep any facts still needed for context.\n\n"
+            f"Current summary:\n{previous_summary}\n\nNew turns:\n{new_turns}\nUpdated summary:"
+        )
+    else:
+        summary_prompt = (
+            "Summarize the following conversation into a short context summary:\n\n"
+            f"{new_turns}\nSummary:"
+        )
+    resp = co_client.chat(model=model_name, message=summary_prompt)
+    return resp.text.strip()
+
+def make_summary_turn(summary_text, seq=None):
+    return Turn(SUMMARY_TAG, summary_text, seq=seq)
+
+def summarize_history(history, keep_last, co_client, model_name):
+    """Summarize old chat history to maintain context.
+
+    Only turns that aged out since the last summary are sent; they are
+    folded into the existing ``[summary]`` entry.
+    """
+    previous_summary, aged, cut = split_for_summary(history, keep_last)
+    if not aged:
+        return history
+    summary_text = fold_summary(previous_summary, aged, co_client, model_name)
+    new_history = [make_summary_turn(summary_text)]
+    new_history.extend(history[cut:])
+    return new_history
+
+def stream_reply(co_client, model_name, prompt, timing):
+    """Yield reply text chunks from Cohere's streaming chat endpoint.
+
+    ``timing["first_token"]`` is set to the time-to-first-token (seconds,
+    relative to ``timing["start"]``) as soon as the first chunk arrives.
+    """
+    for event in co_client.chat_stream(model=model_name, message=prompt):
+        if event.event_type != "text-generation" or not event.text:
+            continue
+        if "first_token" not in timing:
+            timing["first_token"] = time.time() - timing["start"]
+        yield event.text
+
+_suggestion_engines = {}
+
+def get_suggestions(user_input, engine=None):
+    """Generate AI suggestions based on user input keywords."""
+    if engine is None:
+        engine = _suggestion_engines.get(DEFAULT_CORPUS_PATH)
+        if engine is None:
+            engine = _suggestion_engines[DEFAULT_CORPUS_PATH] = SuggestionEngine.from_file(DEFAULT_CORPUS_PATH)
+    matches = engine.suggest(user_input, limit=1)
+    return matches[0] if matches else None
+
+# ───────────────────────────────────────────────────────────────────
+# 5️⃣ EXPORT GENERATION
+# ───────────────────────────────────────────────────────────────────
+# csv and fpdf are imported on first export: most processes never export,
+# and fpdf alone accounts for most of this module's import time.
+def iter_history_json(history):
+    """Yield ``history`` (any iterable of turns) as an indented JSON array."""
+    empty = True
+    for turn in history:
+        yield "[\n" if empty else ",\n"
+        empty = False
+        yield "  " + json.dumps(turn.to_dict(), indent=2).replace("\n", "\n  ")
+    yield "[]" if empty else "\n]"
+
+def iter_history_csv(history):
+    """Yield ``history`` as CSV rows (timestamp, user, ai)."""
+    import csv
+
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["timestamp","user","ai"])
+    for t in history:
+        writer.writerow([t.time, t.user, t.ai])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_history_jsonl(history, lines_per_chunk=1000):
+    """Yield ``history`` as newline-delimited JSON, ``lines_per_chunk`` turns per chunk.
+
+    Each line also carries the epoch ``ts``, so imports round-trip exactly
+    without parsing ``time``.
+    """
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    turns = iter(history)
+    while True:
+        chunk = "".join(
+            dumps({"user": turn.user, "ai": turn.ai, "time": turn.time, "ts": turn.ts}) + "\n"
+            for turn in islice(turns, lines_per_chunk)
+        )
+        if not chunk:
+            return
+        yield chunk
+
+def write_export(chunks, fileobj):
+    """Stream text ``chunks`` into a binary file object as UTF-8."""
+    for chunk in chunks:
+        fileobj.write(chunk.encode("utf-8"))
+
+def iter_import_turns(fileobj):
+    """Stream-parse a JSONL export (plain or gzip) from a binary file object into turns.
+
+    Lines are decoded one at a time, so only the current line is held in
+    memory on top of whatever ``fileobj`` itself buffers.
+    """
+    if fileobj.read(2) == b"\x1f\x8b":
+        fileobj.seek(0)
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    else:
+        fileobj.seek(0)
+    text = TextIOWrapper(fileobj, encoding="utf-8")
+    try:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"line {number}: not valid JSON ({e})") from None
+            if not isinstance(data, dict) or "user" not in data or "ai" not in data:
+                raise ValueError(f"line {number}: expected an object with user and ai")
+            if not isinstance(data["user"], str) or not isinstance(data["ai"], str):
+                raise ValueError(f"line {number}: user and ai must be strings")
+            ts = data.get("ts")
+            if ts is not None and (isinstance(ts, bool) or not isinstance(ts, (int, float)) or not math.isfinite(ts)):
+                raise ValueError(f"line {number}: ts must be a finite number of epoch seconds")
+            yield Turn.from_dict(data)
+    finally:
+        text.detach()  # leave the caller's file open
+
+def build_history_pdf(history):
+    """Lay out ``history`` as a PDF document and return its bytes."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=11)
+    for t in history:
+        # Clean unicode characters for PDF compatibility
+        user_text = f"[{t.time}] You: {t.user}"
+        ai_text = f"AI: {t.ai}"
+        # Replace special unicode characters
+        user_text = user_text.encode('ascii', 'replace').decode('ascii')
+        ai_text = ai_text.encode('ascii', 'replace').decode('ascii')
+        pdf.multi_cell(0, 6, user_text, new_x="LMARGIN", new_y="NEXT")
+        pdf.multi_cell(0, 6, ai_text, new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(1)
+    return bytes(pdf.output())
+
+EXPORT_WRITERS = {
+    "json": iter_history_json,
+    "csv": iter_history_csv,
+    "jsonl": iter_history_jsonl,
+    "jsonl_gz": iter_history_jsonl,
+}
+
+def build_export(fmt, history):
+    """Generate the ``fmt`` export of ``history`` as bytes.
+
+    ``"jsonl_gz"`` is compressed as it is generated, so the uncompressed
+    text never exists in full.
+    """
+    if fmt == "pdf":
+        return build_history_pdf(history)
+    buffer = BytesIO()
+    if fmt == "jsonl_gz":
+        with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6, mtime=0) as compressed:
+            write_export(iter_history_jsonl(history), compressed)
+    else:
+        write_export(EXPORT_WRITERS[fmt](history), buffer)
+    return buffer.getvalue()
+# ───────────────────────────────────────────────────────────────────
+# 6️⃣ CONVERSATION STORE
+# ───────────────────────────────────────────────────────────────────
+class ConversationStore:
+    """SQLite (WAL) store for conversations and their turns.
+
+    Turns are appended to an in-memory batch that is written in a single
+    transaction once ``batch_size`` turns are pending or ``flush_interval``
+    seconds have passed; every read flushes first. Each turn carries a
+    per-conversation ``seq``. The rolling summary lives on the conversation
+    row together with the last ``seq`` it covers.
+    """
+
+    def __init__(self, db_path, batch_size=32, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._pending = []
+        self._next_seq = {}
+        self._last_flush = time.time()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                session_id TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                summary TEXT,
+                summary_seq INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversations_session ON conversations (session_id, updated);
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                user TEXT NOT NULL,
+                ai TEXT NOT NULL,
+                time TEXT,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_turns_conversation ON turns (conversation_id, seq);
+            CREATE INDEX IF NOT EXISTS idx_turns_created ON turns (conversation_id, created);
+            """
+        )
+        self._db.commit()
+        flusher = threading.Thread(target=self._flush_loop, name="conversation-store-flush", daemon=True)
+        flusher.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self._pending and time.time() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        """Write all pending turns in one transaction."""
+        with self._lock:
+            self._last_flush = time.time()
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            updated = {row[0]: row[5] for row in rows}
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO turns (conversation_id, seq, user, ai, time, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.executemany(
+                    "UPDATE conversations SET updated = ? WHERE id = ?",
+                    [(ts, conversation_id) for conversation_id, ts in updated.items()],
+                )
+
+    def create_conversation(self, session_id=None):
+        conversation_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO conversations (id, session_id, created, updated) VALUES (?, ?, ?, ?)",
+                (conversation_id, session_id, now, now),
+            )
+        return conversation_id
+
+    def has_conversation(self, conversation_id):
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+        return row is not None
+
+    def append_turn(self, conversation_id, turn):
+        """Queue ``turn`` for writing and return the ``seq`` assigned to it."""
+        with self._lock:
+            seq = self._next_seq.get(conversation_id)
+            if seq is None:
+                row = self._db.execute(
+                    "SELECT MAX(seq) FROM turns WHERE conversation_id = ?", (conversation_id,)
+                ).fetchone()
+                seq = (row[0] or 0) + 1
+            self._next_seq[conversation_id] = seq + 1
+            self._pending.append(
+                (conversation_id, seq, turn.user, turn.ai, turn.time, turn.ts)
+            )
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+        return seq
+
+    def append_turns(self, conversation_id, turns):
+        """Write ``turns`` in one transaction, setting each one's ``seq``."""
+        with self._lock:
+            self.flush()
+            seq = self._next_seq.get(conversation_id)
+            if seq is None:
+                row = self._db.execute(
+                    "SELECT MAX(seq) FROM turns WHERE conversation_id = ?", (conversation_id,)
+                ).fetchone()
+                seq = (row[0] or 0) + 1
+            rows = []
+            for turn in turns:
+                turn.seq = seq
+                rows.append((conversation_id, seq, turn.user, turn.ai, turn.time, turn.ts))
+                seq += 1
+            self._next_seq[conversation_id] = seq
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO turns (conversation_id, seq, user, ai, time, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.execute("UPDATE conversations SET updated = ? WHERE id = ?", (time.time(), conversation_id))
+
+    def count_turns(self, conversation_id, min_seq=0):
+        """Count stored and pending turns with ``seq >= min_seq`` without forcing a flush."""
+        with self._lock:
+            stored = self._db.execute(
+                "SELECT COUNT(*) FROM turns WHERE conversation_id = ? AND seq >= ?", (conversation_id, min_seq)
+            ).fetchone()[0]
+            return stored + sum(1 for row in self._pending if row[0] == conversation_id and row[1] >= min_seq)
+
+    def load_recent(self, conversation_id, limit, after_seq=0):
+        """Return up to ``limit`` newest turns with ``seq > after_seq``, oldest first."""
+        with self._lock:
+            self.flush()
+            rows = self._db.execute(
+                "SELECT seq, user, ai, created FROM turns WHERE conversation_id = ? AND seq > ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (conversation_id, after_seq, limit),
+            ).fetchall()
+        return [Turn(user, ai, ts=ts, seq=seq) for seq, user, ai, ts in reversed(rows)]
+
+    def iter_turns(self, conversation_id, batch_size=500):
+        """Yield every turn of a conversation in order, ``batch_size`` rows at a time."""
+        self.flush()
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT seq, user, ai, created FROM turns WHERE conversation_id = ? AND seq > ? "
+                    "ORDER BY seq LIMIT ?",
+                    (conversation_id, last_seq, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for seq, user, ai, ts in rows:
+                yield Turn(user, ai, ts=ts, seq=seq)
+            last_seq = rows[-1][0]
+
+    def get_turns(self, conversation_id, seqs):
+        """Return the stored turns with the given ``seq`` values, in ``seq`` order."""
+        seqs = list(seqs)
+        if not seqs:
+            return []
+        with self._lock:
+            self.flush()
+            rows = []
+            for start in range(0, len(seqs), 500):
+                chunk = seqs[start:start + 500]
+                rows += self._db.execute(
+                    f"SELECT seq, user, ai, created FROM turns WHERE conversation_id = ? "
+                    f"AND seq IN ({', '.join('?' * len(chunk))})",
+                    (conversation_id, *chunk),
+                ).fetchall()
+        return [Turn(user, ai, ts=ts, seq=seq) for seq, user, ai, ts in sorted(rows)]
+
+    def get_summary(self, conversation_id):
+        """Return ``(summary_text, summary_seq)`` or ``(None, 0)``."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, summary_seq FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+        if not row or row[0] is None:
+            return None, 0
+        return row[0], row[1] or 0
+
+    def set_summary(self, conversation_id, summary_text, summary_seq):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE conversations SET summary = ?, summary_seq = ?, updated = ? WHERE id = ?",
+                (summary_text, summary_seq, time.time(), conversation_id),
+            )
+
+    def delete_through(self, conversation_id, seq):
+        """Delete turns with ``seq`` up to and including ``seq``."""
+        with self._lock:
+            self._pending = [row for row in self._pending if row[0] != conversation_id or row[1] > seq]
+            with self._db:
+                self._db.execute("DELETE FROM turns WHERE conversation_id = ? AND seq <= ?", (conversation_id, seq))
+
+    def clear(self, conversation_id):
+        """Delete every turn and the summary of a conversation."""
+        with self._lock:
+            self._pending = [row for row in self._pending if row[0] != conversation_id]
+            self._next_seq.pop(conversation_id, None)
+            with self._db:
+                self._db.execute("DELETE FROM turns WHERE conversation_id = ?", (conversation_id,))
+                self._db.execute(
+                    "UPDATE conversations SET summary = NULL, summary_seq = NULL, updated = ? WHERE id = ?",
+                    (time.time(), conversation_id),
+                )
+
+# ───────────────────────────────────────────────────────────────────
+# 7️⃣ CHAT BACKEND
+# ───────────────────────────────────────────────────────────────────
+class Reply:
+    """Outcome of one ``ChatBackend.process_message`` call."""
+
+    __slots__ = (
+        "text", "latency", "first_token", "cached", "similarity", "shared", "prompt_tokens", "prompt_turns", "model", "route",
+    )
+
+    def __init__(
+        self,
+        text,
+        latency,
+        first_token=None,
+        cached=False,
+        similarity=None,
+        shared=False,
+        prompt_tokens=0,
+        prompt_turns=0,
+        model=None,
+        route=None,
+    ):
+        self.text = text
+        self.latency = latency
+        self.first_token = first_token
+        self.cached = cached
+        self.similarity = similarity  # set when answered by the semantic cache
+        self.shared = shared  # answered by an identical request already in flight
+        self.prompt_tokens = prompt_tokens
+        self.prompt_turns = prompt_turns
+        self.model = model
+        self.route = route  # why the model router picked ``model``, when it did
+
+class ChatSession:
+    """State of one conversation: live turns, store id and pending summary.
+
+    ``version`` changes whenever the history does, so callers can memoize
+    work (exports, renders) against it.
+    """
+
+    def __init__(self, history=None, conversation_id=None, memory_turns=DEFAULT_MEMORY_TURNS, policy="spill"):
+        self.history = history if history is not None else TurnBuffer(memory_turns, policy=policy)
+        self.conversation_id = conversation_id
+        self.summary_job = None
+        self.summary_error = None
+        self.search_index = None  # built on first search, then kept up to date
+        self.version = 0
+        self._next_seq = max((turn.seq or 0 for turn in self.history), default=0) + 1
+
+    def next_seq(self):
+        seq = self._next_seq
+        self._next_seq += 1
+        return seq
+
+class ChatBackend:
+    """Runs chat turns end to end against an injected LLM client.
+
+    ``client`` needs ``chat(model=, message=)`` returning an object with
+    ``.text`` and, for streaming, ``chat_stream(model=, message=)`` yielding
+    Cohere-style events. The response cache, conversation store, metrics
+    registry, summary executor, suggestion engine, request scheduler,
+    single-flight registry, semantic cache and model router are all optional
+    and injectable; without a store, sessions live in memory only, and
+    without a scheduler calls go straight to ``client``. Identical
+    ``(model, prompt)`` requests in flight at the same time share one
+    upstream call.
+    """
+
+    def __init__(
+        self,
+        client,
+        response_cache=None,
+        store=None,
+        metrics=None,
+        summary_executor=None,
+        suggestion_engine=None,
+        scheduler=None,
+        single_flight=None,
+        semantic_cache=None,
+        router=None,
+    ):
+        self.client = client
+        self.response_cache = response_cache
+        self.store = store
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.summary_executor = summary_executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarizer")
+        self.suggestion_engine = suggestion_engine
+        self.scheduler = scheduler
+        self.single_flight = single_flight if single_flight is not None else SingleFlight(self.metrics)
+        self.semantic_cache = semantic_cache
+        self.router = router
+
+    def client_for(self, session, priority=INTERACTIVE, on_wait=None):
+        """Return the client to use for ``session``'s calls at ``priority``."""
+        if self.scheduler is None:
+            return self.client
+        session_key = session.conversation_id or id(session)
+        return ScheduledClient(self.scheduler, self.client, session_id=session_key, priority=priority, on_wait=on_wait)
+
+    # ── conversations ──────────────────────────────────────────────
+    def new_session(self, session_id=None, memory_turns=DEFAULT_MEMORY_TURNS, policy="spill"):
+        conversation_id = self.store.create_conversation(session_id=session_id) if self.store else None
+        return ChatSession(conversation_id=conversation_id, memory_turns=memory_turns, policy=policy)
+
+    def has_conversation(self, conversation_id):
+        return self.store is not None and self.store.has_conversation(conversation_id)
+
+    def load_session(self, conversation_id, memory_turns=DEFAULT_MEMORY_TURNS, policy="spill"):
+        """Resume a stored conversation: its summary plus the newest turns."""
+        summary_text, summary_seq = self.store.get_summary(conversation_id)
+        turns = self.store.load_recent(conversation_id, memory_turns, after_seq=summary_seq)
+        summary = make_summary_turn(summary_text, seq=summary_seq) if summary_text is not None else None
+        history = TurnBuffer(memory_turns, policy=policy, turns=turns, summary=summary)
+        return ChatSession(history=history, conversation_id=conversation_id)
+
+    def record_turn(self, session, turn):
+        """Persist ``turn`` and append it to the session's ring buffer."""
+        if self.store is not None:
+            turn.seq = self.store.append_turn(session.conversation_id, turn)
+        else:
+            turn.seq = session.next_seq()
+        evicted = session.history.append(turn)
+        dropped = evicted is not None and session.history.policy == "drop"
+        if dropped and self.store is not None:
+            self.store.delete_through(session.conversation_id, evicted.seq)
+        if session.search_index is not None:
+            session.search_index.add(turn.seq, turn.user, turn.ai)
+            if dropped:
+                session.search_index.remove(evicted.seq)
+        session.version += 1
+
+    def import_turns(self, session, turns, batch_size=1000):
+        """Append ``turns`` (e.g. from ``iter_import_turns``) to the session; return the count.
+
+        Turns are stored ``batch_size`` at a time. Those pushed out of the
+        ring buffer are spilled whatever the overflow policy: an import is
+        neither summarized nor dropped.
+        """
+        turns = iter(turns)
+        count = 0
+        while True:
+            batch = list(islice(turns, batch_size))
+            if not batch:
+                return count
+            if self.store is not None:
+                self.store.append_turns(session.conversation_id, batch)
+            else:
+                for turn in batch:
+                    turn.seq = session.next_seq()
+            session.history.extend(batch)
+            if session.search_index is not None:
+                for turn in batch:
+                    session.search_index.add(turn.seq, turn.user, turn.ai)
+            session.version += 1
+            count += len(batch)
+
+    def clear(self, session):
+        if self.store is not None:
+            self.store.clear(session.conversation_id)
+        session.history.clear()
+        session.summary_job = None
+        session.search_index = None
+        session.version += 1
+
+    def count_turns(self, session, min_seq=0):
+        if self.store is None:
+            return sum(1 for turn in session.history.turns() if turn.seq >= min_seq)
+        return self.store.count_turns(session.conversation_id, min_seq)
+
+    def load_recent(self, session, limit):
+        if self.store is None:
+            return session.history.turns()[-limit:]
+        return self.store.load_recent(session.conversation_id, limit)
+
+    def iter_turns(self, session):
+        """Yield the full transcript, from the store when there is one."""
+        if self.store is None:
+            return iter(session.history.turns())
+        return self.store.iter_turns(session.conversation_id)
+
+    # ── summaries ──────────────────────────────────────────────────
+    def _timed_fold_summary(self, previous_summary, turns, client, model_name):
+        with self.metrics.timer("summarize"):
+            return fold_summary(previous_summary, turns, client, model_name)
+
+    def schedule_summary(self, session, keep_last, model_name, route=False):
+        """Start folding aged-out turns into the summary off the request path.
+
+        Turns evicted under the ``"summarize"`` overflow policy are folded too.
+        With ``route=True`` and a router, the summary goes to its fast model.
+        """
+        if session.summary_job is not None:
+            return False
+        history = session.history
+        _, aged, _ = split_for_summary(history, keep_last)
+        aged = history.overflow + aged
+        previous_summary = history.summary.ai if history.summary is not None else None
+        if not aged:
+            return False
+        if route and self.router is not None:
+            model_name = self.router.route_background(model_name).model
+        client = self.client_for(session, priority=BACKGROUND)
+        future = self.summary_executor.submit(self._timed_fold_summary, previous_summary, aged, client, model_name)
+        session.summary_job = {"future": future, "generation": history.generation, "through_seq": aged[-1].seq}
+        return True
+
+    def apply_pending_summary(self, session, wait=False):
+        """Swap a finished background summary into the session.
+
+        Turns appended while the summary was running are kept. The result is
+        dropped if the history was cleared in the meantime; a failed summary
+        is left in ``session.summary_error``.
+        """
+        job = session.summary_job
+        if job is None or not (wait or job["future"].done()):
+            return False
+        session.summary_job = None
+        history = session.history
+        try:
+            summary_text = job["future"].result()
+        except Exception as e:
+            session.summary_error = e
+            return False
+        if history.generation != job["generation"]:
+            return False
+        through_seq = job["through_seq"]
+        history.set_summary(make_summary_turn(summary_text, seq=through_seq), through_seq)
+        if self.store is not None:
+            self.store.set_summary(session.conversation_id, summary_text, through_seq)
+        if session.search_index is not None:
+            session.search_index.add(SUMMARY_TAG, summary_text)
+        session.version += 1
+        return True
+
+    # ── search ─────────────────────────────────────────────────────
+    def search_index(self, session):
+        """Return the session's search index, built from the full transcript on first use.
+
+        After that, recording, importing, dropping and summarizing turns keep
+        it current. The running summary is indexed under ``SUMMARY_TAG``.
+        """
+        index = session.search_index
+        if index is None:
+            from search_index import SearchIndex  # pulls in NumPy, so only on first search
+
+            with self.metrics.timer("search_index_build"):
+                index = SearchIndex()
+                for turn in self.iter_turns(session):
+                    index.add(turn.seq, turn.user, turn.ai)
+                if session.history.summary is not None:
+                    index.add(SUMMARY_TAG, session.history.summary.ai)
+            session.search_index = index
+        return index
+
+    def search(self, session, query, limit=20):
+        """Return ``(turn, score)`` pairs for ``query``, best first.
+
+        A match in the running summary comes back as its ``[summary]`` turn.
+        """
+        index = self.search_index(session)
+        with self.metrics.timer("search"):
+            hits = index.search(query, limit)
+        seqs = [key for key, _ in hits if key != SUMMARY_TAG]
+        if self.store is not None:
+            turns = self.store.get_turns(session.conversation_id, seqs)
+        else:
+            wanted = set(seqs)
+            turns = [turn for turn in session.history.turns() if turn.seq in wanted]
+        by_seq = {turn.seq: turn for turn in turns}
+        by_seq[SUMMARY_TAG] = session.history.summary
+        return [(by_seq[key], score) for key, score in hits if by_seq.get(key) is not None]
+
+    # ── replies ────────────────────────────────────────────────────
+    def _lead_stream(self, key, flight, chunks):
+        """Pass ``chunks`` through, then hand the full text to waiting followers."""
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except Exception as exc:
+            self.single_flight.fail(key, flight, exc)
+            raise
+        self.single_flight.resolve(key, flight, "".join(parts))
+
+    def _follow_stream(self, flight, own_stream, timing):
+        """Yield the leader's reply in one chunk, or stream our own if it gave up."""
+        try:
+            text = flight.wait()
+        except FlightAbandoned:
+            yield from own_stream()
+            return
+        timing["first_token"] = time.time() - timing["start"]
+        timing["shared"] = True
+        yield text
+
+    def _ask_upstream(self, client, model_name, prompt, t0, stream, render_stream, attempt):
+        """Get a reply from upstream (or an identical request in flight).
+
+        Returns ``(text, latency, first_token, shared, upstream)``, where
+        ``upstream`` is the model's own time: from when a scheduler worker
+        picked the call up to the first token when streaming, or to the
+        whole reply otherwise. ``attempt["own_call"]`` is set once this
+        caller sends its own request rather than waiting on another's.
+        """
+        flight_key = (model_name, prompt)
+        first_token = None
+        if stream:
+            timing = {"start": t0}
+
+            def own_stream():
+                attempt["own_call"] = True
+                return stream_reply(client, model_name, prompt, timing)
+
+            flight, leader = self.single_flight.join(flight_key)
+            if leader:
+                chunks = self._lead_stream(flight_key, flight, own_stream())
+            else:
+                chunks = self._follow_stream(flight, own_stream, timing)
+            try:
+                streamed = render_stream(chunks) if render_stream is not None else "".join(chunks)
+            finally:
+                if leader:
+                    self.single_flight.abandon(flight_key, flight)
+            latency = time.time() - t0
+            bot_reply = streamed.strip()
+            shared = timing.get("shared", False)
+            first_token = timing.get("first_token", latency)
+            upstream = t0 + first_token - self._upstream_started(client, t0)
+            self.metrics.observe("api_first_token", first_token)
+            self.metrics.observe("api_call", latency)
+        else:
+            def own_call():
+                attempt["own_call"] = True
+                return client.chat(model=model_name, message=prompt).text.strip()
+
+            bot_reply, shared = self.single_flight.do(flight_key, own_call)
+            latency = time.time() - t0
+            upstream = t0 + latency - self._upstream_started(client, t0)
+            self.metrics.observe("api_call", latency)
+        return bot_reply, latency, first_token, shared, upstream
+
+    @staticmethod
+    def _upstream_started(client, t0):
+        """When ``client``'s last call left the scheduler queue (``t0`` without a scheduler)."""
+        if isinstance(client, ScheduledClient) and client.started is not None:
+            return max(client.started, t0)
+        return t0
+
+    @staticmethod
+    def _failed_upstream(client, attempt, exc):
+        """True if ``exc`` came from this caller's own request reaching upstream.
+
+        Errors shared from another caller's flight, an open circuit breaker
+        and calls cancelled before a scheduler worker picked them up say
+        nothing about the model.
+        """
+        if not attempt["own_call"] or isinstance(exc, (CircuitOpenError, CancelledError)):
+            return False
+        return not isinstance(client, ScheduledClient) or client.started is not None
+
+    def suggest(self, user_input):
+        return get_suggestions(user_input, engine=self.suggestion_engine)
+
+    def process_message(
+        self,
+        session,
+        user_input,
+        max_turns,
+        model_name,
+        auto_summarize=False,
+        token_budget=DEFAULT_TOKEN_BUDGET,
+        stream=False,
+        render_stream=None,
+        on_queue=None,
+        route=False,
+    ):
+        """Answer ``user_input`` in ``session`` and record the turn.
+
+        With ``stream=True`` the reply is read from ``chat_stream``; the text
+        chunks are handed to ``render_stream`` (which must return the full
+        text) or simply joined. With a scheduler, ``on_queue(position)`` is
+        called while the request waits in line and ``on_queue(None)`` once it
+        starts. With ``route=True`` and a router, the router picks between
+        ``model_name`` and its fast model, and the upstream call's outcome
+        and latency (time to first token when streaming, queue wait
+        excluded) are fed back to it. Returns a ``Reply``, or None for
+        empty input. Client errors propagate to the caller.
+        """
+        if not user_input or not user_input.strip():
+            return None
+
+        # Pick up a rolling summary finished since the last message
+        self.apply_pending_summary(session)
+
+        with self.metrics.timer("prompt_build"):
+            prompt, prompt_tokens, prompt_turns = build_context_prompt(
+                session.history, user_input, token_budget=token_budget, max_turns=max_turns
+            )
+        configured_model = model_name
+        router = self.router if route else None
+        route_reason = None
+        if router is not None:
+            choice = router.route(model_name, user_input)
+            model_name, route_reason = choice.model, choice.reason
+        t0 = time.time()
+        cached_reply = self.response_cache.get(model_name, prompt) if self.response_cache is not None else None
+        (self.metrics.hit if cached_reply is not None else self.metrics.miss)("response")
+        # Near-duplicate matching only makes sense for questions asked without context
+        semantic = self.semantic_cache if prompt_turns == 0 else None
+        similarity = None
+        if cached_reply is None and semantic is not None:
+            match = semantic.get(model_name, user_input)
+            if match is not None:
+                cached_reply, similarity = match
+        first_token = None
+        shared = False
+        client = self.client_for(session, on_wait=on_queue)
+        if cached_reply is not None:
+            bot_reply = cached_reply
+            latency = time.time() - t0
+        else:
+            attempt = {"own_call": False}
+            try:
+                bot_reply, latency, first_token, shared, upstream = self._ask_upstream(
+                    client, model_name, prompt, t0, stream, render_stream, attempt
+                )
+            except Exception as exc:
+                # Like successes, only failures of our own upstream call count
+                if router is not None and self._failed_upstream(client, attempt, exc):
+                    router.observe(model_name, time.time() - self._upstream_started(client, t0), ok=False)
+                raise
+            # Queue wait and rendering are not the model's doing, so the router sees upstream time only
+            if router is not None and not shared:
+                router.observe(model_name, upstream)
+        if cached_reply is None and not shared and bot_reply:
+            if self.response_cache is not None:
+                self.response_cache.put(model_name, prompt, bot_reply)
+            if semantic is not None:
+                semantic.put(model_name, user_input, bot_reply)
+
+        self.record_turn(session, Turn(user_input, bot_reply))
+
+        # Auto-summarize in the background; the new summary is swapped in later
+        history = session.history
+        if (auto_summarize and len(history) > (max_turns * 3)) or history.overflow:
+            self.schedule_summary(session, keep_last=max_turns, model_name=configured_model, route=route)
+
+        return Reply(
+            bot_reply,
+            latency,
+            first_token=first_token,
+            cached=cached_reply is not None,
+            similarity=similarity,
+            shared=shared,
+            prompt_tokens=prompt_tokens,
+            prompt_turns=prompt_turns,
+            model=model_name,
+            route=route_reason,
+        )
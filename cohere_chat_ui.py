@@ -5,14 +5,30 @@
 # ─────────────────────────────────────────────────────────────────────
 # 📦 IMPORTS & DEPENDENCIES
 # ─────────────────────────────────────────────────────────────────────
+import hashlib
 import os
+import re
+import sys
 import time
-import json
-import csv
+import html
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-import streamlit.components.v1 as components
-from io import BytesIO, StringIO
-from fpdf import FPDF
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from chat_core import (
+    DEFAULT_TOKEN_BUDGET,
+    OVERFLOW_POLICIES,
+    SUMMARY_TAG,
+    ChatBackend,
+    ConversationStore,
+    ResponseCache,
+    build_export,
+    iter_import_turns,
+)
+from metrics import Metrics, MetricsDumper
+from model_router import ModelRouter
+from resilient_client import CircuitOpenError, DeadlineExceeded, PrewarmedClient, ResilientClient
+from scheduler import RequestScheduler
+from suggestions import DEFAULT_CORPUS_PATH, SuggestionEngine
 
 # ═══════════════════════════════════════════════════════════════════
 # 🎨 FRONTEND - COMPLETE UI/UX SECTION
@@ -23,343 +39,447 @@ from fpdf import FPDF
 # ───────────────────────────────────────────────────────────────────
 st.set_page_config(page_title="🤖 AI Chatbot", page_icon="🤖", layout="wide")
 
+# Fragments rerun only their own region when a widget inside them changes
+# (Streamlit >= 1.37). On older versions the decorated functions just run
+# as part of every full rerun.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
 # ───────────────────────────────────────────────────────────────────
 # 2️⃣ SESSION STATE MANAGEMENT (Frontend State)
 # ───────────────────────────────────────────────────────────────────
-if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
 if 'scroll_to_top' not in st.session_state:
     st.session_state.scroll_to_top = False
 if 'theme_mode' not in st.session_state:
     st.session_state.theme_mode = "dark"
+if 'export_cache' not in st.session_state:
+    st.session_state.export_cache = {}
 
 # ───────────────────────────────────────────────────────────────────
 # 3️⃣ THEME & STYLING (CSS Styling)
 # ───────────────────────────────────────────────────────────────────
-def apply_premium_theme(theme_mode):
-    """Apply premium CSS styling for Light and Dark themes."""
-    if theme_mode == "dark":
-        css = """
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-            }
-            
-            [data-testid="stAppViewContainer"] {
-                background: linear-gradient(135deg, #0a0e27 0%, #1a1a3e 50%, #0f1629 100%) !important;
-                min-height: 100vh;
-            }
-            
-            [data-testid="stSidebar"] {
-                background: linear-gradient(180deg, #111827 0%, #0f1419 100%) !important;
-                border-right: 3px solid #4f46e5;
-            }
-            
-            [data-testid="stSidebarContent"] {
-                background: transparent !important;
-            }
-            
-            .stTextInput > div > div > input,
-            .stSelectbox > div > div > select,
-            .stTextArea > div > div > textarea {
-                background-color: #1a1f3a !important;
-                color: #e0e7ff !important;
-                border: 2px solid #4f46e5 !important;
-                border-radius: 10px !important;
-                padding: 12px !important;
-                font-size: 15px !important;
-                box-shadow: 0 8px 24px rgba(79, 70, 229, 0.2) !important;
-            }
-            
-            .stTextInput > div > div > input::placeholder {
-                color: #6366f1 !important;
-            }
-            
-            .stButton > button {
-                background: linear-gradient(135deg, #4f46e5 0%, #6366f1 100%) !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 10px !important;
-                font-weight: 700 !important;
-                font-size: 15px !important;
-                padding: 12px 24px !important;
-                box-shadow: 0 10px 28px rgba(79, 70, 229, 0.35) !important;
-                transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1) !important;
-            }
-            
-            .stButton > button:hover {
-                transform: translateY(-4px) !important;
-                box-shadow: 0 16px 36px rgba(79, 70, 229, 0.5) !important;
-            }
-            
-            .stButton > button:active {
-                transform: translateY(-1px) !important;
-            }
-            
-            [data-testid="stFormSubmitButton"] > button {
-                background: linear-gradient(135deg, #4f46e5 0%, #6366f1 100%) !important;
-                color: white !important;
-                font-weight: 700 !important;
-                font-size: 16px !important;
-                border-radius: 10px !important;
-                box-shadow: 0 10px 28px rgba(79, 70, 229, 0.35) !important;
-                transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1) !important;
-                border: none !important;
-            }
-            
-            [data-testid="stFormSubmitButton"] > button:hover {
-                transform: translateY(-4px) !important;
-                box-shadow: 0 16px 36px rgba(79, 70, 229, 0.5) !important;
-            }
-            
-            .stDownloadButton > button {
-                background: linear-gradient(135deg, #10b981 0%, #059669 100%) !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 10px !important;
-                font-weight: 700 !important;
-                font-size: 14px !important;
-                box-shadow: 0 10px 28px rgba(16, 185, 129, 0.35) !important;
-                transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1) !important;
-            }
-            
-            .stDownloadButton > button:hover {
-                transform: translateY(-4px) !important;
-                box-shadow: 0 16px 36px rgba(16, 185, 129, 0.5) !important;
-            }
-            
-            h1, h2, h3, h4, h5, h6 {
-                color: #e0e7ff !important;
-                font-weight: 800 !important;
-            }
-            
-            .stMarkdown, .stText, p, span {
-                color: #cbd5e1 !important;
-            }
-            
-            .stInfo {
-                background: linear-gradient(135deg, rgba(79, 70, 229, 0.15), rgba(99, 102, 241, 0.1)) !important;
-                border-left: 5px solid #4f46e5 !important;
-                border-radius: 12px !important;
-                backdrop-filter: blur(10px) !important;
-            }
-            
-            .stSuccess {
-                background: linear-gradient(135deg, rgba(16, 185, 129, 0.15), rgba(5, 150, 105, 0.1)) !important;
-                border-left: 5px solid #10b981 !important;
-                border-radius: 12px !important;
-            }
-            
-            .stWarning {
-                background: linear-gradient(135deg, rgba(245, 158, 11, 0.15), rgba(217, 119, 6, 0.1)) !important;
-                border-left: 5px solid #f59e0b !important;
-                border-radius: 12px !important;
-            }
-            
-            .stError {
-                background: linear-gradient(135deg, rgba(239, 68, 68, 0.15), rgba(220, 38, 38, 0.1)) !important;
-                border-left: 5px solid #ef4444 !important;
-                border-radius: 12px !important;
-            }
-            
-            .stSlider > div > div > div {
-                color: #4f46e5 !important;
-            }
-            
-            .stCheckbox > label {
-                color: #cbd5e1 !important;
-                font-weight: 600 !important;
-            }
-            
-            hr {
-                border-color: rgba(79, 70, 229, 0.3) !important;
-            }
-        </style>
-        """
-    else:  # LIGHT MODE
-        css = """
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-            }
-            
-            [data-testid="stAppViewContainer"] {
-                background: #f8f9fa !important;
-                min-height: 100vh;
-            }
-            
-            [data-testid="stSidebar"] {
-                background: #e3f2fd !important;
-                border-right: 2px solid #2563eb;
-            }
-            
-            [data-testid="stSidebarContent"] {
-                background: transparent !important;
-            }
-            
-            .stTextInput > div > div > input,
-            .stSelectbox > div > div > select,
-            .stTextArea > div > div > textarea {
-                background-color: #ffffff !important;
-                color: #000000 !important;
-                border: 2px solid #bfdbfe !important;
-                border-radius: 10px !important;
-                padding: 12px !important;
-                font-size: 15px !important;
-                box-shadow: 0 2px 8px rgba(37, 99, 235, 0.08) !important;
-                font-weight: 500 !important;
-            }
-            
-            .stTextInput > div > div > input::placeholder {
-                color: #93c5fd !important;
-                font-weight: 500 !important;
-            }
-            
-            .stButton > button {
-                background: #2563eb !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 10px !important;
-                font-weight: 600 !important;
-                font-size: 15px !important;
-                padding: 12px 24px !important;
-                box-shadow: 0 4px 12px rgba(37, 99, 235, 0.25) !important;
-                transition: all 0.3s ease !important;
-            }
-            
-            .stButton > button:hover {
-                background: #1d4ed8 !important;
-                transform: translateY(-2px) !important;
-                box-shadow: 0 6px 16px rgba(37, 99, 235, 0.35) !important;
-            }
-            
-            .stButton > button:active {
-                transform: translateY(0px) !important;
-            }
-            
-            [data-testid="stFormSubmitButton"] > button {
-                background: #2563eb !important;
-                color: white !important;
-                font-weight: 600 !important;
-                font-size: 16px !important;
-                border-radius: 10px !important;
-                box-shadow: 0 4px 12px rgba(37, 99, 235, 0.25) !important;
-                transition: all 0.3s ease !important;
-                border: none !important;
-                padding: 12px !important;
-            }
-            
-            [data-testid="stFormSubmitButton"] > button:hover {
-                background: #1d4ed8 !important;
-                transform: translateY(-2px) !important;
-                box-shadow: 0 6px 16px rgba(37, 99, 235, 0.35) !important;
-            }
-            
-            .stDownloadButton > button {
-                background: #10b981 !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 10px !important;
-                font-weight: 600 !important;
-                font-size: 14px !important;
-                box-shadow: 0 4px 12px rgba(16, 185, 129, 0.25) !important;
-                transition: all 0.3s ease !important;
-                padding: 10px !important;
-            }
-            
-            .stDownloadButton > button:hover {
-                background: #059669 !important;
-                transform: translateY(-2px) !important;
-                box-shadow: 0 6px 16px rgba(16, 185, 129, 0.35) !important;
-            }
-            
-            h1, h2, h3, h4, h5, h6 {
-                color: #1e3a8a !important;
-                font-weight: 800 !important;
-            }
-            
-            .stMarkdown, .stText, p, span {
-                color: #1e3a8a !important;
-            }
-            
-            .stInfo {
-                background: #dbeafe !important;
-                border-left: 4px solid #2563eb !important;
-                border-radius: 10px !important;
-            }
-            
-            .stSuccess {
-                background: #dcfce7 !important;
-                border-left: 4px solid #10b981 !important;
-                border-radius: 10px !important;
-            }
-            
-            .stWarning {
-                background: #fef3c7 !important;
-                border-left: 4px solid #f59e0b !important;
-                border-radius: 10px !important;
-            }
-            
-            .stError {
-                background: #fee2e2 !important;
-                border-left: 4px solid #ef4444 !important;
-                border-radius: 10px !important;
-            }
-            
-            .stSlider > div > div > div {
-                color: #2563eb !important;
-            }
-            
-            .stCheckbox > label {
-                color: #1e3a8a !important;
-                font-weight: 600 !important;
-            }
-            
-            hr {
-                border-color: #e0e7ff !important;
-            }
-        </style>
-        """
-    st.markdown(css, unsafe_allow_html=True)
+# Raw per-theme rules, compiled once per process by ``get_theme_styles``.
+THEME_CSS = {
+    "dark": """
+    * {
+        margin: 0;
+        padding: 0;
+    }
+
+    [data-testid="stAppViewContainer"] {
+        background: linear-gradient(135deg, #0a0e27 0%, #1a1a3e 50%, #0f1629 100%) !important;
+        min-height: 100vh;
+    }
+
+    [data-testid="stSidebar"] {
+        background: linear-gradient(180deg, #111827 0%, #0f1419 100%) !important;
+        border-right: 3px solid #4f46e5;
+    }
+
+    [data-testid="stSidebarContent"] {
+        background: transparent !important;
+    }
+
+    .stTextInput > div > div > input,
+    .stSelectbox > div > div > select,
+    .stTextArea > div > div > textarea {
+        background-color: #1a1f3a !important;
+        color: #e0e7ff !important;
+        border: 2px solid #4f46e5 !important;
+        border-radius: 10px !important;
+        padding: 12px !important;
+        font-size: 15px !important;
+        box-shadow: 0 8px 24px rgba(79, 70, 229, 0.2) !important;
+    }
+
+    .stTextInput > div > div > input::placeholder {
+        color: #6366f1 !important;
+    }
+
+    .stButton > button {
+        background: linear-gradient(135deg, #4f46e5 0%, #6366f1 100%) !important;
+        color: white !important;
+        border: none !important;
+        border-radius: 10px !important;
+        font-weight: 700 !important;
+        font-size: 15px !important;
+        padding: 12px 24px !important;
+        box-shadow: 0 10px 28px rgba(79, 70, 229, 0.35) !important;
+        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1) !important;
+    }
+
+    .stButton > button:hover {
+        transform: translateY(-4px) !important;
+        box-shadow: 0 16px 36px rgba(79, 70, 229, 0.5) !important;
+    }
+
+    .stButton > button:active {
+        transform: translateY(-1px) !important;
+    }
+
+    [data-testid="stFormSubmitButton"] > button {
+        background: linear-gradient(135deg, #4f46e5 0%, #6366f1 100%) !important;
+        color: white !important;
+        font-weight: 700 !important;
+        font-size: 16px !important;
+        border-radius: 10px !important;
+        box-shadow: 0 10px 28px rgba(79, 70, 229, 0.35) !important;
+        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1) !important;
+        border: none !important;
+    }
+
+    [data-testid="stFormSubmitButton"] > button:hover {
+        transform: translateY(-4px) !important;
+        box-shadow: 0 16px 36px rgba(79, 70, 229, 0.5) !important;
+    }
+
+    .stDownloadButton > button {
+        background: linear-gradient(135deg, #10b981 0%, #059669 100%) !important;
+        color: white !important;
+        border: none !important;
+        border-radius: 10px !important;
+        font-weight: 700 !important;
+        font-size: 14px !important;
+        box-shadow: 0 10px 28px rgba(16, 185, 129, 0.35) !important;
+        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1) !important;
+    }
+
+    .stDownloadButton > button:hover {
+        transform: translateY(-4px) !important;
+        box-shadow: 0 16px 36px rgba(16, 185, 129, 0.5) !important;
+    }
+
+    h1, h2, h3, h4, h5, h6 {
+        color: #e0e7ff !important;
+        font-weight: 800 !important;
+    }
+
+    .stMarkdown, .stText, p, span {
+        color: #cbd5e1 !important;
+    }
+
+    .stInfo {
+        background: linear-gradient(135deg, rgba(79, 70, 229, 0.15), rgba(99, 102, 241, 0.1)) !important;
+        border-left: 5px solid #4f46e5 !important;
+        border-radius: 12px !important;
+        backdrop-filter: blur(10px) !important;
+    }
+
+    .stSuccess {
+        background: linear-gradient(135deg, rgba(16, 185, 129, 0.15), rgba(5, 150, 105, 0.1)) !important;
+        border-left: 5px solid #10b981 !important;
+        border-radius: 12px !important;
+    }
+
+    .stWarning {
+        background: linear-gradient(135deg, rgba(245, 158, 11, 0.15), rgba(217, 119, 6, 0.1)) !important;
+        border-left: 5px solid #f59e0b !important;
+        border-radius: 12px !important;
+    }
+
+    .stError {
+        background: linear-gradient(135deg, rgba(239, 68, 68, 0.15), rgba(220, 38, 38, 0.1)) !important;
+        border-left: 5px solid #ef4444 !important;
+        border-radius: 12px !important;
+    }
+
+    .stSlider > div > div > div {
+        color: #4f46e5 !important;
+    }
+
+    .stCheckbox > label {
+        color: #cbd5e1 !important;
+        font-weight: 600 !important;
+    }
+
+    hr {
+        border-color: rgba(79, 70, 229, 0.3) !important;
+    }
+""",
+    "light": """
+    * {
+        margin: 0;
+        padding: 0;
+    }
+
+    [data-testid="stAppViewContainer"] {
+        background: #f8f9fa !important;
+        min-height: 100vh;
+    }
+
+    [data-testid="stSidebar"] {
+        background: #e3f2fd !important;
+        border-right: 2px solid #2563eb;
+    }
+
+    [data-testid="stSidebarContent"] {
+        background: transparent !important;
+    }
+
+    .stTextInput > div > div > input,
+    .stSelectbox > div > div > select,
+    .stTextArea > div > div > textarea {
+        background-color: #ffffff !important;
+        color: #000000 !important;
+        border: 2px solid #bfdbfe !important;
+        border-radius: 10px !important;
+        padding: 12px !important;
+        font-size: 15px !important;
+        box-shadow: 0 2px 8px rgba(37, 99, 235, 0.08) !important;
+        font-weight: 500 !important;
+    }
+
+    .stTextInput > div > div > input::placeholder {
+        color: #93c5fd !important;
+        font-weight: 500 !important;
+    }
+
+    .stButton > button {
+        background: #2563eb !important;
+        color: white !important;
+        border: none !important;
+        border-radius: 10px !important;
+        font-weight: 600 !important;
+        font-size: 15px !important;
+        padding: 12px 24px !important;
+        box-shadow: 0 4px 12px rgba(37, 99, 235, 0.25) !important;
+        transition: all 0.3s ease !important;
+    }
+
+    .stButton > button:hover {
+        background: #1d4ed8 !important;
+        transform: translateY(-2px) !important;
+        box-shadow: 0 6px 16px rgba(37, 99, 235, 0.35) !important;
+    }
+
+    .stButton > button:active {
+        transform: translateY(0px) !important;
+    }
+
+    [data-testid="stFormSubmitButton"] > button {
+        background: #2563eb !important;
+        color: white !important;
+        font-weight: 600 !important;
+        font-size: 16px !important;
+        border-radius: 10px !important;
+        box-shadow: 0 4px 12px rgba(37, 99, 235, 0.25) !important;
+        transition: all 0.3s ease !important;
+        border: none !important;
+        padding: 12px !important;
+    }
+
+    [data-testid="stFormSubmitButton"] > button:hover {
+        background: #1d4ed8 !important;
+        transform: translateY(-2px) !important;
+        box-shadow: 0 6px 16px rgba(37, 99, 235, 0.35) !important;
+    }
+
+    .stDownloadButton > button {
+        background: #10b981 !important;
+        color: white !important;
+        border: none !important;
+        border-radius: 10px !important;
+        font-weight: 600 !important;
+        font-size: 14px !important;
+        box-shadow: 0 4px 12px rgba(16, 185, 129, 0.25) !important;
+        transition: all 0.3s ease !important;
+        padding: 10px !important;
+    }
+
+    .stDownloadButton > button:hover {
+        background: #059669 !important;
+        transform: translateY(-2px) !important;
+        box-shadow: 0 6px 16px rgba(16, 185, 129, 0.35) !important;
+    }
+
+    h1, h2, h3, h4, h5, h6 {
+        color: #1e3a8a !important;
+        font-weight: 800 !important;
+    }
+
+    .stMarkdown, .stText, p, span {
+        color: #1e3a8a !important;
+    }
+
+    .stInfo {
+        background: #dbeafe !important;
+        border-left: 4px solid #2563eb !important;
+        border-radius: 10px !important;
+    }
+
+    .stSuccess {
+        background: #dcfce7 !important;
+        border-left: 4px solid #10b981 !important;
+        border-radius: 10px !important;
+    }
+
+    .stWarning {
+        background: #fef3c7 !important;
+        border-left: 4px solid #f59e0b !important;
+        border-radius: 10px !important;
+    }
+
+    .stError {
+        background: #fee2e2 !important;
+        border-left: 4px solid #ef4444 !important;
+        border-radius: 10px !important;
+    }
+
+    .stSlider > div > div > div {
+        color: #2563eb !important;
+    }
+
+    .stCheckbox > label {
+        color: #1e3a8a !important;
+        font-weight: 600 !important;
+    }
+
+    hr {
+        border-color: #e0e7ff !important;
+    }
+""",
+}
+THEME_MARKER = "vexel-theme"
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+def compile_theme_css(css, scope=""):
+    """Minify ``css`` (plain rules, no at-rules), prefixing every selector with ``scope``."""
+    prefix = f"{scope} " if scope else ""
+    rules = []
+    for selectors, body in re.findall(r"([^{}]+)\{([^{}]*)\}", css):
+        selectors = ",".join(
+            prefix + re.sub(r"\s*>\s*", ">", " ".join(selector.split())) for selector in selectors.split(",")
+        )
+        declarations = []
+        for declaration in body.split(";"):
+            name, _, value = declaration.partition(":")
+            if value:
+                value = re.sub(r"\s*,\s*", ",", " ".join(value.split())).replace(" !important", "!important")
+                declarations.append(f"{name.strip()}:{value}")
+        rules.append(f"{selectors}{{{';'.join(declarations)}}}")
+    return "".join(rules)
+
+@st.cache_resource
+def get_theme_styles():
+    """Compile the themes once; return ``(page_html, {mode: marker_html})``.
+
+    ``page_html`` goes out on every full rerun and ``marker_html[mode]`` from
+    the theme picker fragment, so switching themes resends only the marker.
+    With ``server.enableStaticServing`` on, both themes live in one cached
+    stylesheet under ``static/`` (named by content hash), each scoped to its
+    marker's class, and the page sends just a ``<link>``. Otherwise the
+    marker carries the active theme as a minified ``<style>`` block.
+    """
+    # Collapse the marker elements so they take no space
+    hide_markers = f'.element-container:has(.{THEME_MARKER}),[data-testid="stElementContainer"]:has(.{THEME_MARKER}){{display:none}}'
+    if st.get_option("server.enableStaticServing"):
+        css = "".join(compile_theme_css(rules, f"body:has(.{THEME_MARKER}-{mode})") for mode, rules in THEME_CSS.items())
+        css += hide_markers
+        name = f"{THEME_MARKER}.{hashlib.sha1(css.encode()).hexdigest()[:12]}.min.css"
+        try:
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            with open(os.path.join(STATIC_DIR, name), "w", encoding="utf-8") as f:
+                f.write(css)
+        except OSError:
+            pass  # read-only checkout: inline the themes instead
+        else:
+            markers = {mode: f'<span class="{THEME_MARKER} {THEME_MARKER}-{mode}"></span>' for mode in THEME_CSS}
+            return f'<link rel="stylesheet" href="app/static/{name}"><span class="{THEME_MARKER}"></span>', markers
+    markers = {
+        mode: f'<style>{compile_theme_css(rules)}{hide_markers}</style><span class="{THEME_MARKER}"></span>'
+        for mode, rules in THEME_CSS.items()
+    }
+    return "", markers
+
+def apply_theme_stylesheet():
+    """Emit the page-wide part of the theme (the stylesheet link, if served statically)."""
+    page_html, _ = get_theme_styles()
+    if page_html:
+        st.markdown(page_html, unsafe_allow_html=True)
 
 # ───────────────────────────────────────────────────────────────────
 # 4️⃣ SIDEBAR RENDERING
 # ───────────────────────────────────────────────────────────────────
-def render_sidebar():
-    """Render sidebar with theme toggle, settings, and FAQ."""
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### 🎨 Theme")
-    col1, col2 = st.sidebar.columns(2, gap="small")
+FAQ_ANSWERS = {
+    "What can this bot do?": "This chatbot can answer questions, provide suggestions, and summarize conversations.",
+    "How does the bot remember context?": "It keeps track of recent messages and can summarize older chats to maintain context.",
+    "Can I export the chat?": "Yes! You can download the chat history as JSON, CSV, or PDF.",
+    "Does it support multiple personalities?": "Yes, the bot can switch modes like casual, study helper, or recommendations."
+}
+
+def set_theme(theme_mode):
+    st.session_state.theme_mode = theme_mode
+
+@fragment
+def render_settings():
+    """Settings widgets; changing one reruns only this fragment."""
+    with metrics.timer("fragment_settings"):
+        st.markdown("### ⚙️ Settings")
+        st.slider("📊 Keep last N turns", min_value=1, max_value=20, value=6, key="max_turns")
+        st.slider("🧮 Context token budget", min_value=256, max_value=8192, value=DEFAULT_TOKEN_BUDGET, step=256, key="token_budget")
+        st.text_input("🤖 Model name", value="command-nightly", key="model_name")
+        st.checkbox("📝 Auto-summarize history", value=False, key="auto_summarize")
+        st.checkbox("⚡ Stream replies", value=True, key="stream_replies")
+        st.checkbox(
+            "🧭 Auto-route models", value=AUTO_ROUTE, key="auto_route",
+            help=f"Short questions and summaries go to {FAST_MODEL}; complex ones stay on the model above. "
+            f"Either yields to the other when its p95 latency exceeds {ROUTER_SLO_SECONDS:g}s or it keeps failing.",
+        )
+        st.session_state.chat_history.policy = st.selectbox(
+            "🧠 When memory is full", OVERFLOW_POLICIES, index=OVERFLOW_POLICIES.index(st.session_state.chat_history.policy)
+        )
+        st.caption(
+            f"🧠 Session memory ≈ {session_memory_bytes() / 1024:.1f} KB • {len(st.session_state.chat_history)} turn(s) in memory"
+        )
+
+@fragment
+def render_faq():
+    """FAQ picker; choosing a question reruns only this fragment."""
+    with metrics.timer("fragment_faq"):
+        st.markdown("### ❓ FAQ")
+        faq_choice = st.selectbox("Select a question", [""] + list(FAQ_ANSWERS.keys()))
+        if faq_choice:
+            st.info(FAQ_ANSWERS[faq_choice])
+
+@fragment
+def render_theme_picker():
+    """Theme buttons plus the marker element that applies the active theme.
+
+    Switching reruns only this fragment, which swaps the marker.
+    """
+    st.markdown("### 🎨 Theme")
+    col1, col2 = st.columns(2, gap="small")
     with col1:
-        if st.button("☀️ Light", key="light_btn", use_container_width=True):
-            st.session_state.theme_mode = "light"
-            st.rerun()
+        st.button("☀️ Light", key="light_btn", on_click=set_theme, args=("light",), use_container_width=True)
     with col2:
-        if st.button("🌙 Dark", key="dark_btn", use_container_width=True):
-            st.session_state.theme_mode = "dark"
-            st.rerun()
-    st.sidebar.markdown("---")
-
-    st.sidebar.markdown("### ⚙️ Settings")
-    max_turns = st.sidebar.slider("📊 Keep last N turns", min_value=1, max_value=20, value=6)
-    model_name = st.sidebar.text_input("🤖 Model name", value="command-nightly")
-    auto_summarize = st.sidebar.checkbox("📝 Auto-summarize history", value=False)
-
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### ❓ FAQ")
-    faq_questions = {
-        "What can this bot do?": "This chatbot can answer questions, provide suggestions, and summarize conversations.",
-        "How does the bot remember context?": "It keeps track of recent messages and can summarize older chats to maintain context.",
-        "Can I export the chat?": "Yes! You can download the chat history as JSON, CSV, or PDF.",
-        "Does it support multiple personalities?": "Yes, the bot can switch modes like casual, study helper, or recommendations."
-    }
-    faq_choice = st.sidebar.selectbox("Select a question", [""] + list(faq_questions.keys()))
-    if faq_choice:
-        st.sidebar.info(faq_questions[faq_choice])
-    
-    return max_turns, model_name, auto_summarize
+        st.button("🌙 Dark", key="dark_btn", on_click=set_theme, args=("dark",), use_container_width=True)
+    _, markers = get_theme_styles()
+    st.markdown(markers[st.session_state.theme_mode], unsafe_allow_html=True)
+
+def render_sidebar():
+    """Render sidebar with theme toggle, settings, and FAQ.
+
+    The conversation button reruns the whole app; theme, settings and FAQ
+    are fragments.
+    """
+    with st.sidebar:
+        st.markdown("---")
+        render_theme_picker()
+        st.markdown("---")
+
+        render_settings()
+
+        st.markdown("---")
+        st.markdown("### 🗂️ Conversation")
+        st.caption(f"ID `{st.session_state.chat_session.conversation_id}` • bookmark this page to resume")
+        st.button("🆕 New conversation", on_click=new_conversation, use_container_width=True)
+
+        st.markdown("---")
+        render_faq()
+
+def chat_settings():
+    """Return ``(max_turns, model_name, auto_summarize, stream_replies, token_budget, auto_route)`` from the settings widgets."""
+    state = st.session_state
+    return state.max_turns, state.model_name, state.auto_summarize, state.stream_replies, state.token_budget, state.auto_route
 
 # ───────────────────────────────────────────────────────────────────
 # 5️⃣ MAIN HEADER RENDERING
@@ -380,7 +500,7 @@ def render_chat_input():
         send_clicked = st.form_submit_button("🚀 Send", use_container_width=True)
     
     if user_input and len(user_input) > 2:
-        suggestion = get_suggestions(user_input)
+        suggestion = backend.suggest(user_input)
         if suggestion:
             st.info(f"💡 Suggestion: {suggestion}")
     
@@ -389,75 +509,194 @@ def render_chat_input():
 # ───────────────────────────────────────────────────────────────────
 # 7️⃣ CHAT DISPLAY RENDERING
 # ───────────────────────────────────────────────────────────────────
+CHAT_PAGE_SIZE = 20
+SEARCH_RESULTS = 10
+
+def render_turn_markdown(turn):
+    """Format one turn as a single escaped markdown/HTML block."""
+    ts = turn.time
+    user_msg = html.escape(turn.user).replace("\n", "<br>")
+    ai_msg = html.escape(turn.ai).replace("\n", "<br>")
+    header = f"**🧑 You** `{ts}`" if ts else f"**🧑 You**"
+    anchor = f"<span id='turn-{turn.seq}'></span>" if turn.seq is not None else ""
+    return (
+        f"{anchor}{header}\n\n"
+        f"<p style='color: #1e40af; font-size: 16px; font-weight: 500;'>>> {user_msg}</p>\n\n"
+        f"**🤖 AI**\n\n"
+        f"<p style='color: #1e40af; font-size: 16px; font-weight: 500;'>>> {ai_msg}</p>\n\n"
+        "---"
+    )
+
+def cached_turn_markdown(turn):
+    """Return the rendered block for ``turn``, formatting it at most once."""
+    cache = st.session_state.setdefault("render_cache", {})
+    entry = cache.get(id(turn))
+    if entry is None or entry[0] is not turn:
+        metrics.miss("render")
+        entry = (turn, render_turn_markdown(turn))
+        cache[id(turn)] = entry
+    else:
+        metrics.hit("render")
+    return entry[1]
+
+def load_older_turns():
+    st.session_state.display_limit = st.session_state.get("display_limit", CHAT_PAGE_SIZE) + CHAT_PAGE_SIZE
+
 def render_chat_display():
-    """Render chat history display."""
-    if st.session_state.chat_history:
+    """Render chat history display.
+
+    Only the newest ``display_limit`` turns are emitted, one markdown element
+    per turn; "Load older" pages further back, reading from the conversation
+    store once the request goes past the in-memory window.
+    """
+    t0 = time.perf_counter()
+    history = st.session_state.chat_history
+    if history:
         st.markdown("### 💬 Conversation")
-        for turn in reversed(st.session_state.chat_history):
-            ts = turn.get("time")
-            user_msg = turn.get('user','')
-            ai_msg = turn.get('ai','')
-            
-            st.markdown(f"**🧑 You** `{ts}`" if ts else f"**🧑 You**")
-            st.markdown(f"<p style='color: #1e40af; font-size: 16px; font-weight: 500;'>>> {user_msg}</p>", unsafe_allow_html=True)
-            
-            st.markdown(f"**🤖 AI**")
-            st.markdown(f"<p style='color: #1e40af; font-size: 16px; font-weight: 500;'>>> {ai_msg}</p>", unsafe_allow_html=True)
-            st.markdown("---")
+        if history.summary is not None:
+            with st.expander("📝 Running summary"):
+                st.markdown(history.summary.ai)
+        turns = history.turns()
+        limit = st.session_state.get("display_limit", CHAT_PAGE_SIZE)
+        total = backend.count_turns(st.session_state.chat_session)
+        if limit <= len(turns) or total <= len(turns):
+            visible = turns[-limit:]
+        else:
+            visible = backend.load_recent(st.session_state.chat_session, limit)
+        for turn in reversed(visible):
+            st.markdown(cached_turn_markdown(turn), unsafe_allow_html=True)
+        hidden = total - len(visible)
+        if hidden > 0:
+            st.button(f"⬇️ Load older ({hidden} more)", on_click=load_older_turns, use_container_width=True)
+        # Drop cached blocks for turns that are no longer shown
+        cache = st.session_state.render_cache
+        if len(cache) > 2 * len(visible):
+            keep = {id(turn) for turn in visible}
+            for key in [key for key in cache if key not in keep]:
+                del cache[key]
+        render_ms = (time.perf_counter() - t0) * 1000
+        st.caption(f"⏱️ Rendered {len(visible)} of {max(total, len(visible))} turns in {render_ms:.1f}ms")
     else:
         st.info("💭 Start a conversation by typing a message!")
 
+def escape_markdown(text):
+    """Escape ``text`` for display inside ``st.markdown``."""
+    return re.sub(r"([\\`*_{}\[\]()#+\-.!|~>])", r"\\\1", html.escape(text, quote=False))
+
+def jump_to_turn(seq):
+    """Widen the transcript window to reach turn ``seq`` and scroll to it."""
+    newer = backend.count_turns(st.session_state.chat_session, min_seq=seq)
+    st.session_state.display_limit = max(st.session_state.get("display_limit", CHAT_PAGE_SIZE), newer)
+    st.session_state.scroll_to_turn = seq
+
+def render_search():
+    """Search box over the whole conversation, summary included, with jump links."""
+    query = st.text_input("🔎 Search this conversation", key="search_query", placeholder='words, "a phrase" or pref*')
+    if not query.strip():
+        return
+    from search_index import highlight
+
+    session = st.session_state.chat_session
+    t0 = time.perf_counter()
+    results = backend.search(session, query, limit=SEARCH_RESULTS)
+    search_ms = (time.perf_counter() - t0) * 1000
+    st.caption(f"🔎 {len(results)} match(es) in {search_ms:.1f}ms")
+    for i, (turn, score) in enumerate(results):
+        text_col, jump_col = st.columns([6, 1], gap="small")
+        with text_col:
+            if turn.user == SUMMARY_TAG:
+                st.markdown(f"📝 **Running summary** — {highlight(escape_markdown(turn.ai), query)}")
+            else:
+                st.markdown(
+                    f"`#{turn.seq}` `{turn.time}` 🧑 {highlight(escape_markdown(turn.user), query, width=100)}"
+                    f"  \n🤖 {highlight(escape_markdown(turn.ai), query)}"
+                )
+        if turn.user != SUMMARY_TAG:
+            with jump_col:
+                st.button("↪️ Jump", key=f"jump_{i}_{turn.seq}", on_click=jump_to_turn, args=(turn.seq,))
+
 # ───────────────────────────────────────────────────────────────────
 # 8️⃣ EXPORT CONTROLS RENDERING
 # ───────────────────────────────────────────────────────────────────
+EXPORT_FORMATS = {
+    "json": ("📄 JSON", "chat_history.json", "application/json"),
+    "csv": ("📊 CSV", "chat_history.csv", "text/csv"),
+    "pdf": ("📑 PDF", "chat_history.pdf", "application/pdf"),
+    "jsonl": ("🧾 JSONL", "chat_history.jsonl", "application/x-ndjson"),
+    "jsonl_gz": ("🗜️ JSONL.gz", "chat_history.jsonl.gz", "application/gzip"),
+}
+
+def clear_chat():
+    backend.clear(st.session_state.chat_session)
+
+def import_history():
+    """Append the uploaded JSONL (or .jsonl.gz) export to this conversation."""
+    uploaded = st.session_state.get("import_file")
+    if uploaded is None:
+        return
+    session = st.session_state.chat_session
+    before = backend.count_turns(session)
+    try:
+        with metrics.timer("import"):
+            count = backend.import_turns(session, iter_import_turns(uploaded))
+    except (ValueError, OSError, EOFError) as e:
+        added = backend.count_turns(session) - before
+        st.session_state.import_notice = ("error", f"Import stopped after {added} turn(s): {e}")
+    else:
+        st.session_state.import_notice = ("success", f"📤 Imported {count} turn(s) from {uploaded.name}")
+
 def render_export_controls():
-    """Render export and control buttons."""
+    """Render export and control buttons.
+
+    Exports are only generated when a format is requested, and are memoized
+    against the session's history version so reruns reuse them until the
+    history changes. Exports of older versions are dropped, so the session
+    holds at most one copy per format.
+    """
     st.markdown("### 📥 Export & Controls")
-    col1, col2, col3, col4 = st.columns(4, gap="small")
+    clear_col, *format_cols = st.columns(1 + len(EXPORT_FORMATS), gap="small")
 
-    with col1:
-        if st.button("🗑️ Clear Chat", use_container_width=True):
-            st.session_state.chat_history.clear()
-            st.rerun()
+    with clear_col:
+        st.button("🗑️ Clear Chat", on_click=clear_chat, use_container_width=True)
+
+    session = st.session_state.chat_session
+    version = (session.conversation_id, session.version)
+    export_cache = st.session_state.export_cache
+    for fmt in [fmt for fmt, (cached_version, _) in export_cache.items() if cached_version != version]:
+        del export_cache[fmt]
 
     if st.session_state.chat_history:
-        with col2:
-            history_json = json.dumps(st.session_state.chat_history, indent=2)
-            st.download_button("📄 JSON", data=history_json, file_name="chat_history.json", mime="application/json", use_container_width=True)
-        
-        with col3:
-            csv_buffer = StringIO()
-            writer = csv.writer(csv_buffer)
-            writer.writerow(["timestamp","user","ai"])
-            for t in st.session_state.chat_history:
-                writer.writerow([t.get("time",""), t.get("user",""), t.get("ai","")])
-            csv_bytes = csv_buffer.getvalue().encode("utf-8")
-            st.download_button("📊 CSV", data=csv_bytes, file_name="chat_history.csv", mime="text/csv", use_container_width=True)
-        
-        with col4:
-            try:
-                pdf = FPDF()
-                pdf.set_auto_page_break(auto=True, margin=15)
-                pdf.add_page()
-                pdf.set_font("Arial", size=11)
-                for t in st.session_state.chat_history:
-                    # Clean unicode characters for PDF compatibility
-                    user_text = f"[{t.get('time','')}] You: {t.get('user','')}"
-                    ai_text = f"AI: {t.get('ai','')}"
-                    # Replace special unicode characters
-                    user_text = user_text.encode('ascii', 'replace').decode('ascii')
-                    ai_text = ai_text.encode('ascii', 'replace').decode('ascii')
-                    pdf.multi_cell(0, 6, user_text)
-                    pdf.multi_cell(0, 6, ai_text)
-                    pdf.ln(1)
-                pdf_bytes = pdf.output(dest='S').encode('latin-1')
-                st.download_button("📑 PDF", data=pdf_bytes, file_name="chat_history.pdf", mime="application/pdf", use_container_width=True)
-            except Exception as e:
-                st.warning(f"PDF download temporarily unavailable: {str(e)}")
+        for col, (fmt, (label, file_name, mime)) in zip(format_cols, EXPORT_FORMATS.items()):
+            with col:
+                slot = st.empty()
+                cached = export_cache.get(fmt)
+                if cached is None or cached[0] != version:
+                    if not slot.button(f"{label} • prepare", key=f"prepare_{fmt}", use_container_width=True):
+                        continue
+                    metrics.miss("export")
+                    try:
+                        with metrics.timer(f"export_{fmt}"):
+                            cached = (version, build_export(fmt, backend.iter_turns(session)))
+                    except Exception as e:
+                        slot.warning(f"{fmt.upper()} download temporarily unavailable: {str(e)}")
+                        continue
+                    export_cache[fmt] = cached
+                else:
+                    metrics.hit("export")
+                slot.download_button(label, data=cached[1], file_name=file_name, mime=mime, use_container_width=True)
+
+    with st.expander("📤 Import history"):
+        st.file_uploader("JSONL export (.jsonl or .jsonl.gz)", type=["jsonl", "gz"], key="import_file")
+        st.button("📤 Import into this conversation", on_click=import_history, use_container_width=True)
+        notice = st.session_state.pop("import_notice", None)
+        if notice is not None:
+            (st.success if notice[0] == "success" else st.error)(notice[1])
 
 # ═══════════════════════════════════════════════════════════════════
 # 🤖 BACKEND - CORE LOGIC SECTION
 # ═══════════════════════════════════════════════════════════════════
+# The chat logic itself lives in chat_core.py; this section wires it to
+# Streamlit: cached process-wide resources and per-session state.
 
 # ───────────────────────────────────────────────────────────────────
 # 1️⃣ COHERE API SETUP
@@ -467,65 +706,194 @@ if not COHERE_API_KEY:
     st.error("❌ Cohere API key not found. Set COHERE_API_KEY environment variable.")
     st.stop()
 
+API_TIMEOUT = float(os.getenv("CHAT_API_TIMEOUT", "30"))
+API_MAX_RETRIES = int(os.getenv("CHAT_API_RETRIES", "2"))
+API_HEDGE = os.getenv("CHAT_API_HEDGE", "0") == "1"
+API_WARMUP = os.getenv("CHAT_API_WARMUP", "0") == "1"  # cheap authenticated call at startup
+
+def build_cohere_client(api_key):
+    import cohere
+    return cohere.Client(api_key, timeout=API_TIMEOUT)
+
+def warm_up_client(client):
+    """Open the HTTP connection pool (DNS, TCP, TLS) with a request that costs no tokens."""
+    client.models.list(page_size=1)
+
 @st.cache_resource
 def get_cohere_client(api_key):
-    """Initialize and cache Cohere API client."""
-    import cohere
-    return cohere.Client(api_key)
+    """Initialize and cache Cohere API client behind the resilience wrapper.
+
+    The ``cohere`` import and client construction run on a background thread
+    started by the first script run, so the page renders while the client
+    warms up; the first message waits only for whatever is left.
+    """
+    prewarmed = PrewarmedClient(
+        lambda: build_cohere_client(api_key), warmup=warm_up_client if API_WARMUP else None
+    )
+    return ResilientClient(prewarmed, timeout=API_TIMEOUT, max_retries=API_MAX_RETRIES, hedge=API_HEDGE)
 
 co = get_cohere_client(COHERE_API_KEY)
 
 # ───────────────────────────────────────────────────────────────────
-# 2️⃣ UTILITY FUNCTIONS
+# 2️⃣ SHARED RESOURCES
 # ───────────────────────────────────────────────────────────────────
-def build_prompt(history, user_input, max_turns=6):
-    """Build conversation prompt from chat history."""
-    recent = history[-max_turns:] if history else []
-    conversation_prompt = ""
-    for turn in recent:
-        conversation_prompt += f"Human: {turn.get('user','')}\nAI: {turn.get('ai','')}\n"
-    conversation_prompt += f"Human: {user_input}\nAI (answer clearly and completely):"
-    return conversation_prompt
-
-def summarize_history(history, keep_last, co_client, model_name):
-    """Summarize old chat history to maintain context."""
-    if len(history) <= keep_last + 2:
-        return history
-    to_summarize = history[:-keep_last]
-    summary_prompt = "Summarize the following conversation into a short context summary:\n\n"
-    for turn in to_summarize:
-        summary_prompt += f"Human: {turn.get('user','')}\nAI: {turn.get('ai','')}\n"
-    summary_prompt += "\nSummary:"
-    resp = co_client.chat(model=model_name, message=summary_prompt)
-    summary_text = resp.text.strip()
-    new_history = [{"user": "[summary]", "ai": summary_text, "time": time.strftime("%Y-%m-%d %H:%M:%S")}]
-    new_history.extend(history[-keep_last:])
-    return new_history
-
-def get_suggestions(user_input):
-    """Generate AI suggestions based on user input keywords."""
-    user_lower = user_input.lower()
-    suggestion_map = {
-        "hello": "👋 Hi! How can I help you today?",
-        "hi": "👋 Hello! What would you like to know?",
-        "how": "❓ Ask me anything - I'm here to help!",
-        "what": "🤔 I can answer questions about various topics",
-        "tell": "📚 Sure! I can provide information on any topic",
-        "code": "💻 Need help with coding? I'm here!",
-        "explain": "📖 I can explain complex topics simply",
-        "help": "🆘 What do you need help with?",
-        "who": "👤 I'm Tech Alpha - your AI Assistant!",
-        "when": "⏰ I can help with time-related questions",
-        "where": "🗺️ I can provide location information",
-        "why": "🔍 Let me explain the reasoning behind that",
-    }
-    for key, suggestion in suggestion_map.items():
-        if key in user_lower:
-            return suggestion
-    return None
+CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600"))
+CACHE_DB_PATH = os.getenv("CHAT_CACHE_DB")  # optional SQLite file for a persistent tier
+CACHE_MAX_DISK_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_DISK_ENTRIES", "10000"))
+CHAT_DB_PATH = os.getenv("CHAT_DB_PATH", "chat_history.db")
+MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "100"))
+DEFAULT_OVERFLOW_POLICY = os.getenv("CHAT_OVERFLOW_POLICY", "spill")
+SUGGESTIONS_PATH = os.getenv("CHAT_SUGGESTIONS_PATH", DEFAULT_CORPUS_PATH)
+METRICS_DUMP_PATH = os.getenv("CHAT_METRICS_PATH")  # .json or .prom file, written periodically
+METRICS_DUMP_INTERVAL = float(os.getenv("CHAT_METRICS_INTERVAL", "30"))
+SEMANTIC_CACHE = os.getenv("CHAT_SEMANTIC_CACHE", "0") == "1"  # experimental, opt-in near-duplicate answers
+SEMANTIC_THRESHOLD = float(os.getenv("CHAT_SEMANTIC_THRESHOLD", "0.9"))
+SEMANTIC_MAX_ENTRIES = int(os.getenv("CHAT_SEMANTIC_MAX_ENTRIES", "10000"))
+LLM_WORKERS = int(os.getenv("CHAT_LLM_WORKERS", "4"))  # concurrent upstream calls, all sessions
+LLM_RATE_PER_MINUTE = float(os.getenv("CHAT_LLM_RATE_PER_MINUTE", "500"))  # API quota; 0 disables
+LLM_BURST = float(os.getenv("CHAT_LLM_BURST", "10"))
+AUTO_ROUTE = os.getenv("CHAT_AUTO_ROUTE", "0") == "1"  # default of the sidebar's auto-route checkbox
+FAST_MODEL = os.getenv("CHAT_FAST_MODEL", "command-light")
+ROUTER_SLO_SECONDS = float(os.getenv("CHAT_ROUTER_SLO", "4"))
+
+@st.cache_resource
+def get_response_cache(max_entries, ttl_seconds, db_path, max_disk_entries):
+    """Initialize and cache the process-wide response cache."""
+    return ResponseCache(
+        max_entries=max_entries, ttl_seconds=ttl_seconds, db_path=db_path, max_disk_entries=max_disk_entries
+    )
+
+@st.cache_resource
+def get_conversation_store(db_path):
+    """Initialize and cache the process-wide conversation store."""
+    return ConversationStore(db_path)
+
+@st.cache_resource
+def get_suggestion_engine(corpus_path):
+    """Load the suggestion corpus once and cache its index."""
+    return SuggestionEngine.from_file(corpus_path)
+
+@st.cache_resource
+def get_summary_executor():
+    """Initialize and cache the worker pool that runs rolling summaries."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarizer")
+
+@st.cache_resource
+def get_metrics(dump_path, dump_interval):
+    """Initialize and cache the process-wide metrics registry (and its file dumper)."""
+    registry = Metrics()
+    if dump_path:
+        MetricsDumper(registry, dump_path, interval=dump_interval)
+    return registry
+
+@st.cache_resource
+def get_request_scheduler(workers, rate_per_minute, burst, _metrics):
+    """Initialize and cache the scheduler every upstream LLM call goes through."""
+    return RequestScheduler(max_workers=workers, rate=rate_per_minute / 60 or None, burst=burst, metrics=_metrics)
+
+@st.cache_resource
+def get_semantic_cache(threshold, max_entries, _metrics):
+    """Initialize and cache the opt-in semantic answer cache (imports NumPy on first use)."""
+    from semantic_cache import SemanticCache
+    return SemanticCache(threshold=threshold, max_entries=max_entries, metrics=_metrics)
+
+@st.cache_resource
+def get_model_router(fast_model, slo_seconds, _metrics):
+    """Initialize and cache the model router, whose latency stats are shared by every session."""
+    return ModelRouter(fast_model, slo_seconds=slo_seconds, metrics=_metrics)
+
+response_cache = get_response_cache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_DB_PATH, CACHE_MAX_DISK_ENTRIES)
+metrics = get_metrics(METRICS_DUMP_PATH, METRICS_DUMP_INTERVAL)
+backend = ChatBackend(
+    co,
+    response_cache=response_cache,
+    store=get_conversation_store(CHAT_DB_PATH),
+    metrics=metrics,
+    summary_executor=get_summary_executor(),
+    suggestion_engine=get_suggestion_engine(SUGGESTIONS_PATH),
+    scheduler=get_request_scheduler(LLM_WORKERS, LLM_RATE_PER_MINUTE, LLM_BURST, metrics),
+    semantic_cache=get_semantic_cache(SEMANTIC_THRESHOLD, SEMANTIC_MAX_ENTRIES, metrics) if SEMANTIC_CACHE else None,
+    router=get_model_router(FAST_MODEL, ROUTER_SLO_SECONDS, metrics),
+)
+
+# ───────────────────────────────────────────────────────────────────
+# 3️⃣ SESSION WIRING
+# ───────────────────────────────────────────────────────────────────
+def ensure_conversation():
+    """Attach this session to a conversation, resuming ``?conversation=`` if given."""
+    session = st.session_state.get("chat_session")
+    if session is not None:
+        return session
+    conversation_id = st.query_params.get("conversation")
+    if conversation_id and backend.has_conversation(conversation_id):
+        session = backend.load_session(conversation_id, memory_turns=MEMORY_TURNS, policy=DEFAULT_OVERFLOW_POLICY)
+    else:
+        ctx = get_script_run_ctx()
+        session = backend.new_session(
+            session_id=ctx.session_id if ctx else None, memory_turns=MEMORY_TURNS, policy=DEFAULT_OVERFLOW_POLICY
+        )
+        st.query_params["conversation"] = session.conversation_id
+    st.session_state.chat_session = session
+    st.session_state.chat_history = session.history
+    return session
+
+def new_conversation():
+    st.session_state.chat_session = None
+    st.session_state.display_limit = CHAT_PAGE_SIZE
+    st.query_params.clear()
+
+def apply_pending_summary():
+    """Swap in a finished background summary and surface summary failures."""
+    session = st.session_state.chat_session
+    applied = backend.apply_pending_summary(session)
+    if session.summary_error is not None:
+        st.warning(f"Background summary failed: {str(session.summary_error)}")
+        session.summary_error = None
+    return applied
+
+def session_memory_bytes():
+    """Approximate bytes this session holds for history, rendered turns and exports.
+
+    Walking a long history takes milliseconds, so the total is memoized until
+    the history, the render cache or the prepared exports change.
+    """
+    session = st.session_state.chat_session
+    render_cache = st.session_state.get("render_cache", {})
+    export_cache = st.session_state.get("export_cache", {})
+    version = (
+        session.conversation_id, session.version, len(render_cache),
+        tuple(sorted((fmt, cached_version) for fmt, (cached_version, _) in export_cache.items())),
+    )
+    cached = st.session_state.get("memory_bytes")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    total = session.history.memory_bytes()
+    for _, block in render_cache.values():
+        total += sys.getsizeof(block)
+    for _, data in export_cache.values():
+        total += sys.getsizeof(data)
+    st.session_state.memory_bytes = (version, total)
+    return total
+
+def scroll_to_turn(seq):
+    """Scroll the transcript to turn ``seq`` (rendered with a ``turn-<seq>`` anchor)."""
+    import streamlit.components.v1 as components
+
+    components.html(
+        f"""
+        <script>
+        const target = parent.document.getElementById("turn-{int(seq)}");
+        if (target) {{ target.scrollIntoView({{ behavior: 'smooth', block: 'start' }}); }}
+        </script>
+        """,
+        height=0,
+    )
 
 def scroll_to_top():
     """Smooth scroll to top of page."""
+    import streamlit.components.v1 as components
+
     components.html(
         """
         <script>
@@ -540,59 +908,191 @@ def scroll_to_top():
     )
 
 # ───────────────────────────────────────────────────────────────────
-# 3️⃣ MESSAGE PROCESSING LOGIC
+# 4️⃣ MESSAGE PROCESSING LOGIC
 # ───────────────────────────────────────────────────────────────────
-def process_message(user_input, max_turns, model_name, auto_summarize):
-    """Process user message and get AI response."""
+def render_stream(user_input, slot):
+    """Return a ``render_stream`` callback that draws the turn as tokens arrive.
+
+    The turn streams into ``slot``, where the transcript starts, so it sits
+    where its stored copy will be drawn once the stream ends.
+    """
+    def render(chunks):
+        with slot.container():
+            st.markdown("### 💬 Conversation")
+            st.markdown(f"**🧑 You**")
+            st.markdown(f"<p style='color: #1e40af; font-size: 16px; font-weight: 500;'>>> {html.escape(user_input)}</p>", unsafe_allow_html=True)
+            st.markdown(f"**🤖 AI**")
+            streamed = st.write_stream(chunks)
+        return streamed if isinstance(streamed, str) else "".join(map(str, streamed))
+    return render
+
+def queue_notice():
+    """Return an ``on_queue`` callback that shows the user's place in line."""
+    slot = st.empty()
+    def show(position):
+        if position is None:
+            slot.empty()
+        else:
+            slot.info(f"⏳ Busy right now: you're #{position + 1} in line")
+    return show
+
+def process_message(
+    user_input, max_turns, model_name, auto_summarize, stream=False, token_budget=DEFAULT_TOKEN_BUDGET, auto_route=False,
+    transcript=None,
+):
+    """Process user message and get AI response.
+
+    With ``stream``, tokens are drawn into ``transcript`` (a placeholder where
+    the transcript goes), or inline when it is not given.
+    """
     if not user_input or not user_input.strip():
         return False
-    
-    # Auto-summarize if needed
-    if auto_summarize and len(st.session_state.chat_history) > (max_turns * 3):
-        st.session_state.chat_history = summarize_history(
-            st.session_state.chat_history, keep_last=max_turns, co_client=co, model_name=model_name
-        )
-
-    # Get AI response
-    prompt = build_prompt(st.session_state.chat_history, user_input, max_turns=max_turns)
-    with st.spinner("⚡ Generating reply..."):
-        t0 = time.time()
-        response = co.chat(model=model_name, message=prompt)
-        latency = time.time() - t0
 
-    # Store in history
-    bot_reply = response.text.strip()
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    st.session_state.chat_history.append({"user": user_input, "ai": bot_reply, "time": timestamp})
+    apply_pending_summary()
+    session = st.session_state.chat_session
+    on_queue = queue_notice()
+    try:
+        if stream:
+            # Render tokens as they arrive; the turn is only stored once the stream ends
+            reply = backend.process_message(
+                session, user_input, max_turns, model_name, auto_summarize=auto_summarize,
+                token_budget=token_budget, stream=True, render_stream=render_stream(user_input, transcript or st.empty()), on_queue=on_queue,
+                route=auto_route,
+            )
+        else:
+            with st.spinner("⚡ Generating reply..."):
+                reply = backend.process_message(
+                    session, user_input, max_turns, model_name, auto_summarize=auto_summarize, token_budget=token_budget,
+                    on_queue=on_queue, route=auto_route,
+                )
+    except CircuitOpenError as e:
+        st.error(f"🚧 The AI service is having trouble, so requests are paused. {str(e)}.")
+        return False
+    except DeadlineExceeded:
+        st.error(f"⏳ No reply within {co.timeout:.0f}s. Please try again.")
+        return False
+    except Exception as e:
+        st.error(f"❌ Reply failed: {str(e)}")
+        return False
 
     st.session_state.scroll_to_top = True
-    st.success(f"✅ Reply received in {latency:.2f}s")
+    if reply.similarity is not None:
+        st.success(f"🧭 Answered from a similar earlier question ({reply.similarity:.0%} match) in {reply.latency * 1000:.1f}ms")
+    elif reply.cached:
+        st.success(f"⚡ Cached reply in {reply.latency * 1000:.1f}ms (cache hit ratio {response_cache.stats()['hit_ratio']:.0%})")
+    elif reply.shared:
+        st.success(f"🤝 Shared an identical in-flight request • reply in {reply.latency:.2f}s")
+    elif reply.first_token is not None:
+        st.success(f"✅ First token in {reply.first_token:.2f}s • full reply in {reply.latency:.2f}s")
+    else:
+        st.success(f"✅ Reply received in {reply.latency:.2f}s")
+    st.caption(f"🧮 Prompt: {reply.prompt_tokens:,} tokens • {reply.prompt_turns} turn(s) of context")
+    if reply.route is not None:
+        st.caption(f"🧭 Routed to `{reply.model}`: {reply.route}")
     return True
 
+# ───────────────────────────────────────────────────────────────────
+# 5️⃣ INSTRUMENTATION
+# ───────────────────────────────────────────────────────────────────
+def render_router_stats(stats):
+    """Per-model routing counts and rolling latencies, then the latest routing decisions."""
+    if not stats["models"]:
+        return
+    rows = [
+        f"| model (SLO {stats['slo_seconds']:g}s) | routed | calls | p50 | p95 | errors |",
+        "|---|---:|---:|---:|---:|---:|",
+    ]
+    for model, model_stats in sorted(stats["models"].items()):
+        cells = [f"{model_stats[key]:.2f}s" if model_stats[key] is not None else "-" for key in ("p50", "p95")]
+        rows.append(
+            f"| {model} | {model_stats['routed']} | {model_stats['calls']} | " + " | ".join(cells)
+            + f" | {model_stats['error_rate']:.0%} |"
+        )
+    st.markdown("\n".join(rows))
+    for decision in stats["decisions"][:5]:
+        st.caption(f"🧭 {time.strftime('%H:%M:%S', time.localtime(decision['time']))} → `{decision['model']}`: {decision['reason']}")
+
+def render_debug_panel():
+    """Hidden sidebar panel with stage latencies; shown with ``?debug=1`` or CHAT_DEBUG=1."""
+    if st.query_params.get("debug") != "1" and os.getenv("CHAT_DEBUG") != "1":
+        return
+    snap = metrics.snapshot()
+    with st.sidebar.expander("🛠️ Debug metrics", expanded=True):
+        rows = ["| stage | count | p50 | p95 | p99 |", "|---|---:|---:|---:|---:|"]
+        for stage, stats in sorted(snap["stages"].items()):
+            cells = [f"{stats[key] * 1000:.1f}ms" if stats[key] is not None else "-" for key in ("p50", "p95", "p99")]
+            rows.append(f"| {stage} | {stats['count']} | " + " | ".join(cells) + " |")
+        st.markdown("\n".join(rows))
+        rows = ["| cache | hits | misses | hit ratio |", "|---|---:|---:|---:|"]
+        for cache, stats in sorted(snap["caches"].items()):
+            rows.append(f"| {cache} | {stats['hits']} | {stats['misses']} | {stats['hit_ratio']:.0%} |")
+        st.markdown("\n".join(rows))
+        st.caption(f"Upstream: {co.stats()}")
+        st.caption(f"Scheduler: {backend.scheduler.stats()}")
+        if backend.semantic_cache is not None:
+            st.caption(f"Semantic cache: {backend.semantic_cache.stats()}")
+        render_router_stats(backend.router.stats())
+        prewarmed = co.client
+        if prewarmed.ready and prewarmed.build_seconds is not None:
+            warmup = f" • warm-up {prewarmed.warmup_seconds:.2f}s" if prewarmed.warmup_seconds is not None else ""
+            if prewarmed.warmup_error is not None:
+                warmup += f" (failed: {prewarmed.warmup_error})"
+            st.caption(f"Client built in {prewarmed.build_seconds:.2f}s{warmup}")
+        st.download_button("📈 Prometheus metrics", data=metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+
 # ═══════════════════════════════════════════════════════════════════
 # 🎯 MAIN APPLICATION FLOW
 # ═══════════════════════════════════════════════════════════════════
 
+# Attach this session to a stored conversation
+ensure_conversation()
+
+rerun_started = time.perf_counter()
+
 # Apply theme
-apply_premium_theme(st.session_state.theme_mode)
+with metrics.timer("theme_css"):
+    apply_theme_stylesheet()
 
 # Render all frontend components
-max_turns, model_name, auto_summarize = render_sidebar()
+with metrics.timer("sidebar"):
+    render_sidebar()
 render_header()
-user_input, send_clicked = render_chat_input()
-
-# Process message if sent
-if send_clicked:
-    process_message(user_input, max_turns, model_name, auto_summarize)
 
-# Display chat and export controls
-render_chat_display()
-if st.session_state.get('scroll_to_top', False):
-    scroll_to_top()
-    st.session_state.scroll_to_top = False
+@fragment
+def render_conversation():
+    """Input, reply, transcript and exports; sending a message reruns only this fragment."""
+    with metrics.timer("fragment_conversation"):
+        user_input, send_clicked = render_chat_input()
+        notices = st.container()
+        search_area = st.container()
+        # A streamed reply is drawn here and then replaced by the transcript, so it shows once
+        transcript = st.empty()
 
-render_export_controls()
+        # Process message if sent
+        apply_pending_summary()
+        if send_clicked:
+            max_turns, model_name, auto_summarize, stream_replies, token_budget, auto_route = chat_settings()
+            with notices:
+                process_message(
+                    user_input, max_turns, model_name, auto_summarize, stream=stream_replies, token_budget=token_budget,
+                    auto_route=auto_route, transcript=transcript,
+                )
 
+        # Search, then display chat and export controls
+        with search_area:
+            render_search()
+        with metrics.timer("chat_render"), transcript.container():
+            render_chat_display()
+        if st.session_state.get('scroll_to_top', False):
+            scroll_to_top()
+            st.session_state.scroll_to_top = False
+        seq = st.session_state.pop("scroll_to_turn", None)
+        if seq is not None:
+            scroll_to_turn(seq)
 
+        render_export_controls()
 
+render_conversation()
 
+metrics.observe("rerun", time.perf_counter() - rerun_started)
+render_debug_panel()
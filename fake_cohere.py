@@ -0,0 +1,69 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧪 FAKE COHERE CLIENT - DETERMINISTIC OFFLINE STAND-IN
+# ═══════════════════════════════════════════════════════════════════
+"""Deterministic stand-in for ``cohere.Client`` used by benchmarks and tools.
+
+Replies are derived from a hash of ``(model, message)``, so the same prompt
+always gets the same answer, and no network access is needed. Optional
+fixed latency (overridable per model) and per-chunk delay make
+timing-sensitive code observable.
+"""
+import hashlib
+import threading
+import time
+
+WORDS = (
+    "context", "answer", "model", "prompt", "summary", "token", "latency", "cache",
+    "stream", "session", "history", "export", "python", "question", "detail", "result",
+)
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeStreamEvent:
+    """Minimal Cohere streaming event: ``event_type`` plus optional ``text``."""
+
+    def __init__(self, event_type, text=None):
+        self.event_type = event_type
+        self.text = text
+
+class FakeCohereClient:
+    """Offline client with ``chat`` and ``chat_stream`` like ``cohere.Client``."""
+
+    def __init__(self, latency=0.0, chunk_delay=0.0, reply_words=24, model_latency=None):
+        self.latency = latency
+        self.model_latency = model_latency or {}  # model -> seconds, overriding ``latency``
+        self.chunk_delay = chunk_delay
+        self.reply_words = reply_words
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def reply_for(self, model, message):
+        digest = hashlib.sha256(f"{model}\0{message}".encode("utf-8")).digest()
+        words = [WORDS[digest[i % len(digest)] % len(WORDS)] for i in range(self.reply_words)]
+        return " ".join(words).capitalize() + "."
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def _wait(self, model):
+        latency = self.model_latency.get(model, self.latency)
+        if latency:
+            time.sleep(latency)
+
+    def chat(self, model=None, message="", **kwargs):
+        self._count()
+        self._wait(model)
+        return FakeResponse(self.reply_for(model, message))
+
+    def chat_stream(self, model=None, message="", **kwargs):
+        self._count()
+        self._wait(model)
+        yield FakeStreamEvent("stream-start")
+        for i, word in enumerate(self.reply_for(model, message).split(" ")):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield FakeStreamEvent("text-generation", word if i == 0 else " " + word)
+        yield FakeStreamEvent("stream-end")
@@ -0,0 +1,158 @@
+# ═══════════════════════════════════════════════════════════════════
+# 📈 METRICS - PER-STAGE LATENCY HISTOGRAMS & CACHE HIT RATIOS
+# ═══════════════════════════════════════════════════════════════════
+"""Lightweight in-process instrumentation.
+
+``Metrics`` keeps a rolling latency histogram per stage (p50/p95/p99 over
+the last ``window`` samples plus lifetime count and sum), hit/miss
+counters per cache and point-in-time gauges (e.g. queue depth). Snapshots can be rendered as Prometheus text exposition
+or JSON, and ``MetricsDumper`` writes them to a local file periodically.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Histogram:
+    """Rolling-window latency samples with lifetime count and sum."""
+
+    def __init__(self, window=1024):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self):
+        ordered = sorted(self._samples)
+        if not ordered:
+            return {q: None for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+class Metrics:
+    """Thread-safe registry of stage timers, cache hit/miss counters and gauges."""
+
+    def __init__(self, window=1024):
+        self.window = window
+        self.started = time.time()
+        self._stages = {}
+        self._caches = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.window)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the ``with`` block and record it under ``stage``."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def hit(self, cache):
+        self._count(cache, 0)
+
+    def miss(self, cache):
+        self._count(cache, 1)
+
+    def _count(self, cache, slot):
+        with self._lock:
+            counts = self._caches.setdefault(cache, [0, 0])
+            counts[slot] += 1
+
+    def gauge(self, name, value):
+        """Record the current value of ``name`` (last write wins)."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self):
+        """Return a JSON-serializable view of every stage and cache."""
+        with self._lock:
+            stages = {
+                stage: {"count": h.count, "sum": h.total, **{f"p{int(q * 100)}": v for q, v in h.quantiles().items()}}
+                for stage, h in self._stages.items()
+            }
+            caches = {
+                cache: {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+                for cache, (hits, misses) in self._caches.items()
+            }
+            gauges = dict(self._gauges)
+        return {
+            "timestamp": time.time(),
+            "uptime": time.time() - self.started,
+            "stages": stages,
+            "caches": caches,
+            "gauges": gauges,
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="chatbot"):
+        """Render the snapshot in Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per stage of a rerun.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, stats in sorted(snap["stages"].items()):
+            for q in QUANTILES:
+                value = stats[f"p{int(q * 100)}"]
+                if value is not None:
+                    lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        lines += [
+            f"# HELP {prefix}_cache_requests_total Cache lookups by result.",
+            f"# TYPE {prefix}_cache_requests_total counter",
+        ]
+        for cache, stats in sorted(snap["caches"].items()):
+            lines.append(f'{prefix}_cache_requests_total{{cache="{cache}",result="hit"}} {stats["hits"]}')
+            lines.append(f'{prefix}_cache_requests_total{{cache="{cache}",result="miss"}} {stats["misses"]}')
+        lines += [f"# HELP {prefix}_cache_hit_ratio Cache hit ratio.", f"# TYPE {prefix}_cache_hit_ratio gauge"]
+        for cache, stats in sorted(snap["caches"].items()):
+            lines.append(f'{prefix}_cache_hit_ratio{{cache="{cache}"}} {stats["hit_ratio"]:.6f}')
+        for name, value in sorted(snap["gauges"].items()):
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+class MetricsDumper:
+    """Background thread writing a metrics snapshot to ``path`` every ``interval`` seconds.
+
+    Paths ending in ``.prom`` get Prometheus text (e.g. for node_exporter's
+    textfile collector); anything else gets JSON.
+    """
+
+    def __init__(self, metrics, path, interval=30.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+        self._thread.start()
+
+    def dump(self):
+        text = self.metrics.to_prometheus() if self.path.endswith(".prom") else self.metrics.to_json()
+        # Write then rename so readers never see a partial file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.dump()
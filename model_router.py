@@ -0,0 +1,217 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧭 MODEL ROUTER - LATENCY-AWARE CHOICE BETWEEN TWO MODELS
+# ═══════════════════════════════════════════════════════════════════
+"""Pick the model for each request from the query and observed latencies.
+
+In auto mode a request goes either to the configured (quality) model or to
+a faster, cheaper one. Short, simple questions and background summaries
+prefer the fast model; long questions, code, several questions at once and
+"explain / why / compare" requests prefer the configured one.
+
+That preference yields to what has been observed. Every upstream answer
+reports the model's latency and whether it failed. The latency leaves out
+time spent queued in the scheduler and, for streamed replies, everything
+after the first token, so a busy app or a long answer does not make a
+model look slow. When the preferred model's rolling p95 is over the latency SLO, or
+its error rate is over ``max_error_rate``, the request goes to the other
+model if that one is healthy. Samples older than ``max_age`` seconds drop
+out, so a model that was routed away from gets retried once its bad
+samples expire.
+
+``stats`` reports per-model routing counts, latency percentiles and error
+rates, plus the most recent decisions and their reasons.
+"""
+import re
+import threading
+import time
+from collections import deque
+
+# Requests that usually need the stronger model
+COMPLEX_RE = re.compile(
+    r"\b(explain|why|how (?:do|does|can|could|would|should)|compare|difference|analy[sz]e|design|implement"
+    r"|debug|refactor|optimi[sz]e|prove|derive|step[- ]by[- ]step|pros and cons|trade-?offs?|essay)\b",
+    re.IGNORECASE,
+)
+CODE_RE = re.compile(r"```|[{};]|==|=>|\bdef \w+\(|\bSELECT\b.*\bFROM\b")
+
+class Route:
+    """One routing decision: the ``model`` to call and a human-readable ``reason``."""
+
+    __slots__ = ("model", "reason")
+
+    def __init__(self, model, reason):
+        self.model = model
+        self.reason = reason
+
+class ModelStats:
+    """Rolling latency and outcome samples of one model."""
+
+    def __init__(self, window, max_age, clock):
+        self.max_age = max_age
+        self.routed = 0
+        self.calls = 0
+        self.errors = 0
+        self._samples = deque(maxlen=window)  # (observed at, seconds, ok)
+        self._clock = clock
+
+    def add(self, seconds, ok):
+        self.calls += 1
+        self.errors += not ok
+        self._samples.append((self._clock(), seconds, ok))
+
+    def recent(self):
+        """Samples younger than ``max_age``; older ones are dropped."""
+        horizon = self._clock() - self.max_age
+        while self._samples and self._samples[0][0] < horizon:
+            self._samples.popleft()
+        return self._samples
+
+    def summary(self):
+        samples = self.recent()
+        # Failures often return early (fast rejections), so only successes count toward latency
+        latencies = sorted(seconds for _, seconds, ok in samples if ok)
+        failed = sum(1 for _, _, ok in samples if not ok)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+        return {
+            "samples": len(samples),
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "error_rate": failed / len(samples) if samples else 0.0,
+        }
+
+class ModelRouter:
+    """Route requests between a configured model and ``fast_model`` within ``slo_seconds``.
+
+    A model with fewer than ``min_samples`` recent samples counts as
+    healthy, so both models get measured before any fallback kicks in.
+    With ``metrics``, every observed call is also timed under the stage
+    ``model_<name>``.
+    """
+
+    def __init__(
+        self,
+        fast_model,
+        slo_seconds=4.0,
+        max_error_rate=0.2,
+        simple_words=12,
+        window=50,
+        max_age=300.0,
+        min_samples=5,
+        history=20,
+        metrics=None,
+        clock=time.monotonic,
+    ):
+        self.fast_model = fast_model
+        self.slo_seconds = slo_seconds
+        self.max_error_rate = max_error_rate
+        self.simple_words = simple_words
+        self.window = window
+        self.max_age = max_age
+        self.min_samples = min_samples
+        self.metrics = metrics
+        self._clock = clock
+        self._models = {}
+        self._decisions = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def _stats(self, model):
+        stats = self._models.get(model)
+        if stats is None:
+            stats = self._models[model] = ModelStats(self.window, self.max_age, self._clock)
+        return stats
+
+    # ── decisions ──────────────────────────────────────────────────
+    def classify(self, user_input):
+        """Return ``(is_simple, reason)`` for a user message."""
+        words = len(user_input.split())
+        if CODE_RE.search(user_input):
+            return False, "contains code"
+        match = COMPLEX_RE.search(user_input)
+        if match:
+            return False, f'asks "{match.group().lower()}"'
+        if user_input.count("?") > 1:
+            return False, "several questions"
+        if words > self.simple_words:
+            return False, f"long question ({words} words)"
+        return True, f"short question ({words} words)"
+
+    def route(self, model, user_input):
+        """Choose between ``model`` and the fast model for an interactive message."""
+        if not self.fast_model or self.fast_model == model:
+            return Route(model, "configured model")
+        simple, reason = self.classify(user_input)
+        if simple:
+            return self._choose(self.fast_model, model, reason, background=False)
+        return self._choose(model, self.fast_model, reason, background=False)
+
+    def route_background(self, model):
+        """Choose the model for a background summary of a conversation on ``model``."""
+        if not self.fast_model or self.fast_model == model:
+            return Route(model, "configured model")
+        return self._choose(self.fast_model, model, "background summary", background=True)
+
+    def _health(self, model):
+        """Return ``(healthy, detail)``; too few samples counts as healthy."""
+        summary = self._stats(model).summary()
+        if summary["samples"] < self.min_samples:
+            return True, summary
+        if summary["error_rate"] > self.max_error_rate:
+            return False, summary
+        return summary["p95"] is None or summary["p95"] <= self.slo_seconds, summary
+
+    def _describe(self, model, summary):
+        if summary["error_rate"] > self.max_error_rate:
+            return f"{model} failing ({summary['error_rate']:.0%} errors)"
+        return f"{model} p95 {summary['p95']:.1f}s over {self.slo_seconds:g}s SLO"
+
+    def _choose(self, preferred, other, reason, background):
+        with self._lock:
+            healthy, summary = self._health(preferred)
+            chosen = preferred
+            if not healthy:
+                other_healthy, other_summary = self._health(other)
+                if other_healthy:
+                    chosen = other
+                    reason = f"{reason}; {self._describe(preferred, summary)}"
+                else:
+                    # Both degraded: the one failing less, then the faster one
+                    def badness(s):
+                        return s["error_rate"] > self.max_error_rate, s["p95"] if s["p95"] is not None else float("inf")
+
+                    if badness(other_summary) < badness(summary):
+                        chosen = other
+                    reason = f"{reason}; both over SLO, {chosen} degraded least"
+            self._stats(chosen).routed += 1
+            self._decisions.append({
+                "time": time.time(),
+                "model": chosen,
+                "reason": reason,
+                "background": background,
+            })
+        return Route(chosen, reason)
+
+    # ── observations ───────────────────────────────────────────────
+    def observe(self, model, seconds, ok=True):
+        """Record one upstream call to ``model`` that took ``seconds`` and succeeded or not."""
+        with self._lock:
+            self._stats(model).add(seconds, ok)
+        if self.metrics is not None and ok:
+            self.metrics.observe(f"model_{model}", seconds)
+
+    def stats(self):
+        """Per-model routing counts and rolling latency, plus recent decisions (newest first)."""
+        with self._lock:
+            models = {
+                model: {"routed": stats.routed, "calls": stats.calls, "errors": stats.errors, **stats.summary()}
+                for model, stats in self._models.items()
+            }
+            decisions = list(reversed(self._decisions))
+        return {
+            "fast_model": self.fast_model,
+            "slo_seconds": self.slo_seconds,
+            "models": models,
+            "decisions": decisions,
+        }
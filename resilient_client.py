@@ -0,0 +1,377 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🛡️ RESILIENT LLM CLIENT - DEADLINES, RETRIES, HEDGING, CIRCUIT BREAKER
+# ═══════════════════════════════════════════════════════════════════
+"""Fault-tolerant wrapper around a Cohere-style client.
+
+``ResilientClient`` wraps any object exposing ``chat(**kwargs)`` and
+``chat_stream(**kwargs)`` (the real ``cohere.Client`` or a local fake) and
+adds, per call:
+
+- a deadline, enforced by running the call on a worker thread;
+- bounded retries with full-jitter exponential backoff on retryable errors
+  (timeouts, connection errors, HTTP 408/409/429/5xx);
+- optional hedging: if the first attempt has not answered after the
+  observed p95 latency, a second identical request is fired and whichever
+  succeeds first wins;
+- a circuit breaker per model that fails fast while that model keeps
+  failing, so a router can still fall back to another model.
+
+Sleep, clock and random source are injectable so behaviour is deterministic
+under test.
+"""
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+RETRYABLE_STATUS = {408, 409, 429}
+_STREAM_DONE = object()
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+    def __init__(self, retry_in, name=None):
+        super().__init__(f"{name or 'Upstream'} marked unhealthy; retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+        self.name = name
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not complete within its deadline."""
+
+def is_retryable(exc):
+    """Return True for errors worth retrying: timeouts, transport and 408/409/429/5xx."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    # httpx transport failures, without importing httpx
+    return any(cls.__name__ in ("TransportError", "TimeoutException") for cls in type(exc).__mro__)
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed → open → half-open)."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic, name=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def sibling(self, name):
+        """A new, closed breaker with the same settings, for another upstream."""
+        return CircuitBreaker(self.failure_threshold, self.reset_timeout, clock=self._clock, name=name)
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+        raise CircuitOpenError(retry_in, self.name)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+class LatencyWindow:
+    """Rolling window of recent latencies with percentile lookups."""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class PrewarmedClient:
+    """Builds a client on a background thread so startup is not blocked.
+
+    ``factory`` runs once on a daemon thread as soon as the wrapper is made;
+    ``warmup``, if given, is then called with the new client (e.g. a cheap
+    request that opens the HTTP connection pool). Attribute access waits
+    until the client exists and re-raises a failed build. Warm-up errors are
+    kept on ``warmup_error`` rather than raised.
+    """
+
+    def __init__(self, factory, warmup=None, clock=time.perf_counter):
+        self._ready = threading.Event()
+        self._client = None
+        self._error = None
+        self._clock = clock
+        self.build_seconds = None
+        self.warmup_seconds = None
+        self.warmup_error = None
+        threading.Thread(target=self._build, args=(factory, warmup), name="client-prewarm", daemon=True).start()
+
+    def _build(self, factory, warmup):
+        started = self._clock()
+        try:
+            self._client = factory()
+        except BaseException as exc:
+            self._error = exc
+            self._ready.set()
+            return
+        self.build_seconds = self._clock() - started
+        self._ready.set()
+        if warmup is not None:
+            started = self._clock()
+            try:
+                warmup(self._client)
+            except Exception as exc:
+                self.warmup_error = exc
+            self.warmup_seconds = self._clock() - started
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Return the built client, waiting up to ``timeout`` seconds for it."""
+        if not self._ready.wait(timeout):
+            raise DeadlineExceeded(f"Client not ready within {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.wait(), name)
+
+class ResilientClient:
+    """Deadline/retry/hedge/circuit-breaker wrapper around a chat client.
+
+    Each ``model`` gets its own circuit breaker, made like ``breaker``,
+    which itself guards calls that name no model. Attributes the wrapper
+    does not define are delegated to the wrapped client, so it can stand in
+    for ``cohere.Client``.
+    """
+
+    def __init__(
+        self,
+        client,
+        timeout=30.0,
+        max_retries=2,
+        backoff_base=0.25,
+        backoff_max=4.0,
+        hedge=False,
+        hedge_min_delay=0.5,
+        hedge_min_samples=20,
+        breaker=None,
+        max_workers=16,
+        sleep=time.sleep,
+        rng=random.random,
+    ):
+        self.client = client
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self._breakers = {}  # model -> CircuitBreaker
+        self.latencies = LatencyWindow()
+        self.counters = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0, "short_circuited": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._sleep = sleep
+        self._rng = rng
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def breaker_for(self, model):
+        """The circuit breaker guarding calls to ``model``."""
+        if model is None:
+            return self.breaker
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = self._breakers[model] = self.breaker.sibling(model)
+            return breaker
+
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+        return self._rng() * min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+
+    def hedge_delay(self):
+        """Delay before hedging: observed p95, once enough samples exist."""
+        if len(self.latencies) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latencies.percentile(0.95))
+
+    def _with_retries(self, attempt_fn, timeout, breaker):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        self._count("calls")
+        attempt = 0
+        while True:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                self._count("short_circuited")
+                raise
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise DeadlineExceeded("Deadline exceeded before the request could be sent")
+                result = attempt_fn(remaining)
+            except Exception as exc:
+                if not is_retryable(exc):
+                    # The upstream answered; a bad request says nothing about its health
+                    breaker.record_success()
+                    self._count("failures")
+                    raise
+                breaker.record_failure()
+                attempt += 1
+                if attempt > self.max_retries:
+                    self._count("failures")
+                    raise
+                pause = self.backoff(attempt)
+                if time.monotonic() + pause >= deadline:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self._sleep(pause)
+                continue
+            breaker.record_success()
+            return result
+
+    def _timed_chat(self, kwargs):
+        t0 = time.monotonic()
+        response = self.client.chat(**kwargs)
+        self.latencies.add(time.monotonic() - t0)
+        return response
+
+    def _chat_once(self, kwargs, remaining, hedge):
+        primary = self._executor.submit(self._timed_chat, kwargs)
+        delay = self.hedge_delay() if hedge else None
+        if delay is None or delay >= remaining:
+            try:
+                return primary.result(timeout=remaining)
+            except FutureTimeout:
+                raise DeadlineExceeded(f"No reply within {remaining:.1f}s") from None
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        self._count("hedges")
+        hedged = self._executor.submit(self._timed_chat, kwargs)
+        pending = {primary, hedged}
+        end = time.monotonic() + remaining - delay
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"No reply within {remaining:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is hedged:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def chat(self, timeout=None, hedge=None, **kwargs):
+        """Call ``client.chat`` with deadline, retries, hedging and circuit breaking."""
+        hedge = self.hedge if hedge is None else hedge
+        breaker = self.breaker_for(kwargs.get("model"))
+        return self._with_retries(lambda remaining: self._chat_once(kwargs, remaining, hedge), timeout, breaker)
+
+    def _open_stream(self, kwargs, remaining):
+        """Start the stream on a worker and wait for its first event."""
+        events = queue.Queue()
+
+        def pump():
+            try:
+                for event in self.client.chat_stream(**kwargs):
+                    events.put(event)
+            except Exception as exc:
+                events.put(exc)
+            events.put(_STREAM_DONE)
+
+        self._executor.submit(pump)
+        try:
+            first = events.get(timeout=remaining)
+        except queue.Empty:
+            raise DeadlineExceeded(f"No stream event within {remaining:.1f}s") from None
+        if isinstance(first, Exception):
+            raise first
+        return first, events
+
+    def chat_stream(self, timeout=None, **kwargs):
+        """Stream ``client.chat_stream`` events.
+
+        Retries and the circuit breaker apply until the first event arrives;
+        after that, ``timeout`` bounds the wait for each further event.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        breaker = self.breaker_for(kwargs.get("model"))
+        first, events = self._with_retries(lambda remaining: self._open_stream(kwargs, remaining), timeout, breaker)
+        item = first
+        while item is not _STREAM_DONE:
+            if isinstance(item, Exception):
+                breaker.record_failure()
+                raise item
+            yield item
+            try:
+                item = events.get(timeout=timeout)
+            except queue.Empty:
+                breaker.record_failure()
+                raise DeadlineExceeded(f"Stream stalled for more than {timeout:.1f}s") from None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            breakers = dict(self._breakers)
+        stats["circuit"] = self.breaker.state
+        stats["circuits"] = {model: breaker.state for model, breaker in breakers.items()}
+        stats["p95_latency"] = self.latencies.percentile(0.95)
+        return stats
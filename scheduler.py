@@ -0,0 +1,294 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🚦 REQUEST SCHEDULER - SHARED POOL, RATE LIMIT, PRIORITY, FAIRNESS
+# ═══════════════════════════════════════════════════════════════════
+"""Process-wide scheduler for upstream LLM calls.
+
+Every session submits its calls to one ``RequestScheduler``. A bounded pool
+of worker threads takes jobs in priority order (interactive answers before
+background summaries) and, within a priority, round-robin across sessions,
+so one busy session cannot starve the others. Each dispatch takes a token
+from a ``TokenBucket`` sized to the API quota. Queue depth and wait time go
+to an optional ``Metrics`` registry, and ``position`` tells a waiting caller
+how many jobs are ahead of it.
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+_STREAM_DONE = object()
+
+class TokenBucket:
+    """Allow ``rate`` acquisitions per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token and return 0, or return the seconds until one is available."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            self._sleep(wait)
+
+class ScheduledCall(Future):
+    """Future for one scheduled job."""
+
+    def __init__(self, fn, args, kwargs, session_id, priority, enqueued):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.session_id = session_id
+        self.priority = priority
+        self.enqueued = enqueued
+
+class RequestScheduler:
+    """Bounded worker pool with a rate limit, two priorities and per-session fairness.
+
+    ``rate`` is in calls per second (None disables the limit) and ``burst``
+    is the bucket size. Cancelling a queued job removes it from the line;
+    jobs that already started run to completion.
+    """
+
+    def __init__(self, max_workers=4, rate=None, burst=None, metrics=None, clock=time.monotonic, sleep=time.sleep):
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep) if rate else None
+        self.metrics = metrics
+        self._clock = clock
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}  # session -> deque of jobs
+        self._depth = 0
+        self._active = 0
+        self._cond = threading.Condition()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        for n in range(max_workers):
+            threading.Thread(target=self._work, name=f"llm-scheduler-{n}", daemon=True).start()
+
+    # ── submission ─────────────────────────────────────────────────
+    def submit(self, fn, *args, session_id=None, priority=INTERACTIVE, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` and return its ``ScheduledCall`` future."""
+        job = ScheduledCall(fn, args, kwargs, session_id, priority, self._clock())
+        with self._cond:
+            self._queues[priority].setdefault(session_id, deque()).append(job)
+            self._depth += 1
+            self.submitted += 1
+            self._report_depth()
+            self._cond.notify()
+        return job
+
+    def call(self, fn, *args, session_id=None, priority=INTERACTIVE, on_wait=None, poll=0.25, **kwargs):
+        """Run ``fn`` through the scheduler and return its result.
+
+        While the job is queued, ``on_wait(position)`` is called whenever its
+        place in line changes, and ``on_wait(None)`` once it starts. If the
+        caller is interrupted, the queued job is cancelled.
+        """
+        job = self.submit(fn, *args, session_id=session_id, priority=priority, **kwargs)
+        try:
+            self._wait_started(job, on_wait, poll)
+            return job.result()
+        except BaseException:
+            job.cancel()
+            raise
+
+    def stream(self, fn, *args, session_id=None, priority=INTERACTIVE, on_wait=None, poll=0.25, **kwargs):
+        """Iterate ``fn(*args, **kwargs)`` on a worker, holding its slot until the iterator ends.
+
+        Items are handed to the caller as they are produced. Closing the
+        returned generator early stops the worker and cancels a queued job.
+        """
+        items = queue.Queue()
+        stop = threading.Event()
+
+        def pump():
+            iterator = fn(*args, **kwargs)
+            try:
+                for item in iterator:
+                    if stop.is_set():
+                        break
+                    items.put(item)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                items.put(_STREAM_DONE)
+
+        job = self.submit(pump, session_id=session_id, priority=priority)
+        try:
+            self._wait_started(job, on_wait, poll)
+            while True:
+                item = items.get()
+                if item is _STREAM_DONE:
+                    break
+                yield item
+            job.result()
+        finally:
+            stop.set()
+            job.cancel()
+
+    def _wait_started(self, job, on_wait, poll):
+        last = object()
+        while not job.running() and not job.done():
+            if on_wait is not None:
+                position = self.position(job)
+                if position != last:
+                    on_wait(position)
+                    last = position
+            try:
+                job.exception(timeout=poll)
+            except FutureTimeout:  # not the builtin TimeoutError before Python 3.11
+                continue
+        if on_wait is not None and last is not None:
+            on_wait(None)
+
+    # ── queue state ────────────────────────────────────────────────
+    def position(self, job):
+        """Return how many queued jobs will be dispatched before ``job``.
+
+        Returns None once ``job`` has started, finished or been cancelled,
+        and 0 while it waits only for a rate-limit token.
+        """
+        if job.running() or job.done():
+            return None
+        with self._cond:
+            ahead = 0
+            for priority in PRIORITIES:
+                lines = [list(jobs) for jobs in self._queues[priority].values()]
+                # Dispatch takes the head of each session in turn, round after round
+                for index in range(max((len(jobs) for jobs in lines), default=0)):
+                    for jobs in lines:
+                        if index >= len(jobs):
+                            continue
+                        if jobs[index] is job:
+                            return ahead
+                        if not jobs[index].cancelled():
+                            ahead += 1
+        return None if job.running() or job.done() else 0
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": self._depth,
+                "active": self._active,
+                "workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def _report_depth(self):
+        if self.metrics is not None:
+            self.metrics.gauge("llm_queue_depth", self._depth)
+            self.metrics.gauge("llm_active_calls", self._active)
+
+    # ── workers ────────────────────────────────────────────────────
+    def _next_job(self):
+        for priority in PRIORITIES:
+            sessions = self._queues[priority]
+            if not sessions:
+                continue
+            session_id, jobs = next(iter(sessions.items()))
+            job = jobs.popleft()
+            if jobs:
+                sessions.move_to_end(session_id)
+            else:
+                del sessions[session_id]
+            self._depth -= 1
+            return job
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._report_depth()
+            if job.cancelled():
+                continue
+            if self.bucket is not None:
+                self.bucket.acquire()
+            if not job.set_running_or_notify_cancel():
+                continue
+            if self.metrics is not None:
+                self.metrics.observe("queue_wait", self._clock() - job.enqueued)
+            with self._cond:
+                self._active += 1
+                self._report_depth()
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as exc:
+                job.set_exception(exc)
+                failed = 1
+            else:
+                job.set_result(result)
+                failed = 0
+            with self._cond:
+                self._active -= 1
+                self.completed += 1
+                self.failed += failed
+                self._report_depth()
+
+class ScheduledClient:
+    """Chat-client view that sends ``chat``/``chat_stream`` through a scheduler.
+
+    ``started`` is the wall-clock time (``time.time()``) at which a worker
+    last picked up one of its calls, so callers can tell queue wait from
+    upstream time. Other attributes are delegated to the wrapped client.
+    """
+
+    def __init__(self, scheduler, client, session_id=None, priority=INTERACTIVE, on_wait=None):
+        self.scheduler = scheduler
+        self.client = client
+        self.session_id = session_id
+        self.priority = priority
+        self.on_wait = on_wait
+        self.started = None
+
+    def _mark_started(self, fn):
+        def run(*args, **kwargs):
+            self.started = time.time()
+            return fn(*args, **kwargs)
+        return run
+
+    def chat(self, **kwargs):
+        return self.scheduler.call(
+            self._mark_started(self.client.chat), session_id=self.session_id, priority=self.priority,
+            on_wait=self.on_wait, **kwargs
+        )
+
+    def chat_stream(self, **kwargs):
+        return self.scheduler.stream(
+            self._mark_started(self.client.chat_stream), session_id=self.session_id, priority=self.priority,
+            on_wait=self.on_wait, **kwargs
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -0,0 +1,293 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🔎 SEARCH INDEX - FULL-TEXT SEARCH OVER A CONVERSATION
+# ═══════════════════════════════════════════════════════════════════
+"""Incrementally maintained inverted index with BM25 ranking.
+
+Documents are added, replaced and removed one at a time, so the index
+follows a conversation as it grows instead of being rebuilt per query.
+Each document is a few text fields (a turn's user and AI text); positions
+are kept per term so quoted phrases can be matched, and a sorted
+vocabulary answers ``prefix*`` terms with two bisections. New terms are
+merged into the vocabulary on the next prefix query rather than inserted
+one by one.
+
+Scoring is vectorized with NumPy: each queried term's postings are turned
+into ``(doc ids, term frequencies)`` arrays, which are cached, extended as
+turns are added and rebuilt only after a removal. A word found in every
+turn costs a few array operations rather than a Python loop over tens of
+thousands of postings.
+
+Query syntax, all clauses ANDed:
+
+    deploy error          both words
+    "connection refused"  the exact phrase
+    pyth*                 any word starting with "pyth"
+"""
+import math
+import re
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+WORD_RE = re.compile(r"[a-z0-9']+", re.IGNORECASE)
+CLAUSE_RE = re.compile(r'"([^"]*)"?|(\S+)')
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+def parse_query(query):
+    """Split ``query`` into ``("phrase", tokens)`` and ``("prefix", stem)`` clauses."""
+    clauses = []
+    for phrase, word in CLAUSE_RE.findall(query):
+        if word.endswith("*") and len(tokenize(word)) == 1:
+            clauses.append(("prefix", tokenize(word)[0]))
+            continue
+        tokens = tokenize(phrase or word)
+        if tokens:
+            clauses.append(("phrase", tokens))  # a single word is a one-token phrase
+    return clauses
+
+class SearchIndex:
+    """Positional inverted index over documents keyed by any hashable ``key``."""
+
+    # Upper bound on vocabulary terms a single ``prefix*`` expands to
+    MAX_PREFIX_TERMS = 256
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings = {}  # term -> {doc id: (positions...)}
+        self._vocab = []  # sorted terms, for prefix queries
+        self._new_terms = []  # terms not merged into _vocab yet
+        self._stale_terms = set()  # terms in _vocab (or _new_terms) with no postings left
+        self._doc_ids = {}  # key -> doc id
+        self._keys = {}  # doc id -> key
+        self._lengths = np.zeros(1024, dtype=np.float32)  # doc id -> token count
+        self._terms = {}  # doc id -> distinct terms, for removal
+        self._arrays = {}  # term -> (doc ids, frequencies), dropped when a posting is removed
+        self._appended = {}  # term -> [(doc id, frequency)] added since its arrays were built
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def __contains__(self, key):
+        return key in self._doc_ids
+
+    # ── updates ────────────────────────────────────────────────────
+    def add(self, key, *fields):
+        """Index ``fields`` under ``key``, replacing any document already there."""
+        positions = {}
+        offset = 0
+        for field in fields:
+            tokens = tokenize(field)
+            for position, token in enumerate(tokens, start=offset):
+                positions.setdefault(token, []).append(position)
+            offset += len(tokens) + 1  # the gap keeps phrases inside one field
+        with self._lock:
+            self._remove(key)
+            doc = self._next_id
+            self._next_id += 1
+            self._doc_ids[key] = doc
+            self._keys[doc] = key
+            if doc == len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros_like(self._lengths)])
+            length = max(offset - 1, 0)
+            self._lengths[doc] = length
+            self._total_length += length
+            arrays, appended = self._arrays, self._appended
+            for term, term_positions in positions.items():
+                if term in arrays:
+                    # New doc ids are the largest yet, so the arrays stay sorted
+                    appended.setdefault(term, []).append((doc, len(term_positions)))
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    if term in self._stale_terms:
+                        self._stale_terms.discard(term)
+                    else:
+                        self._new_terms.append(term)
+                postings[doc] = tuple(term_positions)
+            self._terms[doc] = tuple(positions)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        doc = self._doc_ids.pop(key, None)
+        if doc is None:
+            return
+        del self._keys[doc]
+        self._total_length -= int(self._lengths[doc])
+        for term in self._terms.pop(doc):
+            self._arrays.pop(term, None)
+            self._appended.pop(term, None)
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+                self._stale_terms.add(term)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._vocab.clear()
+            self._new_terms.clear()
+            self._stale_terms.clear()
+            self._doc_ids.clear()
+            self._keys.clear()
+            self._terms.clear()
+            self._arrays.clear()
+            self._appended.clear()
+            self._total_length = 0
+
+    # ── queries ────────────────────────────────────────────────────
+    def search(self, query, limit=20):
+        """Return up to ``limit`` ``(key, score)`` pairs, best first (newest first on ties)."""
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        with self._lock:
+            if not self._doc_ids:
+                return []
+            docs = scores = None
+            # Rarest clause first, so later intersections stay small
+            for clause_docs, clause_scores in sorted((self._match(clause) for clause in clauses), key=lambda m: len(m[0])):
+                if docs is None:
+                    docs, scores = clause_docs, clause_scores
+                else:
+                    docs, mine, theirs = np.intersect1d(docs, clause_docs, assume_unique=True, return_indices=True)
+                    scores = scores[mine] + clause_scores[theirs]
+                if not len(docs):
+                    return []
+            if len(docs) > limit:
+                # Everything above the limit-th best score, then the newest of the ties
+                kth = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+                above = np.flatnonzero(scores > kth)
+                tied = np.flatnonzero(scores == kth)
+                top = np.concatenate([above, tied[np.argsort(-docs[tied])[:limit - len(above)]]])
+                docs, scores = docs[top], scores[top]
+            order = np.lexsort((-docs, -scores))
+            return [(self._keys[doc], float(score)) for doc, score in zip(docs[order].tolist(), scores[order].tolist())]
+
+    def _term_arrays(self, term):
+        """``(doc ids, frequencies)`` of ``term`` as sorted arrays, or None."""
+        arrays = self._arrays.get(term)
+        appended = self._appended.pop(term, None)
+        if arrays is not None and appended:
+            docs, frequencies = zip(*appended)
+            arrays = self._arrays[term] = (
+                np.concatenate([arrays[0], np.array(docs, dtype=np.int64)]),
+                np.concatenate([arrays[1], np.array(frequencies, dtype=np.float32)]),
+            )
+        if arrays is None:
+            postings = self._postings.get(term)
+            if postings is None:
+                return None
+            docs = np.fromiter(postings, dtype=np.int64, count=len(postings))
+            frequencies = np.fromiter(map(len, postings.values()), dtype=np.float32, count=len(postings))
+            order = np.argsort(docs, kind="stable")
+            arrays = self._arrays[term] = (docs[order], frequencies[order])
+        return arrays
+
+    def _match(self, clause):
+        """``(doc ids, BM25 scores)`` for the documents matching one clause."""
+        kind, value = clause
+        if kind == "prefix":
+            vocab = self._sorted_vocab()
+            start = bisect_left(vocab, value)
+            end = bisect_left(vocab, value + "\uffff", start)
+            matched = [self._term_arrays(term) for term in vocab[start:min(end, start + self.MAX_PREFIX_TERMS)]]
+            matched = [arrays for arrays in matched if arrays is not None]  # skip stale terms
+            if not matched:
+                return self._bm25(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            if len(matched) == 1:
+                return self._bm25(*matched[0])
+            # Score each term, then add up the scores of documents matching several
+            parts = [self._bm25(*arrays) for arrays in matched]
+            docs, inverse = np.unique(np.concatenate([docs for docs, _ in parts]), return_inverse=True)
+            return docs, np.bincount(inverse, weights=np.concatenate([scores for _, scores in parts])).astype(np.float32)
+        matched = [self._term_arrays(term) for term in value]
+        if not all(arrays is not None for arrays in matched):
+            return self._bm25(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if len(value) == 1:
+            return self._bm25(*matched[0])
+        # Phrase: documents holding every word, then a check for consecutive positions
+        docs = matched[0][0]
+        for term_docs, _ in matched[1:]:
+            docs = np.intersect1d(docs, term_docs, assume_unique=True)
+        postings = [self._postings[term] for term in value]
+        found, counts = [], []
+        for doc in docs.tolist():
+            following = [set(term_postings[doc]) for term_postings in postings[1:]]
+            count = sum(
+                1 for start in postings[0][doc]
+                if all(start + i in positions for i, positions in enumerate(following, start=1))
+            )
+            if count:
+                found.append(doc)
+                counts.append(count)
+        return self._bm25(np.array(found, dtype=np.int64), np.array(counts, dtype=np.float32))
+
+    def _sorted_vocab(self):
+        if len(self._stale_terms) > len(self._vocab) // 4:
+            self._vocab = [term for term in self._vocab if term not in self._stale_terms]
+            self._new_terms = [term for term in self._new_terms if term not in self._stale_terms]
+            self._stale_terms.clear()
+        if self._new_terms:
+            # Two sorted runs: the sort merges them in linear time
+            self._vocab += sorted(self._new_terms)
+            self._vocab.sort()
+            self._new_terms = []
+        return self._vocab
+
+    def _bm25(self, docs, frequencies):
+        """Score ``docs`` from their term (or phrase) ``frequencies``; return ``(docs, scores)``."""
+        total = len(self._doc_ids)
+        idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+        average = self._total_length / total or 1.0
+        k1, b = self.k1, self.b
+        norms = k1 * (1 - b + b * self._lengths[docs] / average)
+        return docs, (idf * (k1 + 1)) * frequencies / (frequencies + norms)
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._doc_ids), "terms": len(self._postings)}
+
+def highlight(text, query, width=160):
+    """Return a snippet of ``text`` around the first query word, matches in ``**bold**``.
+
+    Markdown in ``text`` is not escaped; callers showing untrusted text as
+    markdown should escape it first.
+    """
+    words, prefixes = set(), []
+    for kind, value in parse_query(query):
+        if kind == "prefix":
+            prefixes.append(value)
+        else:
+            words.update(value)
+    prefixes = tuple(prefixes)
+
+    def is_match(token):
+        token = token.lower()
+        return token in words or (prefixes and token.startswith(prefixes))
+
+    matches = [m for m in WORD_RE.finditer(text) if is_match(m.group())]
+    if not matches:
+        return text[:width] + ("…" if len(text) > width else "")
+    start = max(matches[0].start() - width // 3, 0)
+    end = min(start + width, len(text))
+    parts, cursor = [], start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        parts.append(text[cursor:m.start()])
+        parts.append(f"**{text[m.start():m.end()]}**")
+        cursor = m.end()
+    parts.append(text[cursor:end])
+    return ("…" if start else "") + "".join(parts) + ("…" if end < len(text) else "")
@@ -0,0 +1,290 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧭 SEMANTIC CACHE - NEAR-DUPLICATE QUESTION LOOKUP
+# ═══════════════════════════════════════════════════════════════════
+"""Answer cache keyed on question similarity rather than exact text.
+
+Questions are embedded into unit vectors held in a preallocated NumPy
+matrix, and a lookup returns the stored answer of the most similar earlier
+question when its cosine similarity reaches ``threshold``. The default
+``HashingEmbedder`` needs no model or network; any callable mapping a list
+of texts to an ``(n, dim)`` array can be plugged in (``CohereEmbedder``
+catches real paraphrases at the cost of an API call).
+
+Up to ``exact_limit`` entries every row is scored. Beyond that, multi-probe
+random-hyperplane LSH picks candidate rows first (``tables`` signatures of
+``bits`` bits each, probing every signature and its one-bit neighbours), so
+lookups stay sub-millisecond at 100k entries; the top-1 among candidates is
+still an exact cosine. This is approximate: a match just above ``threshold``
+can be missed, while rewordings (similarity 0.95+) are found reliably. At
+100k entries the index costs about 100 MB on top of the vectors. Entries are
+bounded by ``max_entries`` with LRU eviction.
+
+Hashed vectors measure word overlap, not meaning: a one-word swap ("sum" for
+"product") can still score above 0.9. With ``same_terms`` (the default), a
+match is only served when both questions also share the same content words
+(``content_terms``), so only rewordings hit. Turn it off for an embedder that
+understands paraphrases.
+"""
+import re
+import threading
+import time
+import zlib
+from array import array
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+# Words that can be added, dropped or swapped without changing the question
+FILLER_WORDS = frozenset(
+    "a an the is are am be was were been do does did i me my we our you your it its this that these those"
+    " of to in on at for with by from about as and or so just please kindly can could would will should"
+    " tell show give let us hey hi hello thanks thank".split()
+)
+
+def content_terms(text):
+    """The set of words in ``text`` that carry its meaning (filler words dropped)."""
+    words = (word.split("'")[0] for word in TOKEN_RE.findall(text.lower()))  # "what's" -> "what"
+    return frozenset(word for word in words if word and word not in FILLER_WORDS)
+
+class HashingEmbedder:
+    """Offline embedder: signed feature hashing of words, word pairs and character trigrams."""
+
+    # crc32 start values that keep the three feature kinds apart
+    WORD_SEED, PAIR_SEED, CHAR_SEED = 1, 2, 3
+
+    def __init__(self, dim=256, char_weight=0.5):
+        self.dim = dim
+        self.char_weight = char_weight
+
+    def embed_one(self, text):
+        """Return the unnormalized feature vector of ``text`` as a list."""
+        crc32 = zlib.crc32
+        dim = self.dim
+        char_weight = self.char_weight
+        vector = [0.0] * dim
+        words = [word.encode("utf-8") for word in TOKEN_RE.findall(text.lower())]
+        hashes = [crc32(word, self.WORD_SEED) for word in words]
+        hashes += [crc32(first + b" " + second, self.PAIR_SEED) for first, second in zip(words, words[1:])]
+        for h in hashes:
+            vector[h % dim] += -1.0 if h >> 31 else 1.0
+        for word in words:
+            padded = b" " + word + b" "
+            for i in range(len(padded) - 2):
+                h = crc32(padded[i:i + 3], self.CHAR_SEED)
+                vector[h % dim] += -char_weight if h >> 31 else char_weight
+        return vector
+
+    def __call__(self, texts):
+        flat = array("f")
+        for text in texts:
+            flat.extend(self.embed_one(text))
+        return np.frombuffer(flat, dtype=np.float32).reshape(len(texts), self.dim)
+
+class CohereEmbedder:
+    """Embed with a Cohere embedding model (catches paraphrases hashing cannot)."""
+
+    def __init__(self, client, model="embed-english-light-v3.0", input_type="search_query"):
+        self.client = client
+        self.model = model
+        self.input_type = input_type
+
+    def __call__(self, texts):
+        response = self.client.embed(texts=list(texts), model=self.model, input_type=self.input_type)
+        return np.asarray(response.embeddings, dtype=np.float32)
+
+def normalize(vectors):
+    """Scale each row of ``vectors`` to unit length (zero rows stay zero)."""
+    norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))[:, None]
+    return vectors / np.maximum(norms, 1e-12)
+
+class SemanticCache:
+    """Top-1 cosine cache of ``(model, question) -> answer`` with LRU eviction.
+
+    Matches at or above ``threshold`` whose content words differ from the
+    question's are rejected when ``same_terms`` is set, and counted as
+    ``rejected`` misses.
+    """
+
+    def __init__(
+        self,
+        embedder=None,
+        threshold=0.9,
+        same_terms=True,
+        max_entries=10_000,
+        exact_limit=4_096,
+        tables=10,
+        bits=22,
+        metrics=None,
+        seed=0,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.same_terms = same_terms
+        self.max_entries = max_entries
+        self.exact_limit = exact_limit
+        self.tables = tables
+        self.bits = bits
+        self.metrics = metrics
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._vectors = None  # (max_entries, dim), allocated on first put
+        self._planes = None
+        self._bit_weights = (1 << np.arange(bits)).astype(np.int64)
+        self._table_offsets = np.arange(tables, dtype=np.int64) << bits
+        self._probes = [0] + [1 << i for i in range(bits)]
+        self._buckets = {}  # LSH key -> list of rows
+        self._signatures = np.zeros((max_entries, tables), dtype=np.int64)
+        self._model_ids = np.full(max_entries, -1, dtype=np.int32)
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._answers = [None] * max_entries
+        self._questions = [None] * max_entries
+        self._row_by_key = {}
+        self._models = {}
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._high_water = 0  # rows [0, high_water) have been used
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self._hit_similarity = 0.0
+
+    def __len__(self):
+        return self.max_entries - len(self._free)
+
+    # ── embedding and hashing ──────────────────────────────────────
+    def _embed(self, texts):
+        return normalize(np.asarray(self.embedder(texts), dtype=np.float32))
+
+    def _allocate(self, dim):
+        self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+        self._planes = self._rng.standard_normal((dim, self.tables * self.bits)).astype(np.float32)
+
+    def _signature(self, vectors):
+        """One bucket key per table for each row of ``vectors``."""
+        bits = (vectors @ self._planes > 0).reshape(len(vectors), self.tables, self.bits)
+        return bits @ self._bit_weights + self._table_offsets
+
+    def _candidates(self, vector):
+        rows = []
+        get = self._buckets.get
+        for key in self._signature(vector[None])[0].tolist():
+            for flip in self._probes:
+                bucket = get(key ^ flip)
+                if bucket:
+                    rows += bucket
+        return np.unique(np.array(rows, dtype=np.int64))
+
+    # ── lookups ────────────────────────────────────────────────────
+    def get(self, model_name, question):
+        """Return ``(answer, similarity)`` for the closest cached question, or None."""
+        t0 = time.perf_counter()
+        vector = self._embed([question])[0]
+        with self._lock:
+            found = self._search(model_name, vector)
+            if found is not None and self.same_terms:
+                if content_terms(self._questions[found[0]][1]) != content_terms(question):
+                    self.rejected += 1
+                    found = None
+            if found is not None:
+                row, similarity = found
+                self._tick += 1
+                self._last_used[row] = self._tick
+                self.hits += 1
+                self._hit_similarity += similarity
+                result = (self._answers[row], similarity)
+            else:
+                self.misses += 1
+                result = None
+        if self.metrics is not None:
+            self.metrics.observe("semantic_lookup", time.perf_counter() - t0)
+            (self.metrics.hit if result is not None else self.metrics.miss)("semantic")
+        return result
+
+    def _search(self, model_name, vector):
+        model_id = self._models.get(model_name)
+        if model_id is None or self._vectors is None:
+            return None
+        if self._high_water <= self.exact_limit:
+            # Small enough to score every row in one contiguous matmul
+            scores = self._vectors[:self._high_water] @ vector
+            scores[self._model_ids[:self._high_water] != model_id] = -np.inf
+            rows = None
+        else:
+            rows = self._candidates(vector)
+            rows = rows[self._model_ids[rows] == model_id]
+            if not len(rows):
+                return None
+            scores = self._vectors[rows] @ vector
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        if similarity < self.threshold:
+            return None
+        return (best if rows is None else int(rows[best])), similarity
+
+    # ── inserts ────────────────────────────────────────────────────
+    def put(self, model_name, question, answer):
+        self.put_many(model_name, [question], [answer])
+
+    def put_many(self, model_name, questions, answers):
+        """Cache ``answers`` for ``questions``, embedding them in one batch."""
+        if not questions:
+            return
+        vectors = self._embed(list(questions))
+        with self._lock:
+            if self._vectors is None:
+                self._allocate(vectors.shape[1])
+            model_id = self._models.setdefault(model_name, len(self._models))
+            signatures = self._signature(vectors)
+            for question, answer, vector, signature in zip(questions, answers, vectors, signatures):
+                key = (model_name, question.strip().lower())
+                row = self._row_by_key.get(key)
+                if row is None:
+                    row = self._free.pop() if self._free else self._evict()
+                    self._high_water = max(self._high_water, row + 1)
+                    self._row_by_key[key] = row
+                    self._vectors[row] = vector
+                    self._model_ids[row] = model_id
+                    self._signatures[row] = signature
+                    self._questions[row] = key
+                    for bucket_key in signature.tolist():
+                        self._buckets.setdefault(bucket_key, []).append(row)
+                self._answers[row] = answer
+                self._tick += 1
+                self._last_used[row] = self._tick
+
+    def _evict(self):
+        """Drop the least recently used entry and return its row."""
+        row = int(np.argmin(self._last_used))
+        for bucket_key in self._signatures[row].tolist():
+            bucket = self._buckets[bucket_key]
+            bucket.remove(row)
+            if not bucket:
+                del self._buckets[bucket_key]
+        del self._row_by_key[self._questions[row]]
+        self._answers[row] = self._questions[row] = None
+        self._model_ids[row] = -1
+        return row
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._row_by_key.clear()
+            self._model_ids[:] = -1
+            self._last_used[:] = 0
+            self._answers = [None] * self.max_entries
+            self._questions = [None] * self.max_entries
+            self._free = list(range(self.max_entries - 1, -1, -1))
+            self._high_water = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "rejected": self.rejected,
+                "mean_hit_similarity": self._hit_similarity / self.hits if self.hits else None,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,137 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🤝 SINGLE-FLIGHT - COALESCE IDENTICAL IN-FLIGHT CALLS
+# ═══════════════════════════════════════════════════════════════════
+"""Single-flight coalescing of identical concurrent calls.
+
+``SingleFlight.do(key, fn)`` runs ``fn`` once per key at a time: callers
+that arrive while a call for the same key is in flight wait for it and
+share its result or exception instead of starting their own. Nothing is
+kept once the call finishes, so this covers the window before the response
+cache has anything to return.
+
+If the leading caller is interrupted (e.g. a Streamlit rerun stops its
+script), the flight is abandoned: waiting callers are released and one of
+them retries as the new leader.
+"""
+import threading
+
+class FlightAbandoned(Exception):
+    """The leading caller stopped before producing a result."""
+
+class Flight:
+    """One in-flight call; finished exactly once by its leader."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        self.followers = 0
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def _finish(self, result=None, error=None):
+        if self._done.is_set():
+            return
+        self._result = result
+        self._error = error
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Return the leader's result, or raise its exception (or ``FlightAbandoned``)."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Flight not finished within {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by e.g. ``(model_name, prompt)``.
+
+    Coalesced calls count as hits and leading calls as misses under
+    ``name`` in the optional ``Metrics`` registry.
+    """
+
+    def __init__(self, metrics=None, name="singleflight"):
+        self.metrics = metrics
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def join(self, key):
+        """Return ``(flight, leader)``.
+
+        The leader must finish the flight with ``resolve``, ``fail`` or
+        ``abandon``; everyone else waits on ``flight.wait()``.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                self.leaders += 1
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+        if self.metrics is not None:
+            (self.metrics.miss if leader else self.metrics.hit)(self.name)
+        return flight, leader
+
+    def _release(self, key, flight):
+        # Unregister before waking waiters so a retry starts a fresh flight
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def resolve(self, key, flight, result):
+        self._release(key, flight)
+        flight._finish(result=result)
+
+    def fail(self, key, flight, error):
+        self._release(key, flight)
+        flight._finish(error=error)
+
+    def abandon(self, key, flight):
+        if flight.done:
+            return
+        self._release(key, flight)
+        with self._lock:
+            self.abandoned += 1
+        flight._finish(error=FlightAbandoned(f"Leader for {key!r} stopped"))
+
+    def do(self, key, fn):
+        """Run ``fn()`` unless an identical call is in flight; return ``(result, shared)``.
+
+        ``shared`` is True when the result came from another caller's call.
+        Errors raised by ``fn`` reach every caller of that flight.
+        """
+        while True:
+            flight, leader = self.join(key)
+            if not leader:
+                try:
+                    return flight.wait(), True
+                except FlightAbandoned:
+                    continue
+            try:
+                result = fn()
+            except Exception as exc:
+                self.fail(key, flight, exc)
+                raise
+            except BaseException:
+                self.abandon(key, flight)
+                raise
+            self.resolve(key, flight, result)
+            return result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "abandoned": self.abandoned,
+            }
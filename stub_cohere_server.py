@@ -0,0 +1,244 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧪 STUB COHERE SERVER - LOCAL HTTP STAND-IN FOR THE CHAT API
+# ═══════════════════════════════════════════════════════════════════
+"""Local HTTP server that answers like Cohere's ``/v1/chat`` endpoint.
+
+Unlike ``FakeCohereClient``, which replaces the client object, this server
+sits behind the real ``cohere.Client``. HTTP, JSON decoding, streaming,
+timeouts and retries all run as in production. Point the client at it
+with ``base_url`` (or ``CO_API_URL``) and it needs no network access.
+
+- Latency before the first token is drawn from a distribution (see
+  ``parse_latency``): ``fixed:0.8``, ``uniform:0.2,1.5``,
+  ``lognormal:0.8,0.5`` (median seconds and sigma) or ``exp:0.8`` (mean).
+- Streamed replies (``"stream": true``) are newline-delimited events, like
+  the real API, with ``token_delay`` seconds between words.
+- ``GET /v1/models`` answers the client warm-up call.
+- A fraction ``error_rate`` of chat requests fail with ``error_status``
+  (429 by default) after the sampled latency.
+
+Replies are ``FakeCohereClient`` text, so they are deterministic per
+``(model, message)``. Run it standalone for manual testing:
+
+    python stub_cohere_server.py --port 8089 --latency lognormal:0.8,0.5 --error-rate 0.02
+    CO_API_URL=http://127.0.0.1:8089 COHERE_API_KEY=stub streamlit run cohere_chat_ui.py
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fake_cohere import FakeCohereClient
+
+def parse_latency(spec):
+    """Return a function ``rng -> seconds`` for a ``kind:params`` latency spec."""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0.0
+    raise ValueError(f"bad latency spec {spec!r}: use fixed:S, uniform:LO,HI, lognormal:MEDIAN,SIGMA or exp:MEAN")
+
+class StubCohereServer:
+    """Threaded stub of the Cohere chat API on ``host:port`` (port 0 picks a free one)."""
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency="fixed:0",
+        token_delay=0.0,
+        error_rate=0.0,
+        error_status=429,
+        reply_words=40,
+        seed=0,
+    ):
+        self.sample_latency = parse_latency(latency)
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.replies = FakeCohereClient(reply_words=reply_words)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def start(self):
+        """Serve on a daemon thread and return ``self``."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-cohere", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+            }
+
+    def _draw(self):
+        """Return ``(latency, failed)`` for one chat request."""
+        with self._lock:
+            return max(self.sample_latency(self._rng), 0.0), self._rng.random() < self.error_rate
+
+    def _enter(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _leave(self, failed):
+        with self._lock:
+            self.in_flight -= 1
+            self.errors += failed
+
+    # ── request handling ───────────────────────────────────────────
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "/stats":
+                    self.send_json(200, stub.stats())
+                elif path == "/v1/models":
+                    # The client's warm-up call: cheap, authenticated, no tokens
+                    self.send_json(200, {"models": [{"name": "command-nightly", "endpoints": ["chat"]}]})
+                else:
+                    self.send_json(404, {"message": f"no route for GET {self.path}"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self.send_json(400, {"message": "invalid JSON body"})
+                    return
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "/v1/chat":
+                    self.chat(request)
+                else:
+                    self.send_json(404, {"message": f"no route for POST {self.path}"})
+
+            def chat(self, request):
+                stub._enter()
+                latency, failed = stub._draw()
+                try:
+                    time.sleep(latency)
+                    if failed:
+                        self.send_json(stub.error_status, {"message": "stub: simulated upstream error"})
+                        return
+                    text = stub.replies.reply_for(request.get("model"), request.get("message", ""))
+                    if request.get("stream"):
+                        self.stream(text)
+                    else:
+                        time.sleep(stub.token_delay * len(text.split(" ")))
+                        self.send_json(200, self.response(text))
+                finally:
+                    stub._leave(failed)
+
+            def response(self, text):
+                return {
+                    "response_id": str(uuid.uuid4()),
+                    "generation_id": str(uuid.uuid4()),
+                    "text": text,
+                    "finish_reason": "COMPLETE",
+                    "chat_history": [],
+                    "meta": {"billed_units": {"input_tokens": 0, "output_tokens": len(text.split(" "))}},
+                }
+
+            def stream(self, text):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/stream+json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                response = self.response(text)
+                self.send_event({"event_type": "stream-start", "is_finished": False, "generation_id": response["generation_id"]})
+                for i, word in enumerate(text.split(" ")):
+                    if i and stub.token_delay:
+                        time.sleep(stub.token_delay)
+                    self.send_event({"event_type": "text-generation", "is_finished": False, "text": word if i == 0 else " " + word})
+                self.send_event({"event_type": "stream-end", "is_finished": True, "finish_reason": "COMPLETE", "response": response})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def send_event(self, event):
+                line = json.dumps(event).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="lognormal:0.8,0.5", help="fixed:S, uniform:LO,HI, lognormal:MEDIAN,SIGMA or exp:MEAN")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed words")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    server = StubCohereServer(
+        args.host, args.port, latency=args.latency, token_delay=args.token_delay,
+        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed,
+    )
+    print(f"🧪 Stub Cohere API on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# ═══════════════════════════════════════════════════════════════════
+# 💡 SUGGESTION ENGINE - WHOLE-WORD KEYWORD MATCHING
+# ═══════════════════════════════════════════════════════════════════
+"""Indexed suggestion lookup for the chat input.
+
+The corpus is a list of ``{"keywords", "suggestion", "weight"}`` entries,
+loaded once from JSON or CSV. Keywords may be single words or phrases; they
+are tokenized into a word-level trie, so a lookup costs
+O(words in input × longest phrase) no matter how large the corpus is, and
+only whole words match ("hi" does not fire on "this").
+"""
+import csv
+import json
+import os
+import re
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+_END = None  # trie key holding the entry ids that end at a node
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "suggestions.json")
+
+def tokenize(text):
+    """Lowercase ``text`` and split it into word tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+def load_corpus(path):
+    """Load suggestion entries from a ``.json`` or ``.csv`` file."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            return [
+                {"keywords": row["keywords"], "suggestion": row["suggestion"], "weight": float(row.get("weight") or 1.0)}
+                for row in csv.DictReader(f)
+            ]
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+class SuggestionEngine:
+    """Word-level trie over suggestion keywords with ranked lookups."""
+
+    def __init__(self, entries):
+        self.entries = []
+        self._root = {}
+        for entry in entries:
+            tokens = tokenize(entry["keywords"])
+            if not tokens:
+                continue
+            entry_id = len(self.entries)
+            self.entries.append((entry["suggestion"], float(entry.get("weight", 1.0)), len(tokens)))
+            node = self._root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(_END, []).append(entry_id)
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_corpus(path))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def matches(self, text):
+        """Yield ``(entry_id, position)`` for every keyword found in ``text``."""
+        tokens = tokenize(text)
+        for i in range(len(tokens)):
+            node = self._root
+            for token in tokens[i:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                for entry_id in node.get(_END, ()):
+                    yield entry_id, i
+
+    def suggest(self, text, limit=3):
+        """Return up to ``limit`` suggestions, best first.
+
+        Matches rank by weight × phrase length (longer phrases are more
+        specific), then by earliest position in the input.
+        """
+        best = {}
+        for entry_id, position in self.matches(text):
+            suggestion, weight, length = self.entries[entry_id]
+            rank = (-weight * length, position, entry_id)
+            if suggestion not in best or rank < best[suggestion]:
+                best[suggestion] = rank
+        return [suggestion for suggestion, _ in sorted(best.items(), key=lambda item: item[1])[:limit]]
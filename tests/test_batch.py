@@ -0,0 +1,53 @@
+# ═══════════════════════════════════════════════════════════════════
+# 📦 BATCH TESTS - INPUT PARSING
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for reading batch input files."""
+import json
+
+import pytest
+
+from batch import read_prompts
+
+def write_jsonl(tmp_path, rows):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+def test_missing_id_defaults_to_row_number(tmp_path):
+    path = write_jsonl(tmp_path, [{"prompt": "a"}, {"prompt": "b"}])
+    assert [row["id"] for row in read_prompts(path)] == ["1", "2"]
+
+@pytest.mark.parametrize("given, expected", [(0, "0"), ("", ""), ("q-7", "q-7")])
+def test_explicit_id_is_kept(tmp_path, given, expected):
+    path = write_jsonl(tmp_path, [{"id": given, "prompt": "a"}])
+    assert [row["id"] for row in read_prompts(path)] == [expected]
+
+def test_csv_ids(tmp_path):
+    path = tmp_path / "prompts.csv"
+    path.write_text("id,prompt\n0,first\n,second\n", encoding="utf-8")
+    assert [row["id"] for row in read_prompts(str(path))] == ["0", ""]
+
+def test_row_without_prompt_is_rejected(tmp_path):
+    path = write_jsonl(tmp_path, [{"prompt": "a"}, {"id": "x"}])
+    with pytest.raises(ValueError, match="row 2 has no prompt"):
+        list(read_prompts(path))
+
+@pytest.mark.parametrize("history, message", [
+    ("not a list", "row 1: history must be a list"),
+    ([{"user": "hi"}], "row 1: history turn 1 needs string user and ai"),
+    ([{"user": "hi", "ai": "hello"}, ["hi", "hello"]], "row 1: history turn 2"),
+    ([{"user": "hi", "ai": None}], "row 1: history turn 1"),
+])
+def test_malformed_history_is_rejected_up_front(tmp_path, history, message):
+    path = write_jsonl(tmp_path, [{"prompt": "a", "history": history}])
+    with pytest.raises(ValueError, match=message):
+        list(read_prompts(path))
+
+def test_malformed_history_stops_before_any_call(tmp_path, capsys):
+    from batch import main
+
+    path = write_jsonl(tmp_path, [{"prompt": "a"}, {"prompt": "b", "history": [{"ai": "x"}]}])
+    output = tmp_path / "out.jsonl"
+    assert main([path, "-o", str(output), "--fake"]) == 2
+    assert "row 2: history turn 1" in capsys.readouterr().err
+    assert not output.exists()
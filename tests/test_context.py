@@ -0,0 +1,46 @@
+# ═══════════════════════════════════════════════════════════════════
+# 📏 CONTEXT WINDOW TESTS - TOKEN-BUDGETED PROMPTS
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``build_context_prompt`` and the turn selection behind it."""
+from chat_core import Turn, build_context_prompt, build_prompt, estimate_tokens, format_question, format_turn
+
+def make_history(count, words=10):
+    return [Turn(f"question {i} " + "word " * words, f"answer {i}", ts=0.0, seq=i) for i in range(count)]
+
+def test_everything_fits_a_large_budget():
+    history = make_history(5)
+    prompt, tokens, used = build_context_prompt(history, "next?", token_budget=10_000)
+    assert used == 5
+    assert prompt == "".join(map(format_turn, history)) + format_question("next?")
+    assert tokens == sum(turn.tokens for turn in history) + estimate_tokens(format_question("next?"))
+
+def test_budget_keeps_the_newest_turns_that_fit():
+    history = make_history(10)
+    question_tokens = estimate_tokens(format_question("next?"))
+    budget = question_tokens + 3 * history[0].tokens + 1
+    prompt, tokens, used = build_context_prompt(history, "next?", token_budget=budget)
+    assert used == 3
+    assert prompt.startswith(format_turn(history[7]))
+    assert "question 6 " not in prompt
+    assert tokens <= budget
+
+def test_selection_stops_at_the_first_turn_that_does_not_fit():
+    # An older, shorter turn is not pulled in past a newer one that was too long
+    history = [Turn("short", "a", seq=1), Turn("long " * 200, "a", seq=2), Turn("recent", "a", seq=3)]
+    _, _, used = build_context_prompt(history, "next?", token_budget=50)
+    assert used == 1
+
+def test_question_alone_when_the_budget_is_spent():
+    prompt, tokens, used = build_context_prompt(make_history(3), "next?", token_budget=1)
+    assert used == 0
+    assert prompt == format_question("next?")
+    assert tokens == estimate_tokens(prompt)
+
+def test_max_turns_caps_the_window():
+    _, _, used = build_context_prompt(make_history(10), "next?", token_budget=10_000, max_turns=4)
+    assert used == 4
+
+def test_build_prompt_is_unbudgeted_by_default():
+    history = make_history(8, words=500)
+    assert build_prompt(history, "next?", max_turns=6).count("Human:") == 7
+    assert build_prompt([], "next?") == format_question("next?")
@@ -0,0 +1,57 @@
+# ═══════════════════════════════════════════════════════════════════
+# 📥 IMPORT TESTS - JSONL ROUND TRIPS AND LINE-NUMBERED ERRORS
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``iter_import_turns`` against plain and gzipped JSONL exports."""
+import gzip
+import json
+from io import BytesIO
+
+import pytest
+
+from chat_core import ChatBackend, Turn, iter_history_jsonl, iter_import_turns, write_export
+from fake_cohere import FakeCohereClient
+
+def jsonl(*rows):
+    return BytesIO("".join(row if isinstance(row, str) else json.dumps(row) + "\n" for row in rows).encode("utf-8"))
+
+def test_export_round_trips():
+    history = [Turn("hi", "hello", ts=1_700_000_000.0), Turn("ünïcode?", "✓", ts=1_700_000_060.0)]
+    exported = BytesIO()
+    write_export(iter_history_jsonl(history), exported)
+    exported.seek(0)
+    imported = list(iter_import_turns(exported))
+    assert [(turn.user, turn.ai, turn.ts) for turn in imported] == [(turn.user, turn.ai, turn.ts) for turn in history]
+
+def test_gzip_is_detected_and_blank_lines_skipped():
+    data = BytesIO(gzip.compress(b'{"user": "a", "ai": "b"}\n\n{"user": "c", "ai": "d"}\n'))
+    assert [turn.user for turn in iter_import_turns(data)] == ["a", "c"]
+
+def test_callers_file_stays_open():
+    data = jsonl({"user": "a", "ai": "b"})
+    list(iter_import_turns(data))
+    assert not data.closed
+
+@pytest.mark.parametrize("row, message", [
+    ("{not json\n", "line 2: not valid JSON"),
+    (["user", "ai"], "line 2: expected an object with user and ai"),
+    ({"user": "a"}, "line 2: expected an object with user and ai"),
+    ({"user": "a", "ai": 3}, "line 2: user and ai must be strings"),
+    ({"user": None, "ai": "b"}, "line 2: user and ai must be strings"),
+    ({"user": "a", "ai": "b", "ts": "yesterday"}, "line 2: ts must be a finite number"),
+    ({"user": "a", "ai": "b", "ts": True}, "line 2: ts must be a finite number"),
+    ('{"user": "a", "ai": "b", "ts": NaN}\n', "line 2: ts must be a finite number"),
+])
+def test_bad_lines_are_reported_by_number(row, message):
+    turns = iter_import_turns(jsonl({"user": "ok", "ai": "ok"}, row))
+    assert next(turns).user == "ok"
+    with pytest.raises(ValueError, match=message):
+        next(turns)
+
+def test_backend_import_spills_instead_of_summarizing():
+    backend = ChatBackend(FakeCohereClient())
+    session = backend.new_session(memory_turns=3, policy="summarize")
+    rows = [{"user": f"q{i}", "ai": f"a{i}"} for i in range(10)]
+    assert backend.import_turns(session, iter_import_turns(jsonl(*rows)), batch_size=4) == 10
+    assert [turn.user for turn in session.history] == ["q7", "q8", "q9"]
+    assert [turn.seq for turn in session.history] == [8, 9, 10]
+    assert session.history.overflow == []
@@ -0,0 +1,144 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧭 MODEL ROUTER TESTS - ROUTING CHOICES AND BACKEND OBSERVATIONS
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``ModelRouter`` decisions and what ``ChatBackend`` reports to it."""
+import pytest
+
+from chat_core import ChatBackend
+from fake_cohere import FakeCohereClient
+from model_router import ModelRouter
+from resilient_client import CircuitBreaker, CircuitOpenError, ResilientClient
+from threads import TIMEOUT, BlockingClient, finish, start, wait_until
+
+QUALITY_MODEL = "command-nightly"
+FAST_MODEL = "command-light"
+
+# ── routing ────────────────────────────────────────────────────────
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_router(**kwargs):
+    clock = FakeClock()
+    return ModelRouter(FAST_MODEL, min_samples=3, clock=clock, **kwargs), clock
+
+def observe(router, model, seconds, count=5, ok=True):
+    for _ in range(count):
+        router.observe(model, seconds, ok=ok)
+
+@pytest.mark.parametrize("message, simple, reason", [
+    ("What is BM25?", True, "short question"),
+    ("Explain BM25", False, 'asks "explain"'),
+    ("How does hedging work", False, 'asks "how does"'),
+    ("Fix `x == 1;` please", False, "contains code"),
+    ("What? And why not?", False, 'asks "why"'),
+    ("Is it fast? Is it cheap?", False, "several questions"),
+    ("tell me " * 7, False, "long question (14 words)"),
+])
+def test_classify(message, simple, reason):
+    router, _ = make_router()
+    is_simple, why = router.classify(message)
+    assert is_simple is simple
+    assert reason in why
+
+def test_simple_questions_go_fast_and_complex_ones_stay():
+    router, _ = make_router()
+    assert router.route(QUALITY_MODEL, "What is BM25?").model == FAST_MODEL
+    assert router.route(QUALITY_MODEL, "Compare BM25 and TF-IDF").model == QUALITY_MODEL
+    assert router.route_background(QUALITY_MODEL).model == FAST_MODEL
+    assert router.route(FAST_MODEL, "Explain BM25").reason == "configured model"
+
+def test_slow_preferred_model_falls_back_to_the_healthy_one():
+    router, _ = make_router(slo_seconds=2.0)
+    observe(router, FAST_MODEL, 5.0)
+    observe(router, QUALITY_MODEL, 1.0)
+    route = router.route(QUALITY_MODEL, "What is BM25?")
+    assert route.model == QUALITY_MODEL
+    assert f"{FAST_MODEL} p95 5.0s over 2s SLO" in route.reason
+
+def test_failing_preferred_model_falls_back():
+    router, _ = make_router()
+    observe(router, QUALITY_MODEL, 0.5, count=3, ok=False)
+    observe(router, QUALITY_MODEL, 0.5, count=2)
+    route = router.route(QUALITY_MODEL, "Explain BM25")
+    assert route.model == FAST_MODEL
+    assert f"{QUALITY_MODEL} failing (60% errors)" in route.reason
+
+def test_too_few_samples_count_as_healthy():
+    router, _ = make_router(slo_seconds=2.0)
+    observe(router, FAST_MODEL, 9.0, count=2)
+    assert router.route(QUALITY_MODEL, "What is BM25?").model == FAST_MODEL
+
+def test_both_degraded_picks_the_one_failing_less_then_the_faster():
+    router, _ = make_router(slo_seconds=1.0)
+    observe(router, FAST_MODEL, 3.0)
+    observe(router, QUALITY_MODEL, 2.0)
+    route = router.route(QUALITY_MODEL, "What is BM25?")
+    assert route.model == QUALITY_MODEL
+    assert "both over SLO" in route.reason
+    observe(router, QUALITY_MODEL, 2.0, count=20, ok=False)
+    assert router.route(QUALITY_MODEL, "What is BM25?").model == FAST_MODEL
+
+def test_old_samples_expire_so_a_model_is_retried():
+    router, clock = make_router(slo_seconds=2.0, max_age=60.0)
+    observe(router, FAST_MODEL, 5.0)
+    assert router.route(QUALITY_MODEL, "What is BM25?").model == QUALITY_MODEL
+    clock.now = 61.0
+    assert router.route(QUALITY_MODEL, "What is BM25?").model == FAST_MODEL
+
+def test_stats_count_routes_and_keep_the_newest_decision_first():
+    router, _ = make_router()
+    router.route(QUALITY_MODEL, "What is BM25?")
+    router.route(QUALITY_MODEL, "Explain BM25")
+    stats = router.stats()
+    assert stats["models"][FAST_MODEL]["routed"] == 1
+    assert stats["models"][QUALITY_MODEL]["routed"] == 1
+    assert [decision["model"] for decision in stats["decisions"]] == [QUALITY_MODEL, FAST_MODEL]
+
+# ── backend observations ───────────────────────────────────────────
+class FailingClient(FakeCohereClient):
+    def chat(self, model=None, message="", **kwargs):
+        self._count()
+        raise ConnectionError("upstream went away")
+
+def routed_backend(client):
+    return ChatBackend(client, router=ModelRouter(FAST_MODEL))
+
+def calls_and_errors(router, model):
+    stats = router.stats()["models"].get(model, {"calls": 0, "errors": 0})
+    return stats["calls"], stats["errors"]
+
+def test_upstream_failure_is_observed():
+    backend = routed_backend(FailingClient())
+    with pytest.raises(ConnectionError):
+        backend.process_message(backend.new_session(), "hi", 4, QUALITY_MODEL, route=True)
+    assert calls_and_errors(backend.router, FAST_MODEL) == (1, 1)
+
+def test_open_circuit_is_not_observed_as_a_model_failure():
+    client = ResilientClient(FakeCohereClient(), breaker=CircuitBreaker(failure_threshold=1))
+    client.breaker_for(FAST_MODEL).record_failure()
+    backend = routed_backend(client)
+    with pytest.raises(CircuitOpenError):
+        backend.process_message(backend.new_session(), "hi", 4, QUALITY_MODEL, route=True)
+    assert calls_and_errors(backend.router, FAST_MODEL) == (0, 0)
+
+def test_shared_failure_is_observed_once():
+    client = BlockingClient(fail_first=True)
+    backend = routed_backend(client)
+
+    def ask():
+        return backend.process_message(backend.new_session(), "hi", 4, QUALITY_MODEL, route=True)
+
+    leader, leader_outcome = start(ask)
+    assert client.entered.wait(TIMEOUT)
+    follower, follower_outcome = start(ask)
+    wait_until(lambda: backend.single_flight.stats()["coalesced"] == 1)
+    client.release.set()
+    finish(leader, follower)
+
+    assert isinstance(leader_outcome["error"], ConnectionError)
+    assert isinstance(follower_outcome["error"], ConnectionError)
+    assert calls_and_errors(backend.router, FAST_MODEL) == (1, 1)
@@ -0,0 +1,260 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🛡️ RESILIENT CLIENT TESTS - RETRIES, BACKOFF, BREAKER, HEDGING, STALLS
+# ═══════════════════════════════════════════════════════════════════
+"""Deterministic tests for ``ResilientClient`` against scripted fake clients.
+
+Sleeps are recorded instead of slept, the jitter source and the breaker's
+clock are fixed, and calls that must overlap are ordered with events, so
+no test depends on wall-clock timing beyond short safety timeouts.
+"""
+import threading
+
+import pytest
+
+from resilient_client import CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResilientClient
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class Reply:
+    def __init__(self, text):
+        self.text = text
+
+class ScriptedClient:
+    """``chat`` raises or returns the scripted outcomes in order."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def chat(self, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Reply(outcome)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_client(client, **kwargs):
+    sleeps = []
+    kwargs.setdefault("rng", lambda: 1.0)
+    return ResilientClient(client, sleep=sleeps.append, **kwargs), sleeps
+
+# ── retries ────────────────────────────────────────────────────────
+def test_retries_retryable_errors_then_succeeds():
+    client = ScriptedClient(StatusError(429), ConnectionError("reset"), "ok")
+    resilient, sleeps = make_client(client, max_retries=2)
+    assert resilient.chat(message="hi").text == "ok"
+    assert client.calls == 3
+    assert len(sleeps) == 2
+    assert resilient.stats()["retries"] == 2
+    assert resilient.stats()["failures"] == 0
+
+def test_gives_up_after_max_retries():
+    client = ScriptedClient(StatusError(503), StatusError(503), StatusError(503), "never")
+    resilient, sleeps = make_client(client, max_retries=2)
+    with pytest.raises(StatusError):
+        resilient.chat(message="hi")
+    assert client.calls == 3
+    assert len(sleeps) == 2
+    assert resilient.stats()["failures"] == 1
+
+def test_does_not_retry_client_errors():
+    client = ScriptedClient(StatusError(400), "never")
+    resilient, sleeps = make_client(client)
+    with pytest.raises(StatusError):
+        resilient.chat(message="hi")
+    assert client.calls == 1
+    assert sleeps == []
+    # A bad request says nothing about upstream health
+    assert resilient.breaker.state == "closed"
+
+# ── backoff ────────────────────────────────────────────────────────
+@pytest.mark.parametrize("jitter", [0.0, 0.5, 0.999])
+def test_backoff_stays_within_full_jitter_bounds(jitter):
+    resilient, _ = make_client(ScriptedClient(), backoff_base=0.25, backoff_max=4.0, rng=lambda: jitter)
+    for attempt in range(1, 10):
+        cap = min(4.0, 0.25 * 2 ** (attempt - 1))
+        pause = resilient.backoff(attempt)
+        assert 0.0 <= pause <= cap
+        assert pause == pytest.approx(jitter * cap)
+
+def test_retry_sleeps_use_exponential_backoff():
+    client = ScriptedClient(StatusError(500), StatusError(500), StatusError(500), "ok")
+    resilient, sleeps = make_client(client, max_retries=3, backoff_base=0.1, backoff_max=0.3)
+    resilient.chat(message="hi")
+    assert sleeps == pytest.approx([0.1, 0.2, 0.3])
+
+def test_no_retry_when_backoff_would_pass_the_deadline():
+    client = ScriptedClient(StatusError(500), "never")
+    resilient, sleeps = make_client(client, backoff_base=60.0, backoff_max=60.0)
+    with pytest.raises(StatusError):
+        resilient.chat(message="hi", timeout=5.0)
+    assert client.calls == 1
+    assert sleeps == []
+
+# ── circuit breaker ────────────────────────────────────────────────
+def test_breaker_opens_after_threshold_and_half_opens_after_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0, clock=clock)
+    client = ScriptedClient(StatusError(500), StatusError(500), "recovered")
+    resilient, _ = make_client(client, max_retries=0, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            resilient.chat(message="hi")
+    assert breaker.state == "open"
+
+    clock.now = 29.0
+    with pytest.raises(CircuitOpenError) as info:
+        resilient.chat(message="hi")
+    assert info.value.retry_in == pytest.approx(1.0)
+    assert client.calls == 2
+    assert resilient.stats()["short_circuited"] == 1
+
+    clock.now = 30.0
+    assert breaker.state == "half-open"
+    assert resilient.chat(message="hi").text == "recovered"
+    assert breaker.state == "closed"
+
+def test_half_open_allows_a_single_trial_and_reopens_on_failure():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 10.0
+    breaker.before_call()  # the trial
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 15.0
+    assert breaker.state == "open"
+    clock.now = 20.0
+    assert breaker.state == "half-open"
+
+# ── hedging ────────────────────────────────────────────────────────
+class SlowFirstClient:
+    """The first call blocks until released; later calls answer at once."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            self.release.wait(5.0)
+            return Reply("primary")
+        return Reply(f"hedge {call}")
+
+def warmed(resilient, samples=20, seconds=0.01):
+    for _ in range(samples):
+        resilient.latencies.add(seconds)
+    return resilient
+
+def test_hedge_not_sent_before_enough_samples():
+    client = SlowFirstClient()
+    client.release.set()
+    resilient, _ = make_client(client, hedge=True, hedge_min_samples=20)
+    assert resilient.hedge_delay() is None
+    assert resilient.chat(message="hi").text == "primary"
+    assert resilient.stats()["hedges"] == 0
+
+def test_hedge_wins_when_primary_is_slow():
+    client = SlowFirstClient()
+    resilient = warmed(make_client(client, hedge=True, hedge_min_delay=0.01)[0])
+    try:
+        assert resilient.chat(message="hi").text == "hedge 2"
+    finally:
+        client.release.set()
+    stats = resilient.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+def test_hedge_delay_is_p95_floored_at_min_delay():
+    resilient = warmed(make_client(ScriptedClient(), hedge_min_delay=0.5)[0], seconds=0.1)
+    assert resilient.hedge_delay() == 0.5
+    for _ in range(200):
+        resilient.latencies.add(2.0)
+    assert resilient.hedge_delay() == 2.0
+
+# ── streaming ──────────────────────────────────────────────────────
+class StallingStreamClient:
+    """Streams ``events`` and then hangs until released."""
+
+    def __init__(self, *events):
+        self.events = events
+        self.release = threading.Event()
+
+    def chat_stream(self, **kwargs):
+        yield from self.events
+        self.release.wait(5.0)
+
+def test_stream_stall_raises_deadline_and_counts_a_failure():
+    client = StallingStreamClient("first", "second")
+    breaker = CircuitBreaker(failure_threshold=1, clock=FakeClock())
+    resilient, _ = make_client(client, breaker=breaker)
+    received = []
+    try:
+        with pytest.raises(DeadlineExceeded, match="stalled"):
+            for event in resilient.chat_stream(message="hi", timeout=0.05):
+                received.append(event)
+    finally:
+        client.release.set()
+    assert received == ["first", "second"]
+    assert breaker.state == "open"
+
+def test_stream_retries_until_the_first_event():
+    class FlakyStream:
+        calls = 0
+
+        def chat_stream(self, **kwargs):
+            FlakyStream.calls += 1
+            if FlakyStream.calls == 1:
+                raise StatusError(502)
+            yield "a"
+            yield "b"
+
+    resilient, sleeps = make_client(FlakyStream())
+    assert list(resilient.chat_stream(message="hi")) == ["a", "b"]
+    assert FlakyStream.calls == 2
+    assert len(sleeps) == 1
+
+# ── per-model breakers ─────────────────────────────────────────────
+class ModelClient:
+    """``chat`` fails for the models in ``failing`` and answers for the others."""
+
+    def __init__(self, *failing):
+        self.failing = set(failing)
+
+    def chat(self, model=None, **kwargs):
+        if model in self.failing:
+            raise StatusError(503)
+        return Reply(model)
+
+def test_each_model_has_its_own_breaker():
+    clock = FakeClock()
+    resilient, _ = make_client(
+        ModelClient("command-nightly"), max_retries=0, breaker=CircuitBreaker(failure_threshold=2, clock=clock)
+    )
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            resilient.chat(model="command-nightly", message="hi")
+    with pytest.raises(CircuitOpenError, match="command-nightly"):
+        resilient.chat(model="command-nightly", message="hi")
+    # The other model is unaffected, so a router can still fall back to it
+    assert resilient.chat(model="command-light", message="hi").text == "command-light"
+    assert resilient.stats()["circuits"] == {"command-nightly": "open", "command-light": "closed"}
+    clock.now = 30.0
+    assert resilient.breaker_for("command-nightly").state == "half-open"
@@ -0,0 +1,43 @@
+# ═══════════════════════════════════════════════════════════════════
+# 💾 RESPONSE CACHE TESTS - SQLITE TIER PURGING AND SIZE CAP
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for the persistent tier of ``ResponseCache``."""
+import sqlite3
+
+from chat_core import ResponseCache
+
+def disk_rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+def test_disk_tier_has_an_expiry_index(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(db_path=path)
+    with sqlite3.connect(path) as db:
+        plan = " ".join(row[-1] for row in db.execute("EXPLAIN QUERY PLAN DELETE FROM responses WHERE expires <= 0"))
+    assert "responses_expires" in plan
+
+def test_disk_tier_is_capped(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(max_entries=5, db_path=path, max_disk_entries=20, purge_interval=3600.0)
+    for i in range(100):
+        cache.put("model", f"prompt {i}", f"reply {i}")
+    assert disk_rows(path) <= 20 + 20 // 10
+    # The newest entries survive and are served from disk after a restart
+    reopened = ResponseCache(db_path=path, max_disk_entries=20)
+    assert reopened.get("model", "prompt 99") == "reply 99"
+    assert reopened.get("model", "prompt 0") is None
+    assert cache.stats()["purged"] >= 78
+
+def test_purge_is_periodic_not_per_put(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(db_path=path, ttl_seconds=-1.0, max_disk_entries=1000, purge_interval=3600.0)
+    cache.put("model", "first", "reply")  # first write purges
+    for i in range(50):
+        cache.put("model", f"prompt {i}", "reply")
+    # Already expired, but kept until the next purge is due
+    assert disk_rows(path) == 50
+    assert cache.get("model", "prompt 1") is None
+    for i in range(50, 100):
+        cache.put("model", f"prompt {i}", "reply")
+    assert disk_rows(path) < 100
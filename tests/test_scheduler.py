@@ -0,0 +1,133 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🚦 SCHEDULER TESTS - PRIORITY, ROUND-ROBIN FAIRNESS, RATE LIMIT
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``RequestScheduler`` dispatch order and ``TokenBucket``.
+
+A single worker is held busy by a blocking job while the others queue up,
+so the order in which they run is decided by the scheduler alone.
+"""
+import threading
+
+import pytest
+
+from scheduler import BACKGROUND, INTERACTIVE, RequestScheduler, TokenBucket
+from threads import TIMEOUT, wait_until
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def busy_scheduler():
+    """Return ``(scheduler, release)`` with its only worker blocked until ``release`` is set."""
+    scheduler = RequestScheduler(max_workers=1)
+    release = threading.Event()
+    blocker = scheduler.submit(release.wait, TIMEOUT, session_id="blocker")
+    wait_until(blocker.running)
+    return scheduler, release
+
+def run_in_order(scheduler, release, jobs):
+    """Queue ``(session, priority, label)`` jobs, release the worker and return the labels in run order."""
+    ran = []
+    futures = [
+        scheduler.submit(ran.append, label, session_id=session, priority=priority)
+        for session, priority, label in jobs
+    ]
+    release.set()
+    for future in futures:
+        future.result(TIMEOUT)
+    return ran, futures
+
+# ── dispatch order ─────────────────────────────────────────────────
+def test_interactive_jobs_run_before_background_ones():
+    scheduler, release = busy_scheduler()
+    ran, _ = run_in_order(scheduler, release, [
+        ("a", BACKGROUND, "summary a"),
+        ("b", INTERACTIVE, "answer b"),
+        ("a", INTERACTIVE, "answer a"),
+        ("b", BACKGROUND, "summary b"),
+    ])
+    assert ran == ["answer b", "answer a", "summary a", "summary b"]
+
+def test_sessions_take_turns_within_a_priority():
+    scheduler, release = busy_scheduler()
+    ran, _ = run_in_order(scheduler, release, [
+        ("busy", INTERACTIVE, "busy 1"),
+        ("busy", INTERACTIVE, "busy 2"),
+        ("busy", INTERACTIVE, "busy 3"),
+        ("quiet", INTERACTIVE, "quiet 1"),
+        ("other", INTERACTIVE, "other 1"),
+        ("quiet", INTERACTIVE, "quiet 2"),
+    ])
+    assert ran == ["busy 1", "quiet 1", "other 1", "busy 2", "quiet 2", "busy 3"]
+
+def test_position_matches_the_dispatch_order():
+    scheduler, release = busy_scheduler()
+    jobs = [
+        ("busy", INTERACTIVE, "busy 1"),
+        ("busy", INTERACTIVE, "busy 2"),
+        ("quiet", BACKGROUND, "summary"),
+        ("quiet", INTERACTIVE, "quiet 1"),
+    ]
+    futures = [scheduler.submit(lambda: None, session_id=session, priority=priority) for session, priority, _ in jobs]
+    assert [scheduler.position(future) for future in futures] == [0, 2, 3, 1]
+    futures[0].cancel()
+    # A cancelled job no longer counts as ahead of anyone
+    assert [scheduler.position(future) for future in futures[1:]] == [1, 2, 0]
+    release.set()
+    for future in futures[1:]:
+        future.result(TIMEOUT)
+    assert scheduler.position(futures[1]) is None
+
+def test_call_reports_its_place_in_line_then_none():
+    scheduler, release = busy_scheduler()
+    scheduler.submit(lambda: None, session_id="ahead")
+    seen = []
+
+    def on_wait(position):
+        seen.append(position)
+        if position is not None:
+            release.set()
+
+    assert scheduler.call(lambda: "done", session_id="me", on_wait=on_wait, poll=0.01) == "done"
+    assert seen[0] == 1
+    assert seen[-1] is None
+
+def test_failures_reach_the_caller_and_are_counted():
+    scheduler = RequestScheduler(max_workers=1)
+
+    def fail():
+        raise ConnectionError("upstream went away")
+
+    with pytest.raises(ConnectionError):
+        scheduler.call(fail)
+    wait_until(lambda: scheduler.stats()["completed"] == 1)
+    assert scheduler.stats()["failed"] == 1
+
+# ── token bucket ───────────────────────────────────────────────────
+def test_token_bucket_allows_a_burst_then_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.try_acquire() == 0.0
+    clock.now = 100.0
+    # Idle time refills up to the burst size, no further
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() > 0
+
+def test_token_bucket_acquire_sleeps_until_a_token_is_due():
+    clock = FakeClock()
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    bucket = TokenBucket(rate=4.0, capacity=1, clock=clock, sleep=sleep)
+    bucket.acquire()
+    bucket.acquire()
+    assert sleeps == [pytest.approx(0.25)]
@@ -0,0 +1,109 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🔎 SEARCH INDEX TESTS - BM25 RANKING, PHRASES, PREFIXES, UPDATES
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``SearchIndex`` ranking and query syntax, and for ``highlight``."""
+import math
+
+import pytest
+
+from search_index import SearchIndex, highlight, parse_query
+
+def keys(results):
+    return [key for key, _ in results]
+
+def make_index(*docs):
+    index = SearchIndex()
+    for key, text in enumerate(docs, start=1):
+        index.add(key, text)
+    return index
+
+def test_parse_query():
+    assert parse_query('deploy "Connection refused" pyth* ""') == [
+        ("phrase", ["deploy"]),
+        ("phrase", ["connection", "refused"]),
+        ("prefix", "pyth"),
+    ]
+
+# ── ranking ────────────────────────────────────────────────────────
+def test_score_matches_the_bm25_formula():
+    index = make_index("cache cache miss", "cache hit", "nothing here", "other words entirely")
+    k1, b = index.k1, index.b
+    average = (3 + 2 + 2 + 3) / 4
+    idf = math.log(1 + (4 - 2 + 0.5) / (2 + 0.5))
+
+    def bm25(frequency, length):
+        return idf * (k1 + 1) * frequency / (frequency + k1 * (1 - b + b * length / average))
+
+    results = index.search("cache")
+    assert keys(results) == [1, 2]
+    assert [score for _, score in results] == pytest.approx([bm25(2, 3), bm25(1, 2)], rel=1e-5)
+
+def test_rare_terms_outweigh_common_ones():
+    index = make_index("python error", "python deploy", "python tips", "python error again")
+    # "deploy" is in one document, "error" in two: the deploy match ranks first
+    assert keys(index.search("python deploy")) == [2]
+    assert index.search("deploy")[0][1] > index.search("error")[0][1]
+
+def test_shorter_documents_rank_higher_at_equal_frequency():
+    index = make_index("cache " + "filler " * 20, "cache filler")
+    assert keys(index.search("cache")) == [2, 1]
+
+def test_ties_go_to_the_newest_and_limit_keeps_the_best():
+    index = make_index(*["same text"] * 5)
+    assert keys(index.search("same")) == [5, 4, 3, 2, 1]
+    assert keys(index.search("same", limit=2)) == [5, 4]
+
+def test_all_clauses_must_match():
+    index = make_index("deploy failed", "deploy worked", "error")
+    assert keys(index.search("deploy failed")) == [1]
+    assert index.search("deploy missing") == []
+    assert index.search("") == []
+
+# ── phrases and prefixes ───────────────────────────────────────────
+def test_phrases_need_consecutive_words_in_one_field():
+    index = SearchIndex()
+    index.add(1, "the connection was refused")
+    index.add(2, "connection refused by host")
+    index.add(3, "why no connection", "refused it was")
+    assert keys(index.search('"connection refused"')) == [2]
+
+def test_prefix_expands_to_every_matching_term():
+    index = make_index("python", "pythonic code", "pytest", "rust")
+    assert sorted(keys(index.search("pyth*"))) == [1, 2]
+    assert sorted(keys(index.search("py*"))) == [1, 2, 3]
+    index.add(5, "pythagoras")  # merged into the vocabulary on the next prefix query
+    assert sorted(keys(index.search("pyth*"))) == [1, 2, 5]
+
+# ── updates ────────────────────────────────────────────────────────
+def test_replace_and_remove_keep_results_current():
+    index = make_index("alpha beta", "beta gamma")
+    assert keys(index.search("beta")) == [2, 1]  # builds the cached arrays
+    index.add(3, "beta delta")
+    assert keys(index.search("beta")) == [3, 2, 1]
+    index.add(1, "gamma only")
+    assert keys(index.search("beta")) == [3, 2]
+    assert keys(index.search("gamma")) == [1, 2]
+    index.remove(2)
+    assert keys(index.search("beta")) == [3]
+    assert index.search("gam*") == index.search("gamma")
+    assert index.stats()["documents"] == 2
+
+def test_scores_after_removal_match_a_fresh_index():
+    index = make_index("one two", "two three", "three four two")
+    index.search("two")
+    index.remove(1)
+    fresh = SearchIndex()
+    fresh.add(2, "two three")
+    fresh.add(3, "three four two")
+    assert index.search("two") == pytest.approx(fresh.search("two"))
+
+# ── highlight ──────────────────────────────────────────────────────
+def test_highlight_bolds_words_and_prefixes():
+    assert highlight("Python and pytest are fine", "pyth* fine") == "**Python** and pytest are **fine**"
+
+def test_highlight_trims_around_the_first_match():
+    text = "x " * 200 + "needle" + " y" * 200
+    snippet = highlight(text, "needle", width=40)
+    assert "**needle**" in snippet
+    assert snippet.startswith("…")
+    assert snippet.endswith("…")
@@ -0,0 +1,47 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧭 SEMANTIC CACHE TESTS - REWORDINGS HIT, NEAR MISSES DO NOT
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``SemanticCache`` matching with the offline hashing embedder."""
+import pytest
+
+from semantic_cache import SemanticCache, content_terms
+
+MODEL = "command-nightly"
+
+def test_content_terms_drop_filler_and_contractions():
+    assert content_terms("Can you please tell me what's a closure?") == {"what", "closure"}
+
+@pytest.mark.parametrize("cached, asked", [
+    ("What can you do?", "what can you do"),
+    ("How do I sort a list in Python?", "how do i sort a list in python please"),
+])
+def test_rewording_hits(cached, asked):
+    cache = SemanticCache()
+    cache.put(MODEL, cached, "answer")
+    answer, similarity = cache.get(MODEL, asked)
+    assert answer == "answer"
+    assert similarity >= cache.threshold
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Write a python function that returns the sum of a list of integers",
+     "Write a python function that returns the product of a list of integers"),
+    ("What happens if I mix bleach and ammonia?", "What happens if I mix bleach and vinegar?"),
+])
+def test_one_word_swap_is_rejected(cached, asked):
+    cache = SemanticCache()
+    cache.put(MODEL, cached, "answer")
+    assert cache.get(MODEL, asked) is None
+
+def test_swap_above_threshold_counts_as_rejected():
+    cache = SemanticCache()
+    cache.put(MODEL, "Write a python function that returns the sum of a list of integers", "sum")
+    assert cache.get(MODEL, "Write a python function that returns the product of a list of integers") is None
+    assert cache.stats()["rejected"] == 1
+    # Without the check, word overlap alone would have served the wrong answer
+    cache.same_terms = False
+    assert cache.get(MODEL, "Write a python function that returns the product of a list of integers")[0] == "sum"
+
+def test_models_are_kept_apart():
+    cache = SemanticCache()
+    cache.put(MODEL, "What can you do?", "answer")
+    assert cache.get("command-light", "What can you do?") is None
@@ -0,0 +1,166 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🤝 SINGLE-FLIGHT TESTS - SHARED FAILURES, ABANDONED LEADERS, STREAMS
+# ═══════════════════════════════════════════════════════════════════
+"""Threaded tests for ``SingleFlight`` and the backend's coalesced replies.
+
+Upstream calls block on events, and each test waits until the expected
+number of followers has joined before letting the leader go, so the
+interleaving is fixed rather than left to timing.
+"""
+import threading
+
+import pytest
+
+from chat_core import ChatBackend
+from singleflight import SingleFlight
+from threads import TIMEOUT, BlockingClient, finish, start, wait_until
+
+MODEL = "command-nightly"
+
+class Interrupted(BaseException):
+    """Stands in for a Streamlit rerun stopping the leader's script."""
+
+# ── SingleFlight ───────────────────────────────────────────────────
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        assert release.wait(TIMEOUT)
+        return "answer"
+
+    leader, leader_outcome = start(flight.do, "key", fn)
+    wait_until(lambda: calls)
+    followers = [start(flight.do, "key", fn) for _ in range(3)]
+    wait_until(lambda: flight.stats()["coalesced"] == 3)
+    release.set()
+    finish(leader, *(thread for thread, _ in followers))
+
+    assert leader_outcome["result"] == ("answer", False)
+    assert [outcome["result"] for _, outcome in followers] == [("answer", True)] * 3
+    assert len(calls) == 1
+    assert flight.stats()["in_flight"] == 0
+
+def test_leader_failure_reaches_every_follower():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        assert release.wait(TIMEOUT)
+        raise ConnectionError("boom")
+
+    leader, leader_outcome = start(flight.do, "key", fn)
+    wait_until(lambda: calls)
+    followers = [start(flight.do, "key", fn) for _ in range(2)]
+    wait_until(lambda: flight.stats()["coalesced"] == 2)
+    release.set()
+    finish(leader, *(thread for thread, _ in followers))
+
+    errors = [leader_outcome["error"]] + [outcome["error"] for _, outcome in followers]
+    assert all(isinstance(error, ConnectionError) for error in errors)
+    assert len(calls) == 1
+
+def test_interrupted_leader_hands_over_to_a_follower():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            assert release.wait(TIMEOUT)
+            raise Interrupted()
+        return "retried"
+
+    leader, leader_outcome = start(flight.do, "key", fn)
+    wait_until(lambda: calls)
+    followers = [start(flight.do, "key", fn) for _ in range(2)]
+    wait_until(lambda: flight.stats()["coalesced"] == 2)
+    release.set()
+    finish(leader, *(thread for thread, _ in followers))
+
+    assert isinstance(leader_outcome["error"], Interrupted)
+    results = sorted(outcome["result"] for _, outcome in followers)
+    # One follower became the new leader; the other shared its call or, if it
+    # rejoined after that call ended, made one of its own
+    assert results[0] == ("retried", False)
+    assert results[1][0] == "retried"
+    assert len(calls) == 1 + sum(not shared for _, shared in results)
+    assert flight.stats()["abandoned"] == 1
+
+# ── ChatBackend ────────────────────────────────────────────────────
+def ask(backend, **kwargs):
+    return backend.process_message(backend.new_session(), "What is caching?", 4, MODEL, **kwargs)
+
+def test_backend_follower_raises_when_leader_call_fails():
+    client = BlockingClient(fail_first=True)
+    backend = ChatBackend(client)
+    leader, leader_outcome = start(ask, backend)
+    assert client.entered.wait(TIMEOUT)
+    follower, follower_outcome = start(ask, backend)
+    wait_until(lambda: backend.single_flight.stats()["coalesced"] == 1)
+    client.release.set()
+    finish(leader, follower)
+
+    assert isinstance(leader_outcome["error"], ConnectionError)
+    assert isinstance(follower_outcome["error"], ConnectionError)
+    assert client.calls == 1
+
+def test_backend_streaming_follower_shares_the_leaders_reply():
+    client = BlockingClient()
+    backend = ChatBackend(client)
+    leader, leader_outcome = start(ask, backend, stream=True)
+    assert client.entered.wait(TIMEOUT)
+    follower, follower_outcome = start(ask, backend, stream=True)
+    wait_until(lambda: backend.single_flight.stats()["coalesced"] == 1)
+    client.release.set()
+    finish(leader, follower)
+
+    expected = client.reply_for(MODEL, client.messages[0])
+    assert leader_outcome["result"].text == expected
+    assert follower_outcome["result"].text == expected
+    assert follower_outcome["result"].shared
+    assert client.calls == 1
+
+def test_backend_streaming_follower_falls_back_to_its_own_stream():
+    client = BlockingClient()
+    backend = ChatBackend(client)
+
+    def stop_after_first_chunk(chunks):
+        next(iter(chunks))
+        raise Interrupted()
+
+    leader, leader_outcome = start(ask, backend, stream=True, render_stream=stop_after_first_chunk)
+    assert client.entered.wait(TIMEOUT)
+    follower, follower_outcome = start(ask, backend, stream=True)
+    wait_until(lambda: backend.single_flight.stats()["coalesced"] == 1)
+    client.release.set()
+    finish(leader, follower)
+
+    assert isinstance(leader_outcome["error"], Interrupted)
+    reply = follower_outcome["result"]
+    assert reply.text == client.reply_for(MODEL, client.messages[1])
+    assert not reply.shared
+    assert client.calls == 2
+    assert backend.single_flight.stats()["abandoned"] == 1
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_backend_leader_reply_is_recorded_once_per_session(stream):
+    client = BlockingClient()
+    backend = ChatBackend(client)
+    sessions = [backend.new_session() for _ in range(2)]
+    threads = []
+    for i, session in enumerate(sessions):
+        threads.append(start(backend.process_message, session, "What is caching?", 4, MODEL, stream=stream)[0])
+        if i == 0:
+            assert client.entered.wait(TIMEOUT)
+    wait_until(lambda: backend.single_flight.stats()["coalesced"] == 1)
+    client.release.set()
+    finish(*threads)
+
+    assert [len(session.history) for session in sessions] == [1, 1]
+    assert client.calls == 1
@@ -0,0 +1,35 @@
+# ═══════════════════════════════════════════════════════════════════
+# 💡 SUGGESTION ENGINE TESTS - WHOLE WORDS, PHRASES AND RANKING
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``SuggestionEngine`` lookups and corpus loading."""
+from suggestions import SuggestionEngine, load_corpus
+
+def engine(*entries):
+    return SuggestionEngine(
+        [{"keywords": keywords, "suggestion": suggestion, "weight": weight} for keywords, suggestion, weight in entries]
+    )
+
+def test_only_whole_words_match():
+    suggestions = engine(("hi", "Say hello back", 1.0))
+    assert suggestions.suggest("this is it") == []
+    assert suggestions.suggest("Hi, there") == ["Say hello back"]
+
+def test_phrases_outrank_single_words_of_equal_weight():
+    suggestions = engine(("python", "Python docs", 1.0), ("python error", "Debug the traceback", 1.0))
+    assert suggestions.suggest("I get a python error") == ["Debug the traceback", "Python docs"]
+
+def test_weight_then_position_decide_the_order():
+    suggestions = engine(("deploy", "Deploy guide", 1.0), ("cache", "Cache guide", 1.0), ("error", "Error guide", 3.0))
+    assert suggestions.suggest("cache deploy error", limit=2) == ["Error guide", "Cache guide"]
+
+def test_a_suggestion_is_listed_once():
+    suggestions = engine(("cache", "Caching", 1.0), ("ttl", "Caching", 1.0))
+    assert suggestions.suggest("cache ttl cache") == ["Caching"]
+
+def test_entries_without_keywords_are_skipped():
+    assert len(engine(("", "Nothing", 1.0), ("?!", "Punctuation", 1.0), ("ok", "Fine", 1.0))) == 1
+
+def test_csv_corpus_defaults_the_weight(tmp_path):
+    path = tmp_path / "corpus.csv"
+    path.write_text("keywords,suggestion,weight\nhello,Greet,\nbye,Part,2\n", encoding="utf-8")
+    assert [entry["weight"] for entry in load_corpus(str(path))] == [1.0, 2.0]
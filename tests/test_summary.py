@@ -0,0 +1,88 @@
+# ═══════════════════════════════════════════════════════════════════
+# 📝 ROLLING SUMMARY TESTS - WHAT GETS FOLDED AND HOW
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``split_for_summary``, ``fold_summary`` and ``summarize_history``."""
+from chat_core import SUMMARY_TAG, ChatBackend, Turn, fold_summary, make_summary_turn, split_for_summary, summarize_history
+from fake_cohere import FakeResponse
+
+class RecordingClient:
+    """Answers every ``chat`` with ``reply`` and keeps the prompts it was sent."""
+
+    def __init__(self, reply="  folded  "):
+        self.reply = reply
+        self.messages = []
+
+    def chat(self, model=None, message=""):
+        self.messages.append(message)
+        return FakeResponse(self.reply)
+
+def make_history(count, summary=None):
+    history = [make_summary_turn(summary, seq=0)] if summary is not None else []
+    return history + [Turn(f"q{i}", f"a{i}", ts=0.0, seq=i) for i in range(1, count + 1)]
+
+# ── split_for_summary ──────────────────────────────────────────────
+def test_short_history_is_left_alone():
+    # Two turns of slack over keep_last before anything is summarized
+    assert split_for_summary(make_history(6), keep_last=4) == (None, [], 0)
+
+def test_turns_older_than_keep_last_age_out():
+    history = make_history(7)
+    previous, aged, cut = split_for_summary(history, keep_last=4)
+    assert previous is None
+    assert [turn.seq for turn in aged] == [1, 2, 3]
+    assert cut == 3
+    assert [turn.seq for turn in history[cut:]] == [4, 5, 6, 7]
+
+def test_existing_summary_is_returned_not_refolded():
+    history = make_history(7, summary="earlier")
+    previous, aged, cut = split_for_summary(history, keep_last=4)
+    assert previous == "earlier"
+    assert [turn.seq for turn in aged] == [1, 2, 3]
+    assert cut == 4
+
+# ── fold_summary ───────────────────────────────────────────────────
+def test_first_summary_sends_only_the_turns():
+    client = RecordingClient()
+    assert fold_summary(None, make_history(2), client, "model") == "folded"
+    (prompt,) = client.messages
+    assert prompt.startswith("Summarize the following conversation")
+    assert "Human: q1\nAI: a1\nHuman: q2\nAI: a2\n" in prompt
+
+def test_later_summaries_update_the_previous_one():
+    client = RecordingClient()
+    fold_summary("earlier", make_history(1), client, "model")
+    (prompt,) = client.messages
+    assert "Current summary:\nearlier\n" in prompt
+    assert "New turns:\nHuman: q1\nAI: a1\n" in prompt
+
+# ── summarize_history ──────────────────────────────────────────────
+def test_summarize_history_replaces_aged_turns_with_one_summary():
+    client = RecordingClient("short version")
+    history = summarize_history(make_history(7, summary="earlier"), 4, client, "model")
+    assert history[0].user == SUMMARY_TAG
+    assert history[0].ai == "short version"
+    assert [turn.seq for turn in history[1:]] == [4, 5, 6, 7]
+    # Aged turns only; the turns kept verbatim are not sent again
+    assert "q3" in client.messages[0]
+    assert "q4" not in client.messages[0]
+
+def test_summarize_history_without_aged_turns_makes_no_call():
+    client = RecordingClient()
+    history = make_history(3)
+    assert summarize_history(history, 4, client, "model") is history
+    assert client.messages == []
+
+# ── ChatBackend ────────────────────────────────────────────────────
+def test_background_summary_folds_overflow_and_keeps_new_turns():
+    client = RecordingClient("short version")
+    backend = ChatBackend(client)
+    session = backend.new_session(memory_turns=3, policy="summarize")
+    for turn in make_history(5):
+        backend.record_turn(session, turn)
+    assert backend.schedule_summary(session, keep_last=3, model_name="model")
+    backend.record_turn(session, Turn("q6", "a6"))  # arrives while the summary runs
+    assert backend.apply_pending_summary(session, wait=True)
+    assert "Human: q1" in client.messages[0]
+    assert "Human: q3" not in client.messages[0]
+    assert session.history[0].ai == "short version"
+    assert [turn.seq for turn in session.history.turns()] == [4, 5, 6]
@@ -0,0 +1,77 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🔁 TURN BUFFER TESTS - RING ORDER AND OVERFLOW POLICIES
+# ═══════════════════════════════════════════════════════════════════
+"""Tests for ``TurnBuffer`` and how ``ChatBackend`` applies its overflow policy."""
+import pytest
+
+from chat_core import ChatBackend, ConversationStore, Turn, TurnBuffer, make_summary_turn
+from fake_cohere import FakeCohereClient
+
+def turns(*seqs):
+    return [Turn(f"q{seq}", f"a{seq}", ts=0.0, seq=seq) for seq in seqs]
+
+def seqs(items):
+    return [turn.seq for turn in items]
+
+# ── ring buffer ────────────────────────────────────────────────────
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="overflow policy"):
+        TurnBuffer(3, policy="shrink")
+
+def test_reads_like_a_list_with_the_summary_first():
+    summary = make_summary_turn("so far", seq=0)
+    buffer = TurnBuffer(3, turns=turns(1, 2, 3, 4, 5), summary=summary)
+    assert seqs(buffer) == [0, 3, 4, 5]
+    assert seqs(reversed(buffer)) == [5, 4, 3, 0]
+    assert seqs(buffer.turns()) == [3, 4, 5]
+    assert len(buffer) == 4
+    assert buffer[0] is summary
+    assert buffer[-1].seq == 5
+    assert seqs(buffer[1:3]) == [3, 4]
+    with pytest.raises(IndexError):
+        buffer[4]
+
+@pytest.mark.parametrize("policy", ["spill", "drop"])
+def test_spill_and_drop_evict_the_oldest_turn(policy):
+    buffer = TurnBuffer(2, policy=policy)
+    assert [buffer.append(turn) for turn in turns(1, 2)] == [None, None]
+    assert buffer.append(turns(3)[0]).seq == 1
+    assert seqs(buffer) == [2, 3]
+    assert buffer.overflow == []
+
+def test_summarize_queues_evicted_turns_for_the_summary():
+    buffer = TurnBuffer(2, policy="summarize", turns=turns(1, 2, 3, 4))
+    assert seqs(buffer) == [3, 4]
+    assert seqs(buffer.overflow) == [1, 2]
+    # The summary covers the overflow and the first live turn
+    buffer.set_summary(make_summary_turn("1 to 3", seq=3), through_seq=3)
+    assert buffer.overflow == []
+    assert seqs(buffer) == [3, 4]
+    assert buffer[0].ai == "1 to 3"
+    assert seqs(buffer.turns()) == [4]
+
+def test_extend_spills_whatever_the_policy():
+    buffer = TurnBuffer(2, policy="summarize")
+    buffer.extend(turns(1, 2, 3))
+    assert seqs(buffer) == [2, 3]
+    assert buffer.overflow == []
+
+def test_clear_bumps_the_generation():
+    buffer = TurnBuffer(2, policy="summarize", turns=turns(1, 2, 3), summary=make_summary_turn("s"))
+    buffer.clear()
+    assert len(buffer) == 0
+    assert not buffer
+    assert buffer.overflow == []
+    assert buffer.generation == 1
+    buffer.append(turns(4)[0])
+    assert seqs(buffer) == [4]
+
+# ── ChatBackend ────────────────────────────────────────────────────
+@pytest.mark.parametrize("policy, stored", [("spill", [1, 2, 3]), ("drop", [2, 3])])
+def test_backend_keeps_spilled_turns_in_the_store(tmp_path, policy, stored):
+    backend = ChatBackend(FakeCohereClient(), store=ConversationStore(str(tmp_path / "chat.db")))
+    session = backend.new_session(memory_turns=2, policy=policy)
+    for i in range(3):
+        backend.record_turn(session, Turn(f"question {i}", f"answer {i}"))
+    assert seqs(session.history) == [2, 3]
+    assert seqs(backend.iter_turns(session)) == stored
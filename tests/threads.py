@@ -0,0 +1,69 @@
+# ═══════════════════════════════════════════════════════════════════
+# 🧵 THREAD HELPERS - ORDERED INTERLEAVINGS FOR CONCURRENCY TESTS
+# ═══════════════════════════════════════════════════════════════════
+"""Threads, waits and a blocking fake client shared by the concurrency tests."""
+import threading
+import time
+
+from fake_cohere import FakeCohereClient, FakeResponse, FakeStreamEvent
+
+TIMEOUT = 5.0
+
+def wait_until(predicate):
+    deadline = time.monotonic() + TIMEOUT
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.001)
+
+def start(fn, *args, **kwargs):
+    """Run ``fn`` on a thread; return ``(thread, outcome)``, later holding ``result`` or ``error``."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = fn(*args, **kwargs)
+        except BaseException as exc:
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread, outcome
+
+def finish(*threads):
+    for thread in threads:
+        thread.join(TIMEOUT)
+        assert not thread.is_alive()
+
+class BlockingClient(FakeCohereClient):
+    """Fake client whose first call blocks until ``release`` is set.
+
+    With ``fail_first``, that call then raises ``ConnectionError``.
+    """
+
+    def __init__(self, fail_first=False):
+        super().__init__()
+        self.fail_first = fail_first
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.messages = []
+
+    def _call(self, message):
+        with self._lock:
+            self.calls += 1
+            self.messages.append(message)
+            first = self.calls == 1
+        if first:
+            self.entered.set()
+            assert self.release.wait(TIMEOUT)
+            if self.fail_first:
+                raise ConnectionError("upstream went away")
+
+    def chat(self, model=None, message="", **kwargs):
+        self._call(message)
+        return FakeResponse(self.reply_for(model, message))
+
+    def chat_stream(self, model=None, message="", **kwargs):
+        self._call(message)
+        for i, word in enumerate(self.reply_for(model, message).split(" ")):
+            yield FakeStreamEvent("text-generation", word if i == 0 else " " + word)